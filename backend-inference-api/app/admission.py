@@ -0,0 +1,238 @@
+import asyncio
+import logging
+import math
+import re
+import time
+from collections import deque
+from typing import Deque, Optional, Pattern
+
+import orjson
+
+from app import deadline
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Status of a request shed because the wait queue is full, and of one that
+# waited max_wait_seconds without getting a slot
+QUEUE_FULL_STATUS = 429
+WAIT_TIMEOUT_STATUS = 503
+
+# Bounds of the Retry-After estimate, seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+# Weight of the latest request in the moving average of the time a slot is held
+SERVICE_TIME_SMOOTHING = 0.1
+
+
+class AdmissionRejected(Exception):
+    """Raised when a request is shed instead of admitted"""
+
+    def __init__(self, status_code: int, retry_after: int, detail: str):
+        super().__init__(detail)
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.detail = detail
+
+
+class AdmissionController:
+    """
+    Concurrency limit with a bounded FIFO wait queue
+
+    At most max_concurrent requests run at once. Up to max_queue more wait
+    for a slot, in arrival order, for at most max_wait_seconds each; past
+    that requests are shed at once (429 when the queue is full, 503 when
+    the wait runs out) with a Retry-After estimated from the queue depth
+    and the average time a slot is held. Latency then stays bounded by
+    the queue instead of growing until callers time out.
+
+    Runs on the event loop of one worker; every worker has its own limits.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, max_wait_seconds: float):
+        """
+        Initialize AdmissionController
+
+        Args:
+            max_concurrent: Requests running at once
+            max_queue: Requests waiting for a slot (0 sheds whenever all slots are busy)
+            max_wait_seconds: Longest wait for a slot (0 waits indefinitely)
+        """
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.max_wait_seconds = max_wait_seconds
+        self._active = 0
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._service_time = 0.0
+
+        self._in_flight = metrics.gauge("admission_in_flight", "Admitted requests running")
+        self._queue_depth = metrics.gauge("admission_queue_depth", "Requests waiting for an admission slot")
+        self._wait = metrics.histogram("admission_wait_seconds", "Time admitted requests waited for a slot")
+        self._shed_queue_full = metrics.counter(
+            "admission_shed_queue_full_total", f"Requests shed with {QUEUE_FULL_STATUS} because the wait queue was full"
+        )
+        self._shed_timeout = metrics.counter(
+            "admission_shed_timeout_total", f"Requests shed with {WAIT_TIMEOUT_STATUS} after waiting too long for a slot"
+        )
+
+    @property
+    def active(self) -> int:
+        return self._active
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def retry_after(self) -> int:
+        """Seconds until the requests queued now should have been served"""
+        estimate = (len(self._waiters) + 1) * self._service_time / self.max_concurrent
+        return min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, math.ceil(estimate)))
+
+    async def acquire(self, timeout: Optional[float] = None) -> float:
+        """
+        Wait for a slot
+
+        Args:
+            timeout: Seconds left before the caller's deadline (None: no deadline);
+                     the wait ends there rather than after max_wait_seconds
+                     if that comes first
+
+        Returns:
+            Seconds waited
+
+        Raises:
+            AdmissionRejected: If the request is shed
+            DeadlineExceeded: If the deadline passes before a slot is free
+        """
+        if timeout is not None and timeout <= 0:
+            raise deadline.DeadlineExceeded("admission")
+
+        if self._active < self.max_concurrent and not self._waiters:
+            self._active += 1
+            self._in_flight.set(self._active)
+            self._wait.observe(0.0)
+            return 0.0
+
+        if len(self._waiters) >= self.max_queue:
+            self._shed_queue_full.inc()
+            raise AdmissionRejected(
+                QUEUE_FULL_STATUS, self.retry_after(),
+                f"Server is at capacity ({self._active} requests running, {len(self._waiters)} waiting)"
+            )
+
+        # The caller's deadline ends the wait if it comes before max_wait_seconds
+        deadline_first = timeout is not None and (not self.max_wait_seconds or timeout < self.max_wait_seconds)
+        max_wait = timeout if deadline_first else (self.max_wait_seconds or None)
+
+        started = time.monotonic()
+        granted = asyncio.get_running_loop().create_future()
+        self._waiters.append(granted)
+        self._queue_depth.set(len(self._waiters))
+        try:
+            # Shielded so a timeout never cancels a slot handed over at the same moment
+            await asyncio.wait_for(asyncio.shield(granted), max_wait)
+        except asyncio.TimeoutError:
+            if not granted.done():
+                self._abandon(granted)
+                if deadline_first:
+                    raise deadline.DeadlineExceeded("admission")
+                self._shed_timeout.inc()
+                raise AdmissionRejected(
+                    WAIT_TIMEOUT_STATUS, self.retry_after(),
+                    f"No capacity within {self.max_wait_seconds:g}s"
+                )
+        except asyncio.CancelledError:
+            # Client went away while waiting
+            if granted.done() and not granted.cancelled():
+                self.release()
+            else:
+                self._abandon(granted)
+            raise
+
+        waited = time.monotonic() - started
+        self._wait.observe(waited)
+        return waited
+
+    def _abandon(self, granted: asyncio.Future) -> None:
+        granted.cancel()
+        try:
+            self._waiters.remove(granted)
+        except ValueError:
+            pass
+        self._queue_depth.set(len(self._waiters))
+
+    def release(self, held_seconds: Optional[float] = None) -> None:
+        """
+        Free a slot, handing it to the longest waiting request if any
+
+        Args:
+            held_seconds: Time the slot was held, for the Retry-After estimate
+        """
+        if held_seconds is not None:
+            self._service_time += SERVICE_TIME_SMOOTHING * (held_seconds - self._service_time)
+
+        while self._waiters:
+            granted = self._waiters.popleft()
+            if not granted.done():
+                granted.set_result(None)
+                self._queue_depth.set(len(self._waiters))
+                return
+        self._queue_depth.set(0)
+        self._active -= 1
+        self._in_flight.set(self._active)
+
+
+class AdmissionMiddleware:
+    """
+    ASGI middleware applying an AdmissionController to matching requests
+
+    A slot is held until the response has been sent, so streamed responses
+    count for as long as they run. Shed requests get a JSON
+    {"detail": ...} body and a Retry-After header. Requests with a deadline
+    (see app/deadline.py) wait for a slot until it passes at most, then
+    raise DeadlineExceeded for DeadlineMiddleware (which must be outside
+    this one) to answer.
+    """
+
+    def __init__(self, app, controller: AdmissionController, paths: Pattern[str], methods=("POST",)):
+        self.app = app
+        self.controller = controller
+        self.paths = paths
+        self.methods = set(methods)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] not in self.methods or not self.paths.fullmatch(scope["path"]):
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await self.controller.acquire(deadline.remaining())
+        except AdmissionRejected as e:
+            await self._reject(send, e)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.controller.release(time.monotonic() - started)
+
+    @staticmethod
+    async def _reject(send, rejected: AdmissionRejected) -> None:
+        body = orjson.dumps({"detail": rejected.detail})
+        await send({
+            "type": "http.response.start",
+            "status": rejected.status_code,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(rejected.retry_after).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
+
+
+def path_pattern(*patterns: str) -> Pattern[str]:
+    """One regular expression matching any of the path patterns"""
+    return re.compile("|".join(f"(?:{pattern})" for pattern in patterns))
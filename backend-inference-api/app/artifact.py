@@ -0,0 +1,296 @@
+"""
+Memory-mappable model artifact
+
+Build from backend-inference-api/:
+    python -m app.artifact build models/superkart_model.joblib
+    python -m app.artifact verify models/superkart_model.artifact
+
+An artifact is a directory next to the joblib file:
+    manifest.json    format version, sha256 of the source joblib, encoder
+                     metadata, ensemble scalars and sha256 of every file
+    <array>.npy      tree arrays of the NumPy engine, opened with mmap
+    booster.ubj      native XGBoost model for the large-batch engine
+
+Loading it needs neither unpickling nor sklearn, and the .npy pages are
+mapped read-only from the page cache, so they are shared by every worker
+(and container) on the host. The manifest records the sha256 of the joblib
+it was built from; the loader only uses an artifact whose checksum matches
+the joblib next to it and otherwise falls back to joblib.
+"""
+import argparse
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+from pathlib import Path
+from typing import Any, Dict, Optional
+
+import numpy as np
+
+from app.encoder import CompiledEncoder, FeatureBlock
+from app.tree_ensemble import TreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 2
+MANIFEST_FILE = "manifest.json"
+BOOSTER_FILE = "booster.ubj"
+ARRAY_NAMES = ("feature", "threshold", "left", "right", "default_left", "value", "roots")
+
+
+class ArtifactError(ValueError):
+    """Raised when an artifact is missing, stale or corrupt"""
+
+
+def file_sha256(path: Path) -> str:
+    """Hex sha256 of a file's contents"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def default_artifact_path(model_path: str) -> Path:
+    """Artifact directory for a joblib file: superkart_model.joblib -> superkart_model.artifact"""
+    return Path(model_path).with_suffix(".artifact")
+
+
+def _encoder_to_dict(encoder: CompiledEncoder) -> Dict[str, Any]:
+    return {
+        "n_features": encoder.n_features,
+        "implicit_missing": encoder.implicit_missing,
+        "blocks": [
+            {
+                "column": block.column,
+                "kind": block.kind,
+                "offset": block.offset,
+                "fill_value": block.fill_value,
+                "mean": block.mean,
+                "scale": block.scale,
+                "categories": block.categories,
+                "handle_unknown": block.handle_unknown,
+            }
+            for block in encoder.blocks
+        ],
+    }
+
+
+def _encoder_from_dict(data: Dict[str, Any]) -> CompiledEncoder:
+    blocks = [FeatureBlock(**block) for block in data["blocks"]]
+    return CompiledEncoder(blocks, data["n_features"], data["implicit_missing"])
+
+
+def _json_default(value: Any) -> Any:
+    """Convert NumPy scalars left in fitted sklearn attributes"""
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"Cannot serialize {type(value).__name__}")
+
+
+class ModelArtifact:
+    """
+    Compiled model opened from an artifact directory
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        manifest: Dict[str, Any],
+        encoder: CompiledEncoder,
+        ensemble: TreeEnsemble
+    ):
+        self.path = path
+        self.manifest = manifest
+        self.encoder = encoder
+        self.ensemble = ensemble
+
+    @property
+    def source_sha256(self) -> str:
+        return self.manifest["source"]["sha256"]
+
+    @property
+    def model_type(self) -> str:
+        return self.manifest["model_type"]
+
+    @classmethod
+    def open(cls, path: Path, expected_sha256: Optional[str] = None) -> "ModelArtifact":
+        """
+        Open an artifact, memory-mapping its tree arrays
+
+        Args:
+            path: Artifact directory
+            expected_sha256: sha256 of the joblib the artifact must have been built from
+
+        Returns:
+            ModelArtifact
+
+        Raises:
+            ArtifactError: If the artifact is missing, of another format version
+                or was built from a different joblib
+        """
+        path = Path(path)
+        try:
+            with open(path / MANIFEST_FILE) as f:
+                manifest = json.load(f)
+        except FileNotFoundError:
+            raise ArtifactError(f"No artifact manifest in {path}")
+        except json.JSONDecodeError as e:
+            raise ArtifactError(f"Corrupt artifact manifest in {path}: {str(e)}")
+
+        if manifest.get("format_version") != FORMAT_VERSION:
+            raise ArtifactError(f"Artifact format {manifest.get('format_version')} is not supported")
+        if expected_sha256 is not None and manifest["source"]["sha256"] != expected_sha256:
+            raise ArtifactError(f"Artifact in {path} was built from a different model file")
+
+        try:
+            arrays = {
+                name: np.load(path / f"{name}.npy", mmap_mode="r", allow_pickle=False)
+                for name in ARRAY_NAMES
+            }
+        except (OSError, ValueError) as e:
+            raise ArtifactError(f"Cannot map artifact arrays in {path}: {str(e)}")
+
+        ensemble_meta = manifest["ensemble"]
+        ensemble = TreeEnsemble(
+            base_score=ensemble_meta["base_score"],
+            max_depth=ensemble_meta["max_depth"],
+            **arrays
+        )
+        if ensemble.n_trees != ensemble_meta["n_trees"] or ensemble.n_nodes != ensemble_meta["n_nodes"]:
+            raise ArtifactError(f"Artifact arrays in {path} do not match the manifest")
+
+        return cls(path, manifest, _encoder_from_dict(manifest["encoder"]), ensemble)
+
+    def load_regressor(self) -> Optional[Any]:
+        """
+        Load the native XGBoost model stored with the artifact
+
+        Returns:
+            XGBRegressor, or None if the artifact has no booster
+        """
+        booster_path = self.path / BOOSTER_FILE
+        if not booster_path.exists():
+            return None
+        import xgboost
+
+        regressor = xgboost.XGBRegressor()
+        regressor.load_model(booster_path)
+        return regressor
+
+    def verify(self) -> None:
+        """
+        Check every file against the checksums in the manifest
+
+        Raises:
+            ArtifactError: On the first mismatch
+        """
+        for name, expected in self.manifest["files"].items():
+            if file_sha256(self.path / name) != expected:
+                raise ArtifactError(f"Checksum mismatch for {self.path / name}")
+
+
+def build_artifact(model_path: str, output: Optional[str] = None) -> Path:
+    """
+    Convert a joblib pipeline into an artifact directory
+
+    The pipeline must be compilable (see ModelLoader); the artifact is
+    checked against the pipeline before it replaces any existing one.
+
+    Args:
+        model_path: Source joblib file
+        output: Artifact directory (defaults to default_artifact_path)
+
+    Returns:
+        Path of the written artifact
+
+    Raises:
+        ArtifactError: If the pipeline cannot be compiled or the artifact
+            does not reproduce its predictions
+    """
+    from app.model_loader import ModelLoader
+
+    loader = ModelLoader(model_path)
+    loader.load_model(use_artifact=False)
+    if loader.encoder is None or loader.ensemble is None:
+        raise ArtifactError(f"{model_path} cannot be compiled to NumPy, no artifact written")
+
+    output_path = Path(output) if output else default_artifact_path(model_path)
+    staging = Path(tempfile.mkdtemp(prefix=".artifact-", dir=output_path.parent))
+    # mkdtemp creates the directory 0700; workers may run as another user
+    staging.chmod(0o755)
+    try:
+        ensemble = loader.ensemble
+        files = {}
+        for name in ARRAY_NAMES:
+            np.save(staging / f"{name}.npy", np.ascontiguousarray(getattr(ensemble, name)), allow_pickle=False)
+            files[f"{name}.npy"] = file_sha256(staging / f"{name}.npy")
+        if loader.regressor is not None:
+            loader.regressor.get_booster().save_model(staging / BOOSTER_FILE)
+            files[BOOSTER_FILE] = file_sha256(staging / BOOSTER_FILE)
+
+        manifest = {
+            "format_version": FORMAT_VERSION,
+            "model_type": type(loader.model).__name__,
+            "source": {"file": Path(model_path).name, "sha256": file_sha256(Path(model_path))},
+            "encoder": _encoder_to_dict(loader.encoder),
+            "ensemble": {
+                "base_score": ensemble.base_score,
+                "max_depth": ensemble.max_depth,
+                "n_trees": ensemble.n_trees,
+                "n_nodes": ensemble.n_nodes,
+            },
+            "files": files,
+        }
+        with open(staging / MANIFEST_FILE, "w") as f:
+            json.dump(manifest, f, indent=2, default=_json_default)
+
+        # Must reproduce the pipeline exactly before it is published
+        artifact = ModelArtifact.open(staging)
+        probe = loader._probe_frame(loader.encoder)
+        expected = loader.model.predict(probe)
+        X = artifact.encoder.encode_frame(probe)
+        if not np.array_equal(artifact.ensemble.predict(X), expected):
+            raise ArtifactError("Artifact tree arrays do not reproduce the pipeline predictions")
+        regressor = artifact.load_regressor()
+        if regressor is not None and not np.array_equal(regressor.predict(X), expected):
+            raise ArtifactError("Artifact booster does not reproduce the pipeline predictions")
+
+        if output_path.exists():
+            shutil.rmtree(output_path)
+        os.replace(staging, output_path)
+    finally:
+        shutil.rmtree(staging, ignore_errors=True)
+
+    logger.info(f"Wrote model artifact {output_path} from {model_path}")
+    return output_path
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Convert a joblib pipeline into an artifact")
+    build.add_argument("model", help="Path to the joblib model")
+    build.add_argument("--output", help="Artifact directory (default: <model>.artifact)")
+    verify = commands.add_parser("verify", help="Check an artifact against its manifest checksums")
+    verify.add_argument("artifact", help="Artifact directory")
+    verify.add_argument("--model", help="Also check it was built from this joblib file")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+
+    try:
+        if args.command == "build":
+            print(build_artifact(args.model, args.output))
+        else:
+            expected = file_sha256(Path(args.model)) if args.model else None
+            ModelArtifact.open(Path(args.artifact), expected).verify()
+            print(f"{args.artifact}: OK")
+    except ArtifactError as e:
+        raise SystemExit(f"Error: {str(e)}")
+
+
+if __name__ == "__main__":
+    main()
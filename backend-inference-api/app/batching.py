@@ -0,0 +1,211 @@
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+
+from app import deadline
+from app.deadline import DeadlineExceeded
+from app.executor import InferenceExecutor
+from app.metrics import SIZE_BUCKETS, metrics
+from app.predict import Predictor
+
+logger = logging.getLogger(__name__)
+
+# Queued row: (record, time.monotonic() deadline of its request or None, caller's future)
+QueuedRow = Tuple[Dict[str, Any], Optional[float], asyncio.Future]
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-row predictions into one model call
+
+    Requests are queued and collected for up to window_ms (or until
+    max_batch_size rows are waiting), scored with a single
+    Predictor.score_records call, and each caller gets its own row back
+    together with the model version that scored the batch. Rows whose
+    request deadline passes while they wait are failed with
+    DeadlineExceeded instead of being scored.
+    """
+
+    def __init__(
+        self,
+        predictor: Predictor,
+        window_ms: float,
+        max_batch_size: int,
+        max_queue_size: int,
+        executor: Optional[InferenceExecutor] = None
+    ):
+        """
+        Initialize MicroBatcher
+
+        Args:
+            predictor: Predictor used to score collected batches
+            window_ms: Maximum time to wait for more rows after the first one
+            max_batch_size: Maximum number of rows scored in one model call
+            max_queue_size: Maximum number of rows waiting to be batched
+            executor: Optional executor used to score batches off the event loop
+        """
+        self.predictor = predictor
+        self.executor = executor
+        self.window = window_ms / 1000.0
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_queue_size = max_queue_size
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+        self._queue_depth = metrics.gauge(
+            "micro_batch_queue_depth", "Rows waiting to be batched"
+        )
+        self._batches = metrics.counter(
+            "micro_batch_batches_total", "Batches scored by the micro-batcher"
+        )
+        self._rows = metrics.counter(
+            "micro_batch_rows_total", "Rows scored by the micro-batcher"
+        )
+        self._rejected = metrics.counter(
+            "micro_batch_rejected_total", "Rows rejected because the queue was full"
+        )
+        self._expired = metrics.counter(
+            "micro_batch_expired_total", "Rows dropped because their request deadline passed while they waited"
+        )
+        self._last_batch_size = metrics.gauge(
+            "micro_batch_last_size", "Size of the most recent micro-batch"
+        )
+        self._batch_size = metrics.histogram(
+            "micro_batch_size", "Rows per micro-batch", buckets=SIZE_BUCKETS
+        )
+        metrics.gauge("micro_batch_window_ms", "Configured batching window").set(window_ms)
+        metrics.gauge("micro_batch_max_size", "Configured maximum batch size").set(self.max_batch_size)
+        metrics.gauge("micro_batch_max_queue", "Configured maximum queue depth").set(max_queue_size)
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Start the background batching task on the running event loop"""
+        if self.is_running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._task = asyncio.create_task(self._run())
+        logger.info(
+            f"Micro-batcher started (window={self.window * 1000:.1f}ms, "
+            f"max_batch_size={self.max_batch_size}, max_queue_size={self.max_queue_size})"
+        )
+
+    async def stop(self) -> None:
+        """Stop the batching task and fail any rows still waiting or being scored"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+        if self._queue is not None:
+            while not self._queue.empty():
+                _, _, future = self._queue.get_nowait()
+                if not future.done():
+                    future.set_exception(RuntimeError("Micro-batcher stopped"))
+            self._queue_depth.set(0)
+        logger.info("Micro-batcher stopped")
+
+    async def submit(self, record: Dict[str, Any]) -> Tuple[float, Optional[str]]:
+        """
+        Queue a single row and wait for its prediction
+
+        Args:
+            record: Dictionary with the expected feature columns
+
+        Returns:
+            Tuple of (predicted value for the row, model version)
+
+        Raises:
+            asyncio.QueueFull: If max_queue_size rows are already waiting
+            DeadlineExceeded: If the request's deadline passed before the row was scored
+        """
+        if not self.is_running:
+            raise RuntimeError("Micro-batcher is not running")
+
+        future = asyncio.get_running_loop().create_future()
+        try:
+            # The batching task does not run in the request's context, so its deadline travels with the row
+            self._queue.put_nowait((record, deadline.current(), future))
+        except asyncio.QueueFull:
+            self._rejected.inc()
+            raise
+        self._queue_depth.set(self._queue.qsize())
+        return await future
+
+    async def _collect(self, batch: List[QueuedRow]) -> None:
+        """
+        Wait for the first row, then gather more until the window closes or the batch is full
+
+        Rows are appended to batch as they are taken off the queue, so the
+        caller still holds them if collecting is cancelled.
+        """
+        loop = asyncio.get_running_loop()
+        batch.append(await self._queue.get())
+        deadline = loop.time() + self.window
+
+        while len(batch) < self.max_batch_size:
+            while len(batch) < self.max_batch_size and not self._queue.empty():
+                batch.append(self._queue.get_nowait())
+            remaining = deadline - loop.time()
+            if len(batch) >= self.max_batch_size or remaining <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), remaining))
+            except asyncio.TimeoutError:
+                break
+
+        self._queue_depth.set(self._queue.qsize())
+
+    async def _run(self) -> None:
+        batch: List[QueuedRow] = []
+        try:
+            while True:
+                batch = []
+                await self._collect(batch)
+                # Callers that gave up (client disconnect) don't need scoring
+                batch = [row for row in batch if not row[2].done() and not self._fail_expired(row)]
+                if not batch:
+                    continue
+
+                try:
+                    records = [record for record, _, _ in batch]
+                    if self.executor is not None:
+                        scored = await self.executor.score_records(records)
+                    else:
+                        scored = self.predictor.score_records(records)
+                except Exception as e:
+                    logger.error(f"Micro-batch prediction error: {str(e)}")
+                    for _, _, future in batch:
+                        if not future.done():
+                            future.set_exception(e)
+                    continue
+
+                self._batches.inc()
+                self._rows.inc(len(batch))
+                self._last_batch_size.set(len(batch))
+                self._batch_size.observe(len(batch))
+
+                for (_, _, future), prediction in zip(batch, scored.predictions):
+                    if not future.done():
+                        future.set_result((float(prediction), scored.model_version))
+        finally:
+            # Rows already taken off the queue when the task is cancelled by stop()
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(RuntimeError("Micro-batcher stopped"))
+
+    def _fail_expired(self, row: QueuedRow) -> bool:
+        """Fail the row's caller with DeadlineExceeded if its deadline has passed"""
+        _, expires, future = row
+        try:
+            deadline.check("inference", expires)
+        except DeadlineExceeded as e:
+            self._expired.inc()
+            future.set_exception(e)
+            return True
+        return False
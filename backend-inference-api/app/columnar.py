@@ -0,0 +1,373 @@
+import json
+import struct
+from datetime import datetime
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Binary columnar batch format
+#
+#   prefix   8-byte magic, uint32 little-endian header length, 4 bytes padding
+#   header   UTF-8 JSON, padded with spaces to a multiple of 8 bytes:
+#            {"rows": n,
+#             "columns": [{"name", "dtype", "offset", "length"[, "categories"]}],
+#             "metadata": {...}}
+#   buffers  one per column, at "offset" bytes after the header, 8-byte aligned
+#
+# dtype is a NumPy type string (little-endian: "<f8", "<f4", "<i8", "<i4",
+# "|u1", ...). Columns with "categories" are dictionary-encoded: the buffer
+# holds integer codes into the list of categories, -1 for a missing value.
+# Buffers are read in place with np.frombuffer, nothing is parsed per row.
+MEDIA_TYPE = "application/vnd.superkart.columnar"
+MAGIC = b"SKCOL\x00\x01\x00"
+ALIGNMENT = 8
+_PREFIX = struct.Struct("<8sI4x")
+
+Column = Union[np.ndarray, pd.Categorical]
+
+
+class ColumnarFormatError(ValueError):
+    """Raised when a body is not a valid columnar batch"""
+
+
+def media_type_matches(header: Optional[str], media_type: str = MEDIA_TYPE) -> bool:
+    """
+    True if a Content-Type or Accept header names the media type
+
+    Parameters (charset, q) are ignored except q=0, which refuses it.
+    """
+    if not header:
+        return False
+    for part in header.split(","):
+        name, *params = [item.strip() for item in part.split(";")]
+        if name.lower() != media_type:
+            continue
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def _padded(length: int) -> int:
+    return -(-length // ALIGNMENT) * ALIGNMENT
+
+
+def encode(columns: Mapping[str, Column], metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Serialize columns into the binary columnar format
+
+    Args:
+        columns: Column name to NumPy array, or pandas Categorical for a
+            dictionary-encoded column; all of the same length
+        metadata: JSON-serializable values carried in the header
+
+    Returns:
+        Encoded body
+    """
+    rows = None
+    descriptors = []
+    buffers = []
+    offset = 0
+    for name, values in columns.items():
+        if rows is None:
+            rows = len(values)
+        elif len(values) != rows:
+            raise ValueError(f"Column {name} has {len(values)} values, expected {rows}")
+
+        descriptor: Dict[str, Any] = {"name": name}
+        if isinstance(values, pd.Categorical):
+            descriptor["categories"] = [str(category) for category in values.categories]
+            values = values.codes
+        data = np.ascontiguousarray(values)
+        if data.dtype.kind not in "fiu":
+            raise ValueError(f"Column {name} must be numeric or categorical, got {data.dtype}")
+        data = data.astype(data.dtype.newbyteorder("<"), copy=False)
+
+        descriptor.update(dtype=data.dtype.str, offset=offset, length=data.nbytes)
+        descriptors.append(descriptor)
+        buffers.append(data.tobytes())
+        padding = _padded(data.nbytes) - data.nbytes
+        if padding:
+            buffers.append(b"\x00" * padding)
+        offset += data.nbytes + padding
+
+    header = json.dumps({"rows": rows or 0, "columns": descriptors, "metadata": metadata or {}}).encode()
+    header += b" " * (_padded(len(header)) - len(header))
+    return b"".join([_PREFIX.pack(MAGIC, len(header)), header, *buffers])
+
+
+def decode(
+    body: bytes,
+    categorical: Sequence[str] = (),
+    numeric: Sequence[str] = (),
+    integer: Sequence[str] = ()
+) -> Tuple[Dict[str, Column], Dict[str, Any]]:
+    """
+    Read columns from a body in the binary columnar format
+
+    Numeric columns are views on body (read-only, no copy); dictionary-encoded
+    columns become pandas Categoricals over a view of their codes. The
+    required columns are then checked with one vectorised operation each,
+    with the same rules as columns_from_json: no missing category (code -1),
+    finite numbers only, whole numbers for integer columns.
+
+    Args:
+        body: Request body
+        categorical: Columns that must be present, dictionary-encoded and without missing values
+        numeric: Columns that must be present and hold finite numbers
+        integer: Numeric columns that must hold whole numbers
+
+    Returns:
+        Tuple of (column name to values, header metadata)
+
+    Raises:
+        ColumnarFormatError: If the body is malformed or misses a column
+        ColumnValidationError: With one error per column holding an invalid value
+    """
+    if len(body) < _PREFIX.size:
+        raise ColumnarFormatError("Body is shorter than the columnar prefix")
+    magic, header_length = _PREFIX.unpack_from(body)
+    if magic != MAGIC:
+        raise ColumnarFormatError("Body does not start with the columnar magic bytes")
+    data_start = _PREFIX.size + header_length
+    if data_start > len(body):
+        raise ColumnarFormatError("Header extends past the end of the body")
+
+    try:
+        header = json.loads(body[_PREFIX.size:data_start])
+        rows = int(header["rows"])
+        descriptors = list(header["columns"])
+        metadata = dict(header.get("metadata") or {})
+    except (ValueError, TypeError, KeyError) as e:
+        raise ColumnarFormatError(f"Invalid columnar header: {str(e)}")
+    if rows < 0:
+        raise ColumnarFormatError(f"Invalid columnar header: negative row count {rows}")
+
+    columns: Dict[str, Column] = {}
+    for descriptor in descriptors:
+        try:
+            name = str(descriptor["name"])
+            dtype = np.dtype(descriptor["dtype"])
+            offset = int(descriptor["offset"])
+            length = int(descriptor["length"])
+            categories = descriptor.get("categories")
+        except (TypeError, KeyError) as e:
+            raise ColumnarFormatError(f"Invalid column descriptor {descriptor!r}: {str(e)}")
+        if dtype.kind not in "fiu" or (categories is not None and dtype.kind == "f"):
+            raise ColumnarFormatError(f"Column {name} has unsupported dtype {dtype.str}")
+        if length < 0 or length != rows * dtype.itemsize or offset < 0 or data_start + offset + length > len(body):
+            raise ColumnarFormatError(f"Column {name} does not hold {rows} {dtype.str} values within the body")
+
+        values = np.frombuffer(body, dtype=dtype, count=rows, offset=data_start + offset)
+        if categories is not None:
+            try:
+                values = pd.Categorical.from_codes(values, categories=categories)
+            except (ValueError, TypeError) as e:
+                raise ColumnarFormatError(f"Invalid dictionary-encoded column {name}: {str(e)}")
+        columns[name] = values
+
+    for name in categorical:
+        if name not in columns:
+            raise ColumnarFormatError(f"Missing required column {name}")
+        if not isinstance(columns[name], pd.Categorical):
+            raise ColumnarFormatError(f"Column {name} must be dictionary-encoded")
+    for name in numeric:
+        if name not in columns:
+            raise ColumnarFormatError(f"Missing required column {name}")
+        if isinstance(columns[name], pd.Categorical):
+            raise ColumnarFormatError(f"Column {name} must be numeric")
+
+    errors = [
+        error for error in (
+            *(_missing_category(name, columns[name]) for name in categorical),
+            *(_invalid_number(name, columns[name], name in integer) for name in numeric),
+        )
+        if error is not None
+    ]
+    if errors:
+        raise ColumnValidationError(errors)
+    return columns, metadata
+
+
+def encode_predictions(predictions: np.ndarray, model_version: Optional[str] = None) -> bytes:
+    """
+    Serialize batch predictions into the binary columnar format
+
+    A single "predictions" column in the predictions' own float dtype, with
+    total_records, timestamp and model_version in the header metadata.
+
+    Args:
+        predictions: One prediction per row
+        model_version: Version of the model that scored the batch
+
+    Returns:
+        Encoded body
+    """
+    predictions = np.asarray(predictions)
+    if predictions.dtype.kind != "f":
+        predictions = predictions.astype(np.float64)
+    return encode(
+        {"predictions": predictions},
+        metadata={
+            "total_records": len(predictions),
+            "timestamp": datetime.now().isoformat(),
+            "model_version": model_version,
+        }
+    )
+
+
+class ColumnValidationError(ValueError):
+    """Raised when JSON columns fail validation, with the errors in pydantic's format"""
+
+    def __init__(self, errors: List[Dict[str, Any]]):
+        super().__init__(f"{len(errors)} validation error(s)")
+        self.errors = errors
+
+
+def _error(error_type: str, loc: Tuple[Any, ...], msg: str, value: Any) -> Dict[str, Any]:
+    return {"type": error_type, "loc": loc, "msg": msg, "input": value}
+
+
+def columns_from_json(
+    columns: Any,
+    categorical: Sequence[str] = (),
+    numeric: Sequence[str] = (),
+    integer: Sequence[str] = ()
+) -> Dict[str, Column]:
+    """
+    Validate a JSON object of feature name to list of values
+
+    Each check is one NumPy or pandas operation over a whole column:
+    categorical columns are factorized and only their distinct values are
+    type-checked, numeric columns are converted in one call. Values are
+    looked at one by one only to locate the first bad value of a failing
+    column. Same rules as PredictionInput: strings for categorical
+    features, numbers (or numeric strings) for numeric ones, whole numbers
+    for integer ones, no nulls.
+
+    Args:
+        columns: Decoded JSON value, expected to map feature names to lists
+        categorical: Columns that must hold strings
+        numeric: Columns that must hold numbers
+        integer: Numeric columns that must hold whole numbers
+
+    Returns:
+        Feature name to pandas Categorical (categorical) or float64 array (numeric)
+
+    Raises:
+        ColumnValidationError: With one error per failing column
+    """
+    if not isinstance(columns, dict):
+        raise ColumnValidationError([_error("dict_type", (), "Input should be a valid dictionary", columns)])
+
+    errors: List[Dict[str, Any]] = []
+    result: Dict[str, Column] = {}
+    n_rows = None
+    for name in [*categorical, *numeric]:
+        values = columns.get(name)
+        if values is None:
+            errors.append(_error("missing", (name,), "Field required", None))
+            continue
+        if not isinstance(values, list):
+            errors.append(_error("list_type", (name,), "Input should be a valid list", values))
+            continue
+        if n_rows is None:
+            n_rows = len(values)
+        elif len(values) != n_rows:
+            errors.append(_error(
+                "value_error", (name,), f"Value error, Column has {len(values)} values, expected {n_rows}", None
+            ))
+            continue
+
+        if name in categorical:
+            column, error = _categorical_column(name, values)
+        else:
+            column, error = _numeric_column(name, values, name in integer)
+        if error is not None:
+            errors.append(error)
+        else:
+            result[name] = column
+
+    if errors:
+        raise ColumnValidationError(errors)
+    return result
+
+
+def _categorical_column(name: str, values: List[Any]) -> Tuple[Optional[pd.Categorical], Optional[Dict[str, Any]]]:
+    objects = np.fromiter(values, dtype=object, count=len(values))
+    try:
+        codes, uniques = pd.factorize(objects)
+    except TypeError:
+        # Unhashable values (lists, objects)
+        codes, uniques = None, None
+
+    if codes is not None and (codes >= 0).all() and all(isinstance(value, str) for value in uniques):
+        return pd.Categorical.from_codes(codes, categories=uniques), None
+
+    index = next(i for i, value in enumerate(values) if not isinstance(value, str))
+    return None, _error("string_type", (name, index), "Input should be a valid string", values[index])
+
+
+def _numeric_column(name: str, values: List[Any], integer: bool) -> Tuple[Optional[np.ndarray], Optional[Dict[str, Any]]]:
+    try:
+        array = np.asarray(values, dtype=np.float64)
+    except (TypeError, ValueError):
+        array = None
+    if array is None or array.ndim != 1 or np.isnan(array).any():
+        # null, NaN, nested or non-numeric value
+        index = _first_invalid_number(values)
+        return None, _error("float_parsing", (name, index), "Input should be a valid number", values[index])
+
+    if integer:
+        fractional = np.flatnonzero(array != np.floor(array))
+        if len(fractional):
+            index = int(fractional[0])
+            return None, _error(
+                "int_from_float", (name, index),
+                "Input should be a valid integer, got a number with a fractional part", values[index]
+            )
+    return array, None
+
+
+def _first_invalid_number(values: List[Any]) -> int:
+    for index, value in enumerate(values):
+        try:
+            if value is None or isinstance(value, (list, dict)) or np.isnan(float(value)):
+                return index
+        except (TypeError, ValueError):
+            return index
+    return 0
+
+
+def _missing_category(name: str, values: pd.Categorical) -> Optional[Dict[str, Any]]:
+    missing = np.flatnonzero(values.codes < 0)
+    if not len(missing):
+        return None
+    return _error("string_type", (name, int(missing[0])), "Input should be a valid string", None)
+
+
+def _invalid_number(name: str, values: np.ndarray, integer: bool) -> Optional[Dict[str, Any]]:
+    if values.dtype.kind != "f":
+        # Integer buffers hold whole, finite numbers
+        return None
+    invalid = np.flatnonzero(~np.isfinite(values))
+    if len(invalid):
+        index = int(invalid[0])
+        # The value as a string: NaN and infinity are not valid JSON
+        return _error("finite_number", (name, index), "Input should be a finite number", str(values[index]))
+
+    if integer:
+        fractional = np.flatnonzero(values != np.floor(values))
+        if len(fractional):
+            index = int(fractional[0])
+            return _error(
+                "int_from_float", (name, index),
+                "Input should be a valid integer, got a number with a fractional part", float(values[index])
+            )
+    return None
@@ -1,5 +1,5 @@
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import List, Optional
 
 
 class Settings(BaseSettings):
@@ -31,6 +31,179 @@ class Settings(BaseSettings):
     # Logging
     LOG_LEVEL: str = "INFO"
     
+    # Metrics of all workers on /metrics: every METRICS_SYNC_INTERVAL_SECONDS
+    # each worker writes its metrics to <pid>.json in METRICS_DIR (default:
+    # <tmp>/superkart-metrics, emptied by entrypoint.sh at startup) and the
+    # scraped worker merges the files; 0 serves the scraped worker's metrics only
+    METRICS_DIR: Optional[str] = None
+    METRICS_SYNC_INTERVAL_SECONDS: float = 1.0
+    
+    # Memory-mapped model artifact built with `python -m app.artifact build`
+    # (defaults to MODEL_PATH with an .artifact suffix); used instead of the
+    # joblib file when its checksum matches it
+    MODEL_ARTIFACT_ENABLED: bool = True
+    MODEL_ARTIFACT_PATH: Optional[str] = None
+    
+    # Hot reload: the model file (and its artifact manifest) is polled every
+    # MODEL_WATCH_INTERVAL_SECONDS (0 disables) and reloaded when its checksum
+    # changes; after the swap, requests still running on the old version get
+    # up to MODEL_RELOAD_DRAIN_SECONDS to finish
+    MODEL_WATCH_INTERVAL_SECONDS: float = 10.0
+    MODEL_RELOAD_DRAIN_SECONDS: float = 30.0
+    
+    # Model registry: every <name>.joblib / <name>.artifact in MODELS_DIR (default:
+    # the directory of MODEL_PATH) is served under /models/{name or version},
+    # loaded on first request. Besides the MODEL_PATH model, at most
+    # MODEL_REGISTRY_MAX_LOADED models and MODEL_REGISTRY_MAX_BYTES of
+    # (approximate) model memory stay loaded; least recently used go first
+    MODELS_DIR: Optional[str] = None
+    MODEL_REGISTRY_MAX_LOADED: int = 4
+    MODEL_REGISTRY_MAX_BYTES: int = 1073741824
+    
+    # Shadow scoring: a SHADOW_SAMPLE_RATE fraction of /predict and /predict/batch
+    # requests is scored again by SHADOW_MODEL (a registry model name or version)
+    # on a background thread; divergence per model pair is served on /shadow/stats.
+    # At most SHADOW_MAX_QUEUE sampled requests wait (more are dropped), and
+    # percentiles cover the last SHADOW_WINDOW_ROWS rows per pair
+    SHADOW_MODEL: Optional[str] = None
+    SHADOW_SAMPLE_RATE: float = 0.0
+    SHADOW_MAX_QUEUE: int = 1000
+    SHADOW_WINDOW_ROWS: int = 10000
+    
+    # Per-request profiling: with PROFILING_ENABLED, a /predict/batch request with
+    # an X-Profile: 1 header or ?profile=1 (plus a valid X-Admin-Token when
+    # ADMIN_TOKEN is set) runs under cProfile and returns a call-tree breakdown;
+    # the raw profile is also written to PROFILING_OUTPUT_DIR when set
+    PROFILING_ENABLED: bool = False
+    PROFILING_OUTPUT_DIR: Optional[str] = None
+    
+    # Streaming inference (/predict/stream): NDJSON rows are scored in chunks
+    # of STREAM_CHUNK_ROWS as they arrive; longer lines than
+    # STREAM_MAX_LINE_BYTES end the stream with an error
+    STREAM_CHUNK_ROWS: int = 1000
+    STREAM_MAX_LINE_BYTES: int = 65536
+    
+    # Batch jobs (/jobs): inputs and predictions are spooled as CSV under
+    # JOB_SPOOL_DIR (default: <tmp>/superkart-jobs, shared by the workers of a
+    # host) and scored JOB_CHUNK_ROWS rows at a time by JOB_WORKERS threads per
+    # worker; a worker accepts up to JOB_MAX_PENDING queued or running jobs and
+    # finished jobs are deleted after JOB_TTL_SECONDS
+    JOB_SPOOL_DIR: Optional[str] = None
+    JOB_CHUNK_ROWS: int = 10000
+    JOB_WORKERS: int = 1
+    JOB_MAX_PENDING: int = 16
+    JOB_TTL_SECONDS: float = 3600.0
+    
+    # Admission control on the scoring endpoints (/predict, /predict/batch,
+    # /predict/stream, /models/{id}/predict[/batch]), opt-in: at most
+    # ADMISSION_MAX_CONCURRENT requests run per worker (0 disables) and up to
+    # ADMISSION_MAX_QUEUE wait for a slot for at most ADMISSION_MAX_WAIT_SECONDS
+    # (0 waits indefinitely); beyond that requests get 429 (queue full) or 503
+    # (waited too long) with a Retry-After header.
+    # Every request holding a slot counts: with MICRO_BATCH_ENABLED a micro-batch
+    # never gets more rows than there are slots, so allow at least
+    # MICRO_BATCH_MAX_SIZE, and a /predict/stream upload holds its slot until the
+    # stream ends, so allow for the streams expected at once on top of that
+    ADMISSION_MAX_CONCURRENT: int = 0
+    ADMISSION_MAX_QUEUE: int = 64
+    ADMISSION_MAX_WAIT_SECONDS: float = 10.0
+    
+    # Request deadlines: callers send the milliseconds they will still wait in
+    # an X-Request-Timeout-Ms header; a request whose deadline passes while it
+    # waits for admission or for an inference worker is dropped with 504
+    # instead of being scored (requests without the header have no deadline)
+    REQUEST_DEADLINES_ENABLED: bool = True
+    
+    # Warm-up and readiness: after the model loads, synthetic batches of each of
+    # WARMUP_BATCH_SIZES rows (values within the transform service's validator
+    # ranges) are scored WARMUP_ROUNDS times; /health/ready then answers 200
+    # once the median single-row latency is within READINESS_MAX_LATENCY_MS
+    # (0 skips the check), checking again every READINESS_RETRY_SECONDS
+    WARMUP_ENABLED: bool = True
+    WARMUP_BATCH_SIZES: List[int] = [1, 16, 256, 4096]
+    WARMUP_ROUNDS: int = 3
+    READINESS_MAX_LATENCY_MS: float = 100.0
+    READINESS_RETRY_SECONDS: float = 5.0
+    
+    # Always-on sampling profiler: every SAMPLER_INTERVAL_MS the stacks of all
+    # threads are recorded and the last SAMPLER_WINDOW_SECONDS are served as
+    # collapsed stacks (flame graph input) on /admin/profile/flamegraph.
+    # Threads waiting for work are skipped unless SAMPLER_INCLUDE_IDLE is set
+    SAMPLER_ENABLED: bool = True
+    SAMPLER_INTERVAL_MS: float = 20.0
+    SAMPLER_WINDOW_SECONDS: float = 300.0
+    SAMPLER_INCLUDE_IDLE: bool = False
+    
+    # Token expected in the X-Admin-Token header of /admin endpoints
+    # (admin endpoints are disabled when unset)
+    ADMIN_TOKEN: Optional[str] = None
+    
+    # Compile the fitted preprocessing pipeline into a NumPy encoder at load time
+    # (falls back to the sklearn pipeline when the pipeline cannot be compiled)
+    COMPILED_ENCODER_ENABLED: bool = True
+    
+    # Engine used to score encoded rows: "auto", "xgboost", "numpy" or "specialized"
+    # "auto" uses the specialized ensembles when enabled, and otherwise the NumPy
+    # tree evaluator for batches of up to NUMPY_ENGINE_MAX_ROWS rows and native
+    # XGBoost above that (see benchmarks/benchmark_engines.py for the crossover)
+    INFERENCE_ENGINE: str = "auto"
+    NUMPY_ENGINE_MAX_ROWS: int = 512
+    
+    # XGBoost threads per call: batches get one thread per
+    # XGBOOST_MIN_ROWS_PER_THREAD rows (crossovers measured on the host at
+    # startup with XGBOOST_THREAD_CALIBRATION), capped by the CPUs not used by
+    # calls already running in any worker (XGBOOST_THREAD_CPUS, default: the
+    # CPUs of the container; counted across workers through the shared memory
+    # segment XGBOOST_THREADS_SHARED_NAME, or per worker when empty)
+    XGBOOST_ADAPTIVE_THREADS: bool = True
+    XGBOOST_THREAD_CPUS: int = 0
+    XGBOOST_MIN_ROWS_PER_THREAD: int = 1024
+    XGBOOST_THREAD_CALIBRATION: bool = True
+    XGBOOST_THREADS_SHARED_NAME: str = "superkart_threads"
+    
+    # Ensembles specialized per combination of categorical inputs, pruned lazily
+    # and kept in an LRU of SPECIALIZATION_CACHE_SIZE entries (0 disables).
+    # Batches with fewer than SPECIALIZATION_MIN_GROUP_ROWS rows per combination
+    # on average are scored with the unspecialized engine instead.
+    SPECIALIZATION_CACHE_SIZE: int = 512
+    SPECIALIZATION_MAX_GRID_CELLS: int = 65536
+    SPECIALIZATION_MIN_GROUP_ROWS: int = 4
+    
+    # Within-batch deduplication: encoded batches of at least BATCH_DEDUP_MIN_ROWS
+    # rows are factorized and each distinct row is scored once (0 disables)
+    BATCH_DEDUP_MIN_ROWS: int = 64
+    
+    # Prediction cache in front of the model (0 entries disables it)
+    # Numeric inputs are rounded to multiples of PREDICTION_CACHE_QUANTUM when
+    # building keys (0 keys on exact values); entries live PREDICTION_CACHE_TTL_SECONDS
+    # (0 for no expiry) and the whole cache is dropped when the model is reloaded
+    PREDICTION_CACHE_SIZE: int = 10000
+    PREDICTION_CACHE_TTL_SECONDS: float = 300.0
+    PREDICTION_CACHE_QUANTUM: float = 0.0
+    # "local" keeps a cache per worker process; "shared" uses one hash table of
+    # SHARED_CACHE_SLOTS slots (40 bytes each) in shared memory for all workers
+    PREDICTION_CACHE_BACKEND: str = "local"
+    SHARED_CACHE_NAME: str = "superkart_predictions"
+    SHARED_CACHE_SLOTS: int = 262144
+    
+    # Inference executor
+    # Model inference runs on a dedicated pool so the event loop stays responsive.
+    # "thread" shares the loaded model; "process" loads a copy per pool worker.
+    INFERENCE_EXECUTOR: str = "thread"
+    INFERENCE_EXECUTOR_WORKERS: int = 1
+    
+    # Pre-fork serving (SERVING_MODE=prefork in entrypoint.sh): seconds between
+    # per-worker memory reports logged by the parent (0 disables)
+    PREFORK_MEMORY_REPORT_SECONDS: float = 300.0
+    
+    # Micro-batching for single-row /predict (opt-in)
+    # Concurrent requests are collected for up to MICRO_BATCH_WINDOW_MS or until
+    # MICRO_BATCH_MAX_SIZE rows are waiting, then scored with one model call
+    MICRO_BATCH_ENABLED: bool = False
+    MICRO_BATCH_WINDOW_MS: float = 2.0
+    MICRO_BATCH_MAX_SIZE: int = 64
+    MICRO_BATCH_MAX_QUEUE: int = 2048
+    
     class Config:
         env_file = ".env"
         case_sensitive = True
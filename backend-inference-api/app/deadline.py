@@ -0,0 +1,148 @@
+import contextvars
+import logging
+import math
+import time
+from typing import Optional
+
+import orjson
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Milliseconds the caller will still wait for the response, set by the
+# frontend and passed on (less the time already spent) by every hop. A
+# relative budget rather than a timestamp, so clocks need not agree.
+HEADER = "X-Request-Timeout-Ms"
+# Status of a request dropped because its deadline passed
+EXPIRED_STATUS = 504
+
+_header_key = HEADER.lower().encode()
+_current_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("request_deadline", default=None)
+
+expired_requests = metrics.counter(
+    "deadline_expired_total", "Requests dropped because the caller's deadline had passed"
+)
+
+
+class DeadlineExceeded(Exception):
+    """Raised instead of starting a stage whose caller has stopped waiting"""
+
+    def __init__(self, stage: str):
+        # stage is the only argument, so the exception pickles across process-pool workers
+        super().__init__(stage)
+        self.stage = stage
+
+    @property
+    def detail(self) -> str:
+        return f"Request deadline passed before the {self.stage} stage"
+
+
+def parse_timeout_ms(value: Optional[str]) -> Optional[float]:
+    """
+    Seconds left according to an X-Request-Timeout-Ms header value
+
+    Returns:
+        Seconds (negative once spent), or None if the header is missing or not a number
+    """
+    if value is None:
+        return None
+    try:
+        timeout = float(value) / 1000.0
+    except ValueError:
+        return None
+    return timeout if math.isfinite(timeout) else None
+
+
+def current() -> Optional[float]:
+    """time.monotonic() deadline of the request being handled, if it has one"""
+    return _current_deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current request's deadline, or None without one"""
+    deadline = _current_deadline.get()
+    if deadline is None:
+        return None
+    return deadline - time.monotonic()
+
+
+def check(stage: str, deadline: Optional[float] = None) -> None:
+    """
+    Refuse to start a stage once the deadline has passed
+
+    Args:
+        stage: Name of the stage about to run, for the error
+        deadline: time.monotonic() deadline (the current request's by default;
+                  passed explicitly on executor threads and processes, which
+                  do not see the request's context)
+
+    Raises:
+        DeadlineExceeded: If the deadline has passed
+    """
+    if deadline is None:
+        deadline = _current_deadline.get()
+    if deadline is not None and time.monotonic() >= deadline:
+        raise DeadlineExceeded(stage)
+
+
+class DeadlineMiddleware:
+    """
+    ASGI middleware reading the caller's deadline from X-Request-Timeout-Ms
+
+    The deadline (arrival time plus the header's budget) is available to
+    everything handling the request through current()/remaining()/check().
+    A DeadlineExceeded raised before the response has started is answered
+    with a 504 JSON {"detail": ...} body. Requests without the header have
+    no deadline.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timeout = None
+        for key, value in scope["headers"]:
+            if key == _header_key:
+                timeout = parse_timeout_ms(value.decode("latin-1"))
+                break
+        if timeout is None:
+            await self.app(scope, receive, send)
+            return
+
+        token = _current_deadline.set(time.monotonic() + timeout)
+        response_started = False
+
+        async def tracked_send(message):
+            nonlocal response_started
+            if message["type"] == "http.response.start":
+                response_started = True
+            await send(message)
+
+        try:
+            await self.app(scope, receive, tracked_send)
+        except DeadlineExceeded as e:
+            expired_requests.inc()
+            if response_started:
+                raise
+            logger.info(f"Dropped {scope['path']}: {e.detail}")
+            await self._expired(send, e)
+        finally:
+            _current_deadline.reset(token)
+
+    @staticmethod
+    async def _expired(send, expired: DeadlineExceeded) -> None:
+        body = orjson.dumps({"detail": expired.detail})
+        await send({
+            "type": "http.response.start",
+            "status": EXPIRED_STATUS,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
@@ -0,0 +1,59 @@
+from typing import NamedTuple, Optional
+
+import numpy as np
+import pandas as pd
+
+# Multiplier of the row hash (64-bit FNV prime)
+_HASH_PRIME = np.uint64(0x100000001B3)
+# Rows hashed per block, so the columns of a block stay in cache
+_BLOCK_ROWS = 4096
+
+
+class UniqueRows(NamedTuple):
+    """Distinct rows of a matrix: X[first_rows] are scored, results[inverse] scatter back"""
+    first_rows: np.ndarray
+    inverse: np.ndarray
+
+
+def unique_rows(X: np.ndarray) -> Optional[UniqueRows]:
+    """
+    Factorize the rows of an encoded feature matrix
+
+    Rows are compared on their bytes (so NaN equals NaN): each row is hashed
+    to a uint64 with one vectorized pass per column and the hashes are
+    factorized with pandas' hash table, which is linear in the number of
+    rows where np.unique(axis=0) sorts. Every repeated row is then compared
+    with the first row of its group, so a hash collision can never merge two
+    different rows; on a collision the batch is simply not deduplicated.
+
+    Args:
+        X: 2-D feature matrix
+
+    Returns:
+        UniqueRows, or None if every row is distinct (or on a hash collision)
+    """
+    n_rows = X.shape[0]
+    if n_rows < 2:
+        return None
+
+    X = np.ascontiguousarray(X)
+    words = X.view(np.uint32 if X.dtype.itemsize == 4 else np.uint64).reshape(n_rows, -1)
+    hashes = np.zeros(n_rows, dtype=np.uint64)
+    with np.errstate(over="ignore"):
+        for start in range(0, n_rows, _BLOCK_ROWS):
+            block = hashes[start:start + _BLOCK_ROWS]
+            for column in words[start:start + _BLOCK_ROWS].T:
+                np.bitwise_xor(block, column, out=block)
+                np.multiply(block, _HASH_PRIME, out=block)
+
+    inverse, uniques = pd.factorize(hashes)
+    if len(uniques) == n_rows:
+        return None
+
+    # First occurrence of each group: assigning in reverse leaves the smallest index
+    first_rows = np.empty(len(uniques), dtype=np.intp)
+    first_rows[inverse[::-1]] = np.arange(n_rows - 1, -1, -1)
+    repeats = np.flatnonzero(first_rows[inverse] != np.arange(n_rows))
+    if not (words[first_rows[inverse[repeats]]] == words[repeats]).all():
+        return None
+    return UniqueRows(first_rows, inverse)
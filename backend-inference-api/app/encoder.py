@@ -0,0 +1,280 @@
+import logging
+import math
+from typing import Any, Dict, List, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+
+class UnsupportedPipelineError(ValueError):
+    """Raised when a fitted preprocessor cannot be compiled to NumPy"""
+
+
+class FeatureBlock:
+    """
+    Encoding of one raw input column into its output feature columns
+
+    kind is one of:
+    - "numeric": impute, then (x - mean) / scale into a single column
+    - "ordinal": impute, then category index into a single column
+    - "onehot": impute, then one indicator column per category
+    """
+
+    def __init__(
+        self,
+        column: str,
+        kind: str,
+        offset: int,
+        fill_value: Any = None,
+        mean: float = 0.0,
+        scale: float = 1.0,
+        categories: Optional[List[Any]] = None,
+        handle_unknown: str = "error"
+    ):
+        self.column = column
+        self.kind = kind
+        self.offset = offset
+        self.fill_value = fill_value
+        self.mean = float(mean)
+        self.scale = float(scale)
+        self.categories = list(categories or [])
+        self.handle_unknown = handle_unknown
+        self.lookup = {value: index for index, value in enumerate(self.categories)}
+
+    @property
+    def width(self) -> int:
+        return len(self.categories) if self.kind == "onehot" else 1
+
+    @property
+    def is_categorical(self) -> bool:
+        return self.kind in ("ordinal", "onehot")
+
+
+def _is_missing(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and math.isnan(value))
+
+
+class CompiledEncoder:
+    """
+    NumPy re-implementation of a fitted sklearn ColumnTransformer
+
+    Built once at model load time from the fitted imputers, scalers and
+    encoders. Turns raw feature values straight into the dense float32
+    matrix the booster expects, without pandas or sklearn in the hot path.
+    """
+
+    def __init__(self, blocks: List[FeatureBlock], n_features: int, implicit_missing: bool):
+        """
+        Initialize CompiledEncoder
+
+        Args:
+            blocks: Feature blocks in output column order
+            n_features: Total number of output columns
+            implicit_missing: Emit NaN for zero entries. The sklearn pipeline
+                hands XGBoost a sparse matrix when sparse_output_ is set and
+                XGBoost treats entries absent from a sparse matrix as missing,
+                so zeros must become NaN to take the same tree branches.
+        """
+        self.blocks = blocks
+        self.n_features = n_features
+        self.implicit_missing = implicit_missing
+        self.input_columns = [block.column for block in blocks]
+
+    @property
+    def categorical_columns(self) -> List[int]:
+        """Output columns derived from categorical inputs"""
+        return [
+            block.offset + i
+            for block in self.blocks if block.is_categorical
+            for i in range(block.width)
+        ]
+
+    @classmethod
+    def from_column_transformer(cls, column_transformer: Any) -> "CompiledEncoder":
+        """
+        Compile a fitted ColumnTransformer
+
+        Supports transformers built from SimpleImputer, StandardScaler,
+        OrdinalEncoder and OneHotEncoder steps (or "passthrough").
+
+        Raises:
+            UnsupportedPipelineError: If any step cannot be compiled
+        """
+        if not hasattr(column_transformer, "transformers_"):
+            raise UnsupportedPipelineError("Preprocessor is not a fitted ColumnTransformer")
+
+        blocks: List[FeatureBlock] = []
+        offset = 0
+        for name, transformer, columns in column_transformer.transformers_:
+            if transformer == "drop":
+                continue
+            if name == "remainder" and transformer == "passthrough" and len(columns) == 0:
+                continue
+            if not isinstance(columns, (list, tuple)) or not all(isinstance(c, str) for c in columns):
+                raise UnsupportedPipelineError(f"Transformer {name} must select columns by name")
+
+            steps = _flatten_steps(transformer)
+            for position, column in enumerate(columns):
+                block = _compile_column(name, steps, column, position, offset)
+                blocks.append(block)
+                offset += block.width
+
+        implicit_missing = bool(getattr(column_transformer, "sparse_output_", False))
+        return cls(blocks, offset, implicit_missing)
+
+    def encode_columns(self, columns: Mapping[str, Sequence[Any]]) -> np.ndarray:
+        """
+        Encode column-oriented raw feature values
+
+        Args:
+            columns: Mapping of input column name to its values
+
+        Returns:
+            float32 array of shape (n_rows, n_features)
+        """
+        missing_cols = set(self.input_columns) - set(columns.keys())
+        if missing_cols:
+            raise ValueError(f"Missing required columns: {missing_cols}")
+
+        n_rows = len(columns[self.input_columns[0]])
+        X = np.zeros((n_rows, self.n_features), dtype=np.float64)
+
+        for block in self.blocks:
+            values = columns[block.column]
+            if len(values) != n_rows:
+                raise ValueError(f"Column {block.column} has {len(values)} values, expected {n_rows}")
+
+            if block.kind == "numeric":
+                numeric = np.asarray(values, dtype=np.float64)
+                if block.fill_value is not None:
+                    numeric = np.where(np.isnan(numeric), block.fill_value, numeric)
+                X[:, block.offset] = (numeric - block.mean) / block.scale
+                continue
+
+            codes = self._category_codes(block, values)
+            if block.kind == "ordinal":
+                X[:, block.offset] = codes
+            else:
+                rows = np.flatnonzero(codes >= 0)
+                X[rows, block.offset + codes[rows]] = 1.0
+
+        X = X.astype(np.float32)
+        if self.implicit_missing:
+            X[X == 0] = np.nan
+        return X
+
+    def encode_records(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Encode row-oriented raw feature values
+
+        Args:
+            records: List of dictionaries with the input columns
+
+        Returns:
+            float32 array of shape (n_rows, n_features)
+        """
+        try:
+            columns = {col: [record[col] for record in records] for col in self.input_columns}
+        except KeyError as e:
+            raise ValueError(f"Missing required columns: {{{str(e)}}}")
+        return self.encode_columns(columns)
+
+    def encode_frame(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Encode a DataFrame of raw feature values
+
+        Args:
+            df: Input DataFrame with the input columns
+
+        Returns:
+            float32 array of shape (n_rows, n_features)
+        """
+        missing_cols = set(self.input_columns) - set(df.columns)
+        if missing_cols:
+            raise ValueError(f"Missing required columns: {missing_cols}")
+        # Categorical columns stay dictionary-encoded, see _category_codes
+        return self.encode_columns({
+            col: df[col].array if isinstance(df[col].dtype, pd.CategoricalDtype) else df[col].to_numpy()
+            for col in self.input_columns
+        })
+
+    def _category_codes(self, block: FeatureBlock, values: Sequence[Any]) -> np.ndarray:
+        """Map raw categorical values to category indices (-1 for ignored unknowns)"""
+        if isinstance(values, pd.Categorical):
+            # Dictionary-encoded: map each category used once, then gather by code
+            dictionary = [*values.categories, None]
+            codes = values.codes.astype(np.int64)
+            codes[codes < 0] = len(dictionary) - 1
+            used = np.unique(codes)
+            table = np.full(len(dictionary), -1, dtype=np.int64)
+            table[used] = self._category_codes(block, [dictionary[i] for i in used])
+            return table[codes]
+
+        lookup = block.lookup
+        codes = np.empty(len(values), dtype=np.int64)
+        for i, value in enumerate(values):
+            if _is_missing(value):
+                value = block.fill_value
+            code = lookup.get(value, -1)
+            if code < 0 and block.handle_unknown == "error":
+                raise ValueError(f"Found unknown category {value!r} in column {block.column}")
+            codes[i] = code
+        return codes
+
+
+def _flatten_steps(transformer: Any) -> List[Any]:
+    """Return the fitted steps of a transformer (a Pipeline or a single estimator)"""
+    if transformer == "passthrough":
+        return []
+    if hasattr(transformer, "steps"):
+        return [step for _, step in transformer.steps if step not in (None, "passthrough")]
+    return [transformer]
+
+
+def _compile_column(name: str, steps: List[Any], column: str, position: int, offset: int) -> FeatureBlock:
+    """Compile the steps applied to one input column into a FeatureBlock"""
+    block = FeatureBlock(column, "numeric", offset)
+
+    for step in steps:
+        step_type = type(step).__name__
+
+        if step_type == "SimpleImputer":
+            if getattr(step, "add_indicator", False):
+                raise UnsupportedPipelineError(f"{name}: SimpleImputer add_indicator is not supported")
+            missing_values = step.missing_values
+            if not (missing_values is None or (isinstance(missing_values, float) and math.isnan(missing_values))):
+                raise UnsupportedPipelineError(f"{name}: SimpleImputer must impute NaN values")
+            fill_value = step.statistics_[position]
+            block.fill_value = fill_value.item() if hasattr(fill_value, "item") else fill_value
+
+        elif step_type == "StandardScaler":
+            if block.kind != "numeric":
+                raise UnsupportedPipelineError(f"{name}: StandardScaler after encoding is not supported")
+            if step.mean_ is not None:
+                block.mean = float(step.mean_[position])
+            if step.scale_ is not None:
+                block.scale = float(step.scale_[position])
+
+        elif step_type == "OrdinalEncoder":
+            if step.handle_unknown != "error":
+                raise UnsupportedPipelineError(f"{name}: OrdinalEncoder handle_unknown must be 'error'")
+            block.kind = "ordinal"
+            block.categories = list(step.categories_[position])
+            block.handle_unknown = "error"
+
+        elif step_type == "OneHotEncoder":
+            if getattr(step, "drop_idx_", None) is not None:
+                raise UnsupportedPipelineError(f"{name}: OneHotEncoder drop is not supported")
+            if getattr(step, "_infrequent_enabled", False):
+                raise UnsupportedPipelineError(f"{name}: OneHotEncoder infrequent categories are not supported")
+            block.kind = "onehot"
+            block.categories = list(step.categories_[position])
+            block.handle_unknown = "error" if step.handle_unknown == "error" else "ignore"
+
+        else:
+            raise UnsupportedPipelineError(f"{name}: step {step_type} is not supported")
+
+    block.lookup = {value: index for index, value in enumerate(block.categories)}
+    return block
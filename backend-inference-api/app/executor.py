@@ -0,0 +1,258 @@
+import asyncio
+import logging
+import multiprocessing
+import time
+from collections import OrderedDict
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from app import deadline
+from app.config import settings
+from app.instrumentation import collect_stages, record_stages
+from app.metrics import metrics
+from app.model_loader import ModelLoader
+from app.predict import Predictor, ScoredBatch
+
+logger = logging.getLogger(__name__)
+
+# (stage name, seconds) timed inside a process-pool worker, recorded by the server
+StageTimings = List[Tuple[str, float]]
+
+# Predictor owned by each process-pool worker (set by _init_process_worker)
+_worker_predictor: Optional[Predictor] = None
+# Registry models loaded by a process-pool worker, (model path, artifact path) -> Predictor
+_worker_models: "OrderedDict[Tuple[str, str], Predictor]" = OrderedDict()
+
+
+def _init_process_worker(model_path: str) -> None:
+    """Load the model once per process-pool worker"""
+    global _worker_predictor
+    loader = ModelLoader(model_path)
+    loader.load_model()
+    _worker_predictor = Predictor(loader)
+
+
+def _worker_model(model_path: str, artifact_path: str) -> Predictor:
+    """Predictor for a registry model inside a process-pool worker, loaded on first use"""
+    key = (model_path, artifact_path)
+    if key in _worker_models:
+        _worker_models.move_to_end(key)
+        return _worker_models[key]
+    loader = ModelLoader(model_path, artifact_path)
+    loader.load_model()
+    _worker_models[key] = Predictor(loader)
+    while len(_worker_models) > max(1, settings.MODEL_REGISTRY_MAX_LOADED):
+        _worker_models.popitem(last=False)
+    return _worker_models[key]
+
+
+def _process_call(expires: Optional[float], method: str, *args: Any) -> Tuple[Any, float, float, StageTimings]:
+    """Run a Predictor method inside a process-pool worker"""
+    deadline.check("inference", expires)
+    started = time.monotonic()
+    with collect_stages() as stages:
+        predictions = getattr(_worker_predictor, method)(*args)
+    return predictions, started, time.monotonic(), stages
+
+
+def _process_model_call(
+    expires: Optional[float], model_path: str, artifact_path: str, method: str, *args: Any
+) -> Tuple[Any, float, float, StageTimings]:
+    """Run a Predictor method of a registry model inside a process-pool worker"""
+    deadline.check("inference", expires)
+    started = time.monotonic()
+    with collect_stages() as stages:
+        predictions = getattr(_worker_model(model_path, artifact_path), method)(*args)
+    return predictions, started, time.monotonic(), stages
+
+
+def _thread_call(
+    expires: Optional[float], predictor: Predictor, method: str, *args: Any
+) -> Tuple[Any, float, float, StageTimings]:
+    """Run a Predictor method inside a thread-pool worker (its stages are recorded directly)"""
+    deadline.check("inference", expires)
+    started = time.monotonic()
+    predictions = getattr(predictor, method)(*args)
+    return predictions, started, time.monotonic(), []
+
+
+class InferenceExecutor:
+    """
+    Runs CPU-bound model inference off the asyncio event loop
+
+    Supports a thread pool (shares the loaded model, XGBoost releases the
+    GIL while predicting) or a process pool (each process loads its own
+    copy of the model, no GIL contention for pandas/sklearn work).
+    """
+
+    def __init__(self, predictor: Predictor, kind: str = "thread", max_workers: int = 1):
+        """
+        Initialize InferenceExecutor
+
+        Args:
+            predictor: Predictor used by thread workers
+            kind: "thread" or "process"
+            max_workers: Number of pool workers
+        """
+        if kind not in ("thread", "process"):
+            raise ValueError(f"Executor kind must be 'thread' or 'process', got: {kind}")
+
+        self.predictor = predictor
+        self.kind = kind
+        self.max_workers = max(1, max_workers)
+        self._pool: Optional[Executor] = None
+
+        self._pending = metrics.gauge(
+            "inference_executor_pending", "Inference calls submitted and not yet finished"
+        )
+        self._queue_wait = metrics.histogram(
+            "inference_queue_wait_seconds", "Time inference calls wait for a free executor worker"
+        )
+        self._execution = metrics.histogram(
+            "inference_execution_seconds", "Time spent running inference in an executor worker"
+        )
+        metrics.gauge("inference_executor_workers", "Configured executor workers").set(self.max_workers)
+
+    def start(self) -> None:
+        """Create the worker pool"""
+        if self._pool is not None:
+            return
+
+        if self.kind == "process":
+            # spawn avoids inheriting the event loop and OpenMP thread state from uvicorn
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_process_worker,
+                initargs=(self.predictor.model_loader.model_path,)
+            )
+        else:
+            self._pool = ThreadPoolExecutor(
+                max_workers=self.max_workers,
+                thread_name_prefix="inference"
+            )
+        logger.info(f"Inference executor started ({self.kind}, max_workers={self.max_workers})")
+
+    def refresh(self) -> None:
+        """
+        Replace process-pool workers so they load the current model file
+
+        Thread workers share the ModelLoader and see a reload immediately,
+        so this is a no-op for them. Calls already running on the old
+        process pool finish there.
+        """
+        if self.kind != "process" or self._pool is None:
+            return
+        old_pool = self._pool
+        self._pool = None
+        self.start()
+        old_pool.shutdown(wait=False)
+        logger.info("Process pool replaced after model reload")
+
+    def shutdown(self) -> None:
+        """Shut down the worker pool, dropping calls that have not started"""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+            logger.info("Inference executor stopped")
+
+    async def predict(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Make predictions on a pool worker without blocking the event loop
+
+        Args:
+            df: Input DataFrame with required features
+
+        Returns:
+            Array of predictions
+        """
+        return await self._run("predict", df)
+
+    async def predict_records(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Make predictions on row dictionaries on a pool worker
+
+        Args:
+            records: List of dictionaries with required features
+
+        Returns:
+            Array of predictions
+        """
+        return await self._run("predict_records", records)
+
+    async def score_records(
+        self,
+        records: List[Dict[str, Any]],
+        predictor: Optional[Predictor] = None
+    ) -> ScoredBatch:
+        """
+        Make predictions on row dictionaries on a pool worker, with the model version used
+
+        Args:
+            records: List of dictionaries with required features
+            predictor: Predictor of another model (e.g. from the ModelRegistry);
+                process workers load that model themselves on first use
+
+        Returns:
+            ScoredBatch
+        """
+        return await self._run("score_records", records, predictor=predictor)
+
+    async def score_columns(
+        self,
+        columns: Mapping[str, Any],
+        predictor: Optional[Predictor] = None
+    ) -> ScoredBatch:
+        """
+        Make predictions on column arrays on a pool worker, with the model version used
+
+        Args:
+            columns: Mapping of feature name to NumPy array or pandas Categorical
+            predictor: Predictor of another model (e.g. from the ModelRegistry)
+
+        Returns:
+            ScoredBatch
+        """
+        return await self._run("score_columns", columns, predictor=predictor)
+
+    async def _run(self, method: str, *args: Any, predictor: Optional[Predictor] = None) -> Any:
+        """
+        Submit a Predictor method call to the pool and record its timings
+
+        A call for a request with a deadline raises DeadlineExceeded instead
+        of running if the deadline passes before it is submitted or while it
+        waits for a worker.
+        """
+        if self._pool is None:
+            raise RuntimeError("Inference executor is not running")
+
+        expires = deadline.current()
+        deadline.check("inference", expires)
+        loop = asyncio.get_running_loop()
+        submitted = time.monotonic()
+        self._pending.inc()
+        try:
+            if self.kind == "process" and predictor not in (None, self.predictor):
+                loader = predictor.model_loader
+                future = loop.run_in_executor(
+                    self._pool, _process_model_call, expires, loader.model_path, str(loader.artifact_path), method, *args
+                )
+            elif self.kind == "process":
+                future = loop.run_in_executor(self._pool, _process_call, expires, method, *args)
+            else:
+                future = loop.run_in_executor(
+                    self._pool, _thread_call, expires, predictor or self.predictor, method, *args
+                )
+            predictions, started, finished, stages = await future
+        finally:
+            self._pending.dec()
+
+        # The encode/dedup/predict stages of process workers, timed in their own registries
+        record_stages(stages)
+        # time.monotonic is system-wide on Linux, so process workers' timestamps are comparable
+        self._queue_wait.observe(max(0.0, started - submitted))
+        self._execution.observe(finished - started)
+        return predictions
@@ -0,0 +1,139 @@
+import contextvars
+import time
+from contextlib import contextmanager
+from typing import Iterator, List, Optional, Tuple
+
+from app.metrics import Histogram, metrics
+
+# Request stages, in order:
+#   parse      body read, JSON decoding and pydantic validation (before the handler runs)
+#   dump       model_dump() of the validated rows
+#   frame      DataFrame construction (sklearn pipeline path only)
+#   encode     feature encoding (compiled encoder or ColumnTransformer.transform)
+#   dedup      factorizing the encoded rows so repeated rows are scored once
+#   predict    tree evaluation (NumPy, specialized or XGBoost engine, or the pipeline's regressor)
+#   format     building the response objects
+#   serialize  response validation and JSON rendering (after the handler returns)
+STAGES = ("parse", "dump", "frame", "encode", "dedup", "predict", "format", "serialize")
+
+_stage_histograms = {
+    name: metrics.histogram(f"stage_{name}_seconds", f"Time spent in the {name} stage")
+    for name in STAGES
+}
+
+
+def stage_histogram(name: str) -> Histogram:
+    """Latency histogram of a request stage"""
+    return _stage_histograms[name]
+
+
+# Stage timings being collected for another process, see collect_stages()
+_stage_log: contextvars.ContextVar[Optional[List[Tuple[str, float]]]] = contextvars.ContextVar(
+    "stage_log", default=None
+)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[None]:
+    """Time the enclosed block as one request stage"""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _stage_histograms[name].observe(elapsed)
+        log = _stage_log.get()
+        if log is not None:
+            log.append((name, elapsed))
+
+
+@contextmanager
+def collect_stages() -> Iterator[List[Tuple[str, float]]]:
+    """
+    Also collect the stages timed in the enclosed block as (name, seconds)
+
+    Process-pool workers have their own metrics, which /metrics never sees;
+    they return the collected timings for record_stages() in the server.
+    """
+    log: List[Tuple[str, float]] = []
+    token = _stage_log.set(log)
+    try:
+        yield log
+    finally:
+        _stage_log.reset(token)
+
+
+def record_stages(timings: List[Tuple[str, float]]) -> None:
+    """Record stage timings collected by collect_stages() in another process"""
+    for name, elapsed in timings:
+        _stage_histograms[name].observe(elapsed)
+
+
+class RequestTimer:
+    """
+    Timestamps of the request being handled, for the stages outside the handler
+    """
+
+    __slots__ = ("started", "handler_started", "handler_finished")
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.handler_started: Optional[float] = None
+        self.handler_finished: Optional[float] = None
+
+
+_current_timer: contextvars.ContextVar[Optional[RequestTimer]] = contextvars.ContextVar("request_timer", default=None)
+
+
+def handler_started() -> None:
+    """Call first thing in an instrumented handler: records the parse stage"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.handler_started = time.perf_counter()
+        _stage_histograms["parse"].observe(timer.handler_started - timer.started)
+
+
+def handler_finished() -> None:
+    """Call right before an instrumented handler returns: starts the serialize stage"""
+    timer = _current_timer.get()
+    if timer is not None:
+        timer.handler_finished = time.perf_counter()
+
+
+class InstrumentationMiddleware:
+    """
+    ASGI middleware timing every HTTP request
+
+    Tracks requests in flight and total request latency. For handlers that
+    call handler_started()/handler_finished() it also records the parse
+    stage (request start to handler start) and the serialize stage (handler
+    return to the first response message). Plain ASGI rather than
+    BaseHTTPMiddleware, so the cost per request is a few clock reads.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._in_flight = metrics.gauge("http_requests_in_flight", "HTTP requests being handled")
+        self._latency = metrics.histogram("http_request_seconds", "HTTP request latency until the response is sent")
+        self._serialize = _stage_histograms["serialize"]
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timer = RequestTimer()
+        token = _current_timer.set(timer)
+
+        async def timed_send(message):
+            if message["type"] == "http.response.start" and timer.handler_finished is not None:
+                self._serialize.observe(time.perf_counter() - timer.handler_finished)
+            await send(message)
+
+        self._in_flight.inc()
+        try:
+            await self.app(scope, receive, timed_send)
+        finally:
+            self._in_flight.dec()
+            self._latency.observe(time.perf_counter() - timer.started)
+            _current_timer.reset(token)
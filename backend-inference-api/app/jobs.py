@@ -0,0 +1,412 @@
+import csv
+import json
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.columnar import ColumnValidationError, columns_from_json
+from app.metrics import metrics
+from app.predict import Predictor
+
+logger = logging.getLogger(__name__)
+
+# Files in each job directory
+STATE_FILE = "job.json"
+INPUT_FILE = "input.csv"
+OUTPUT_FILE = "predictions.csv"
+CANCEL_FILE = "cancelled"
+
+# Job states; the last three are final
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+FINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+_JOB_ID = re.compile(r"^[0-9a-f]{32}$")
+
+
+class JobNotFoundError(KeyError):
+    """Raised for an unknown, malformed or evicted job ID"""
+
+
+class JobQueueFullError(RuntimeError):
+    """Raised when this worker already has the maximum number of pending jobs"""
+
+
+class BatchJobManager:
+    """
+    Scores large batches in the background, spooled through files on disk
+
+    A job is a directory under spool_dir holding the input rows as CSV, the
+    predictions as CSV once scoring finishes, and its state as JSON. A
+    thread pool of the worker that accepted the job reads the input in
+    chunks of chunk_rows, validates each chunk a column at a time and
+    scores it, appending to the output; memory is bounded by one chunk.
+    Because the state lives on disk, any worker sharing spool_dir can
+    report status and serve results. Finished jobs are deleted ttl_seconds
+    after they end.
+    """
+
+    def __init__(
+        self,
+        spool_dir: str,
+        predictor: Predictor,
+        categorical: Sequence[str],
+        numeric: Sequence[str],
+        integer: Sequence[str] = (),
+        chunk_rows: int = 10000,
+        workers: int = 1,
+        max_pending: int = 16,
+        ttl_seconds: float = 3600.0
+    ):
+        """
+        Initialize BatchJobManager
+
+        Args:
+            spool_dir: Directory holding one subdirectory per job
+            predictor: Predictor scoring the jobs
+            categorical: Features that must hold strings
+            numeric: Features that must hold numbers
+            integer: Numeric features that must hold whole numbers
+            chunk_rows: Rows read, validated and scored at a time
+            workers: Jobs scored concurrently by this worker process
+            max_pending: Queued and running jobs accepted by this worker process
+            ttl_seconds: Time results of a finished job are kept
+        """
+        self.spool_dir = Path(spool_dir)
+        self.predictor = predictor
+        self.categorical = list(categorical)
+        self.numeric = list(numeric)
+        self.integer = list(integer)
+        self.features = self.categorical + self.numeric
+        self.chunk_rows = max(1, chunk_rows)
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.ttl_seconds = ttl_seconds
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._pending = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._sweeper: Optional[threading.Thread] = None
+
+        self._submitted = metrics.counter("jobs_submitted_total", "Batch jobs accepted")
+        self._finished = {
+            state: metrics.counter(f"jobs_{state}_total", f"Batch jobs {state}")
+            for state in FINAL_STATES
+        }
+        self._rows = metrics.counter("job_rows_total", "Rows scored by batch jobs")
+        self._pending_gauge = metrics.gauge("jobs_pending", "Batch jobs queued or running in this worker")
+        self._evicted = metrics.counter("jobs_evicted_total", "Finished batch jobs deleted after their TTL")
+
+    def start(self) -> None:
+        """Start the job pool and the TTL sweeper"""
+        if self._pool is not None:
+            return
+        self.spool_dir.mkdir(parents=True, exist_ok=True)
+        self._fail_orphaned()
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="batch-job")
+        self._stop.clear()
+        self._sweeper = threading.Thread(target=self._sweep, name="job-sweeper", daemon=True)
+        self._sweeper.start()
+        logger.info(f"Batch jobs spooled in {self.spool_dir} ({self.workers} worker(s), {self.chunk_rows} rows per chunk)")
+
+    def stop(self) -> None:
+        """Stop the sweeper and the pool; running jobs stop after their current chunk"""
+        self._stop.set()
+        if self._sweeper is not None:
+            self._sweeper.join()
+            self._sweeper = None
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def create(self) -> str:
+        """
+        Reserve a job and its spool directory
+
+        Write the input to input_path(job_id), then call submit() (or
+        discard() if the upload fails).
+
+        Raises:
+            JobQueueFullError: If this worker has max_pending jobs already
+        """
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFullError(f"{self._pending} batch jobs already pending")
+            self._pending += 1
+            self._pending_gauge.set(self._pending)
+        job_id = uuid.uuid4().hex
+        (self.spool_dir / job_id).mkdir(parents=True)
+        return job_id
+
+    def input_path(self, job_id: str) -> Path:
+        return self._job_dir(job_id) / INPUT_FILE
+
+    def write_columns(self, job_id: str, columns: Mapping[str, Any]) -> int:
+        """
+        Spool already validated columns as the job's input
+
+        Returns:
+            Number of rows written
+        """
+        frame = pd.DataFrame({feature: columns[feature] for feature in self.features})
+        frame.to_csv(self.input_path(job_id), index=False)
+        return len(frame)
+
+    def submit(self, job_id: str, total_rows: Optional[int] = None) -> Dict[str, Any]:
+        """
+        Queue a job whose input has been spooled
+
+        Args:
+            job_id: ID returned by create()
+            total_rows: Number of input rows, if known (otherwise None until
+                the job has parsed all of its input)
+
+        Returns:
+            State of the queued job
+
+        Raises:
+            ValueError: If the input has no header or lacks a feature column
+                (the job is not queued, discard() it)
+        """
+        try:
+            with open(self.input_path(job_id), newline="") as f:
+                header = next(csv.reader(f), [])
+        except (OSError, UnicodeDecodeError) as e:
+            raise ValueError(f"Unreadable CSV input: {str(e)}")
+        missing_cols = set(self.features) - set(header)
+        if missing_cols:
+            raise ValueError(f"Missing required columns: {missing_cols}")
+
+        now = time.time()
+        state = {
+            "job_id": job_id,
+            "status": QUEUED,
+            "total_rows": total_rows,
+            "rows_done": 0,
+            "model_versions": [],
+            "created_at": now,
+            "started_at": None,
+            "finished_at": None,
+            "expires_at": None,
+            "error": None,
+            "owner_pid": os.getpid(),
+        }
+        self._write_state(job_id, state)
+        self._submitted.inc()
+        self._pool.submit(self._run, job_id)
+        return state
+
+    def discard(self, job_id: str) -> None:
+        """Drop a job that was created but never submitted"""
+        shutil.rmtree(self.spool_dir / job_id, ignore_errors=True)
+        self._release()
+
+    def status(self, job_id: str) -> Dict[str, Any]:
+        """
+        Current state of a job
+
+        Raises:
+            JobNotFoundError: If the job does not exist (any more)
+        """
+        try:
+            with open(self._job_dir(job_id) / STATE_FILE) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            raise JobNotFoundError(f"No batch job {job_id}")
+
+    def result_path(self, job_id: str) -> Path:
+        """
+        Predictions file of a job
+
+        Raises:
+            JobNotFoundError: If the job does not exist (any more)
+            ValueError: If the job has not succeeded
+        """
+        state = self.status(job_id)
+        if state["status"] != SUCCEEDED:
+            raise ValueError(f"Batch job {job_id} is {state['status']}")
+        return self._job_dir(job_id) / OUTPUT_FILE
+
+    def cancel(self, job_id: str) -> Dict[str, Any]:
+        """
+        Cancel a pending job, or delete a finished one with its files
+
+        A running job stops after its current chunk (whichever worker runs it).
+
+        Returns:
+            State of the job when it was cancelled or deleted
+        """
+        state = self.status(job_id)
+        if state["status"] in FINAL_STATES:
+            shutil.rmtree(self._job_dir(job_id), ignore_errors=True)
+            return state
+        (self._job_dir(job_id) / CANCEL_FILE).touch()
+        return state
+
+    def _run(self, job_id: str) -> None:
+        try:
+            state = self.status(job_id)
+        except JobNotFoundError:
+            self._release()
+            return
+
+        job_dir = self._job_dir(job_id)
+        state.update(status=RUNNING, started_at=time.time())
+        self._write_state(job_id, state)
+        partial_output = job_dir / f"{OUTPUT_FILE}.part"
+        try:
+            with open(partial_output, "w", newline="") as output:
+                output.write("predicted_revenue,model_version\n")
+                reader = pd.read_csv(
+                    self.input_path(job_id),
+                    usecols=self.features,
+                    dtype={feature: str for feature in self.categorical},
+                    chunksize=self.chunk_rows
+                )
+                for chunk in reader:
+                    if self._stop.is_set() or (job_dir / CANCEL_FILE).exists():
+                        state["status"] = CANCELLED
+                        break
+                    self._score_chunk(chunk, state, output)
+                    self._write_state(job_id, state)
+            if state["status"] == RUNNING:
+                os.replace(partial_output, job_dir / OUTPUT_FILE)
+                # Every row has been parsed: the count is exact even if the input's was unknown
+                state.update(status=SUCCEEDED, total_rows=state["rows_done"])
+        except Exception as e:
+            state.update(status=FAILED, error=str(e))
+            logger.warning(f"Batch job {job_id} failed after {state['rows_done']} rows: {str(e)}")
+        finally:
+            partial_output.unlink(missing_ok=True)
+            finished = time.time()
+            state.update(finished_at=finished, expires_at=finished + self.ttl_seconds)
+            self._write_state(job_id, state)
+            self._finished[state["status"]].inc()
+            self._release()
+        logger.info(f"Batch job {job_id} {state['status']}: {state['rows_done']} rows")
+
+    def _score_chunk(self, chunk: pd.DataFrame, state: Dict[str, Any], output: Any) -> None:
+        """Validate, score and append one chunk of input rows"""
+        first_row = state["rows_done"]
+        try:
+            # NaN (empty cells) become None, reported as missing values
+            columns = columns_from_json(
+                {
+                    feature: chunk[feature].astype(object).where(chunk[feature].notna(), None).tolist()
+                    for feature in self.features
+                },
+                categorical=self.categorical,
+                numeric=self.numeric,
+                integer=self.integer
+            )
+        except ColumnValidationError as e:
+            error = e.errors[0]
+            row = first_row + (error["loc"][1] if len(error["loc"]) > 1 else 0)
+            raise ValueError(f"Row {row}, column {error['loc'][0]}: {error['msg']} (got {error['input']!r})")
+
+        scored = self.predictor.score_columns(columns)
+        pd.DataFrame({
+            "predicted_revenue": np.asarray(scored.predictions, dtype=np.float64),
+            "model_version": scored.model_version,
+        }).to_csv(output, header=False, index=False)
+
+        state["rows_done"] = first_row + len(chunk)
+        if scored.model_version not in state["model_versions"]:
+            state["model_versions"].append(scored.model_version)
+        self._rows.inc(len(chunk))
+
+    def _sweep(self) -> None:
+        interval = max(1.0, min(60.0, self.ttl_seconds / 2))
+        while not self._stop.wait(interval):
+            try:
+                self.evict_expired()
+            except Exception as e:
+                logger.warning(f"Batch job sweep failed: {str(e)}")
+
+    def evict_expired(self, now: Optional[float] = None) -> int:
+        """
+        Delete finished jobs past their TTL, and directories of jobs never submitted
+
+        Returns:
+            Number of job directories deleted
+        """
+        now = time.time() if now is None else now
+        evicted = 0
+        for job_dir in self.spool_dir.iterdir():
+            if not _JOB_ID.match(job_dir.name):
+                continue
+            try:
+                with open(job_dir / STATE_FILE) as f:
+                    state = json.load(f)
+                expired = state["status"] in FINAL_STATES and state["expires_at"] <= now
+            except (OSError, ValueError, KeyError):
+                # Upload that never completed
+                expired = job_dir.stat().st_mtime + self.ttl_seconds <= now
+            if expired:
+                shutil.rmtree(job_dir, ignore_errors=True)
+                evicted += 1
+        self._evicted.inc(evicted)
+        return evicted
+
+    def _fail_orphaned(self) -> None:
+        """Mark jobs left pending by a worker process that no longer exists as failed"""
+        for job_dir in self.spool_dir.iterdir():
+            if not _JOB_ID.match(job_dir.name):
+                continue
+            try:
+                state = self.status(job_dir.name)
+            except JobNotFoundError:
+                continue
+            if state["status"] in FINAL_STATES or _process_alive(state.get("owner_pid")):
+                continue
+            finished = time.time()
+            state.update(
+                status=FAILED,
+                error="Worker exited before the job finished; resubmit it",
+                finished_at=finished,
+                expires_at=finished + self.ttl_seconds
+            )
+            self._write_state(job_dir.name, state)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._pending = max(0, self._pending - 1)
+            self._pending_gauge.set(self._pending)
+
+    def _job_dir(self, job_id: str) -> Path:
+        if not _JOB_ID.match(job_id):
+            raise JobNotFoundError(f"No batch job {job_id}")
+        return self.spool_dir / job_id
+
+    def _write_state(self, job_id: str, state: Dict[str, Any]) -> None:
+        # Written aside and renamed, so readers in other workers never see a partial file
+        path = self._job_dir(job_id) / STATE_FILE
+        partial = path.with_name(f"{STATE_FILE}.{os.getpid()}.{threading.get_ident()}")
+        with open(partial, "w") as f:
+            json.dump(state, f)
+        os.replace(partial, path)
+
+
+def _process_alive(pid: Optional[int]) -> bool:
+    if not pid:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
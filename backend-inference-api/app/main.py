@@ -1,13 +1,55 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import Depends, FastAPI, HTTPException, Query, Request
+from fastapi.exceptions import RequestValidationError
+from starlette.requests import ClientDisconnect
 from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from typing import List, Optional
+from fastapi.responses import FileResponse, JSONResponse, PlainTextResponse, Response
+from pydantic import BaseModel, ConfigDict, Field, ValidationError
+from typing import Any, AsyncIterator, Dict, List, Literal, Mapping, Optional, Union
+import numpy as np
+import orjson
 import pandas as pd
+import asyncio
 import logging
+import os
+import tempfile
+import time
 from datetime import datetime
 
 from app.model_loader import ModelLoader
-from app.predict import Predictor
+from app.predict import Predictor, ScoredBatch, xgboost_threads
+from app.batching import MicroBatcher
+from app.executor import InferenceExecutor
+from app.metrics import PROMETHEUS_CONTENT_TYPE, SIZE_BUCKETS, SharedMetrics, metrics
+from app.instrumentation import InstrumentationMiddleware, handler_finished, handler_started, stage
+from app.memory import process_memory, worker_memory
+from app.reloader import ModelWatcher
+from app.admin import is_admin, require_admin
+from app.profiling import build_report, profile_call, save_profile
+from app.sampler import StackSampler
+from app.registry import ModelNotFoundError, ModelRegistry
+from app.responses import COMPACT_FORMAT, FULL_FORMAT, columnar_batch_response, compact_batch_response
+from app.columnar import (
+    MEDIA_TYPE as COLUMNAR_MEDIA_TYPE,
+    ColumnarFormatError,
+    ColumnValidationError,
+    columns_from_json,
+    decode as decode_columnar,
+    media_type_matches
+)
+from app.shadow import ShadowScorer
+from app.jobs import BatchJobManager, JobNotFoundError, JobQueueFullError
+from app.warmup import WorkerReadiness
+from app.admission import AdmissionController, AdmissionMiddleware, path_pattern
+from app.deadline import DeadlineExceeded, DeadlineMiddleware, check as check_deadline, expired_requests
+from app.streaming import (
+    NDJSON_MEDIA_TYPE,
+    RequestStreamingResponse,
+    StreamFormatError,
+    ndjson_error,
+    ndjson_predictions,
+    read_ndjson_rows,
+    rows_to_columns
+)
 from app.config import settings
 
 # Configure logging - ensure it goes to stdout/stderr for Docker
@@ -47,6 +89,26 @@ app = FastAPI(
     version="1.0.0"
 )
 
+# Concurrency limit and bounded wait queue in front of the scoring endpoints;
+# requests beyond both are shed with 429/503 and a Retry-After header
+# (added first: innermost, so shed responses still get CORS headers)
+if settings.ADMISSION_MAX_CONCURRENT > 0:
+    app.add_middleware(
+        AdmissionMiddleware,
+        controller=AdmissionController(
+            max_concurrent=settings.ADMISSION_MAX_CONCURRENT,
+            max_queue=settings.ADMISSION_MAX_QUEUE,
+            max_wait_seconds=settings.ADMISSION_MAX_WAIT_SECONDS
+        ),
+        paths=path_pattern(r"/predict(/batch|/stream)?", r"/models/[^/]+/predict(/batch)?")
+    )
+
+# Deadline from the caller's X-Request-Timeout-Ms header; work for a request
+# whose deadline has passed is skipped and answered with 504 (outside the
+# admission middleware, so time spent waiting for a slot counts)
+if settings.REQUEST_DEADLINES_ENABLED:
+    app.add_middleware(DeadlineMiddleware)
+
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
@@ -56,10 +118,84 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Request latency, requests in flight and the parse/serialize stages (outermost)
+app.add_middleware(InstrumentationMiddleware)
+
+# Rows per /predict/batch request
+batch_rows = metrics.histogram("predict_batch_rows", "Rows per /predict/batch request", buckets=SIZE_BUCKETS)
+# Rows scored and streams ended by an error on /predict/stream
+stream_rows = metrics.counter("predict_stream_rows_total", "Rows scored by /predict/stream")
+stream_errors = metrics.counter("predict_stream_errors_total", "/predict/stream requests ended by an error line")
+
 # Initialize model and predictor
 model_loader = ModelLoader()
 predictor = Predictor(model_loader)
 
+# Dedicated pool for CPU-bound inference, keeps the event loop free for /health etc.
+inference_executor = InferenceExecutor(
+    predictor,
+    kind=settings.INFERENCE_EXECUTOR,
+    max_workers=settings.INFERENCE_EXECUTOR_WORKERS
+)
+
+# Optional micro-batcher for concurrent single-row requests
+micro_batcher: Optional[MicroBatcher] = None
+if settings.MICRO_BATCH_ENABLED:
+    micro_batcher = MicroBatcher(
+        predictor,
+        window_ms=settings.MICRO_BATCH_WINDOW_MS,
+        max_batch_size=settings.MICRO_BATCH_MAX_SIZE,
+        max_queue_size=settings.MICRO_BATCH_MAX_QUEUE,
+        executor=inference_executor
+    )
+
+# Every model in MODELS_DIR, loaded on first request to /models/{model_id}/...
+model_registry = ModelRegistry(
+    settings.MODELS_DIR or os.path.dirname(os.path.abspath(model_loader.model_path)),
+    default=predictor,
+    max_loaded=settings.MODEL_REGISTRY_MAX_LOADED,
+    max_bytes=settings.MODEL_REGISTRY_MAX_BYTES
+)
+
+# Scores a sample of traffic with a candidate model in the background
+shadow_scorer: Optional[ShadowScorer] = None
+if settings.SHADOW_MODEL and settings.SHADOW_SAMPLE_RATE > 0:
+    shadow_scorer = ShadowScorer(
+        model_registry,
+        settings.SHADOW_MODEL,
+        sample_rate=settings.SHADOW_SAMPLE_RATE,
+        max_queue=settings.SHADOW_MAX_QUEUE,
+        window=settings.SHADOW_WINDOW_ROWS
+    )
+
+# /metrics covers every worker of the host: each writes its metrics to a file
+# in a shared directory and the scraped worker merges them
+shared_metrics: Optional[SharedMetrics] = None
+if settings.METRICS_SYNC_INTERVAL_SECONDS > 0:
+    shared_metrics = SharedMetrics(
+        metrics,
+        settings.METRICS_DIR or os.path.join(tempfile.gettempdir(), "superkart-metrics"),
+        interval_seconds=settings.METRICS_SYNC_INTERVAL_SECONDS
+    )
+
+# Low-rate stack sampling of every thread, for flame graphs of production traffic
+stack_sampler: Optional[StackSampler] = None
+if settings.SAMPLER_ENABLED:
+    stack_sampler = StackSampler(
+        interval_seconds=settings.SAMPLER_INTERVAL_MS / 1000.0,
+        window_seconds=settings.SAMPLER_WINDOW_SECONDS,
+        include_idle=settings.SAMPLER_INCLUDE_IDLE
+    )
+
+# Reloads the model when the file at MODEL_PATH changes
+model_watcher: Optional[ModelWatcher] = None
+if settings.MODEL_WATCH_INTERVAL_SECONDS > 0:
+    model_watcher = ModelWatcher(
+        model_loader,
+        settings.MODEL_WATCH_INTERVAL_SECONDS,
+        on_reload=lambda loaded: inference_executor.refresh()
+    )
+
 
 class PredictionInput(BaseModel):
     Product_Type: str
@@ -74,8 +210,12 @@ class PredictionInput(BaseModel):
 
 
 class PredictionOutput(BaseModel):
+    # model_version is a field, not pydantic's model_ namespace
+    model_config = ConfigDict(protected_namespaces=())
+    
     predicted_revenue: float
     timestamp: str
+    model_version: Optional[str] = None
 
 
 class BatchPredictionInput(BaseModel):
@@ -83,18 +223,77 @@ class BatchPredictionInput(BaseModel):
 
 
 class BatchPredictionOutput(BaseModel):
+    # model_version is a field, not pydantic's model_ namespace
+    model_config = ConfigDict(protected_namespaces=())
+    
     predictions: List[PredictionOutput]
     total_records: int
     timestamp: str
+    model_version: Optional[str] = None
+
+
+# Features sent as strings (dictionary-encoded in columnar bodies) and as numbers
+CATEGORICAL_FEATURES = [name for name, field in PredictionInput.model_fields.items() if field.annotation is str]
+NUMERIC_FEATURES = [name for name, field in PredictionInput.model_fields.items() if field.annotation is not str]
+INTEGER_FEATURES = [name for name, field in PredictionInput.model_fields.items() if field.annotation is int]
+
+# Large batches scored in the background through files on disk
+batch_jobs = BatchJobManager(
+    settings.JOB_SPOOL_DIR or os.path.join(tempfile.gettempdir(), "superkart-jobs"),
+    predictor,
+    categorical=CATEGORICAL_FEATURES,
+    numeric=NUMERIC_FEATURES,
+    integer=INTEGER_FEATURES,
+    chunk_rows=settings.JOB_CHUNK_ROWS,
+    workers=settings.JOB_WORKERS,
+    max_pending=settings.JOB_MAX_PENDING,
+    ttl_seconds=settings.JOB_TTL_SECONDS
+)
+
+
+def calibrate_xgboost_threads():
+    """Measure from which batch sizes extra XGBoost threads pay off (run once the booster is loaded)"""
+    if xgboost_threads is None or not settings.XGBOOST_THREAD_CALIBRATION:
+        return
+    loaded = model_loader.current
+    X = model_loader.probe_matrix(loaded)
+    if loaded is None or loaded.regressor is None or X is None:
+        return
+    try:
+        xgboost_threads.calibrate(loaded.regressor, X, str(loaded.fingerprint))
+    except Exception as e:
+        logger.warning(f"XGBoost thread calibration failed, keeping XGBOOST_MIN_ROWS_PER_THREAD: {str(e)}")
+
+
+# Warm-up and readiness of this worker
+readiness = WorkerReadiness(
+    model_loader,
+    inference_executor.score_columns,
+    batch_sizes=settings.WARMUP_BATCH_SIZES if settings.WARMUP_ENABLED else [],
+    rounds=settings.WARMUP_ROUNDS,
+    max_latency_ms=settings.READINESS_MAX_LATENCY_MS,
+    retry_seconds=settings.READINESS_RETRY_SECONDS,
+    prepare=calibrate_xgboost_threads
+)
+
+# ?format= of the batch endpoints: one object per row, or a flat array of predictions
+BatchFormat = Literal["full", "compact"]
 
 
 @app.on_event("startup")
 async def startup_event():
     """Load model on startup"""
     try:
-        logger.info(f"Starting model load from: {model_loader.model_path}")
-        model_loader.load_model()
-        logger.info("Model loaded successfully")
+        if model_loader.is_loaded():
+            # Pre-fork mode: loaded by the parent and inherited copy-on-write
+            logger.info(f"Using model loaded before fork (worker {os.getpid()})")
+            # Every worker inherits the counts of the parent's warm-up, which
+            # would be added to the /metrics totals once per worker
+            metrics.reset_counts()
+        else:
+            logger.info(f"Starting model load from: {model_loader.model_path}")
+            model_loader.load_model(background_booster=True)
+            logger.info("Model loaded successfully")
     except FileNotFoundError as e:
         logger.error(f"Model file not found: {str(e)}")
         logger.error("Application will start but will not be able to make predictions")
@@ -105,6 +304,41 @@ async def startup_event():
         logger.error("Application will start but will not be able to make predictions")
         # Don't raise - allow app to start even if model fails
         # Health check will report model_status as "not_loaded"
+    
+    inference_executor.start()
+    # Calibrates, warms up and self-checks in the background; /health/ready answers 503 until done
+    await readiness.start()
+    if micro_batcher is not None:
+        await micro_batcher.start()
+    if model_watcher is not None:
+        await model_watcher.start()
+    if shadow_scorer is not None:
+        shadow_scorer.start()
+    batch_jobs.start()
+    if shared_metrics is not None:
+        # Started per worker, like the sampler: files are named after the worker's pid
+        shared_metrics.start()
+    if stack_sampler is not None:
+        # Started per worker: a thread running in a pre-fork parent would not survive fork()
+        stack_sampler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks on shutdown"""
+    await readiness.stop()
+    if stack_sampler is not None:
+        stack_sampler.stop()
+    if shadow_scorer is not None:
+        shadow_scorer.stop()
+    if model_watcher is not None:
+        await model_watcher.stop()
+    if micro_batcher is not None:
+        await micro_batcher.stop()
+    batch_jobs.stop()
+    inference_executor.shutdown()
+    if shared_metrics is not None:
+        shared_metrics.stop()
 
 
 @app.get("/")
@@ -123,10 +357,11 @@ async def health_check():
     try:
         model_status = "loaded" if model_loader.is_loaded() else "not_loaded"
         # Always return healthy status - app is running even if model isn't loaded
-        # Dependencies can check model_status if needed
+        # Dependencies can check model_status (or use /health/ready) if needed
         return {
             "status": "healthy",
             "model_status": model_status,
+            "ready": readiness.ready,
             "timestamp": datetime.now().isoformat()
         }
     except Exception as e:
@@ -141,67 +376,454 @@ async def health_check():
         }
 
 
+@app.get("/health/live")
+async def liveness():
+    """
+    Liveness probe: the worker process is up and its event loop responds
+    
+    Does not depend on the model, so a worker still loading or warming up
+    is not restarted.
+    """
+    return {"status": "alive", "timestamp": datetime.now().isoformat()}
+
+
+@app.get("/health/ready")
+async def readiness_check():
+    """
+    Readiness probe: 200 once the model is loaded, warmed up and the latency
+    self-check passed, 503 before that (send traffic only to ready workers)
+    """
+    body = {**readiness.as_dict(), "timestamp": datetime.now().isoformat()}
+    return JSONResponse(body, status_code=200 if readiness.ready else 503)
+
+
 @app.post("/predict", response_model=PredictionOutput)
 async def predict_single(input_data: PredictionInput):
     """
     Predict revenue for a single product-store combination
     """
+    handler_started()
+    check_deadline("dump")
     try:
-        # Convert to DataFrame (using model_dump() for Pydantic v2)
-        df = pd.DataFrame([input_data.model_dump()])
+        with stage("dump"):
+            record = input_data.model_dump()
+        if micro_batcher is not None:
+            # Scored together with other concurrent single-row requests
+            predicted_revenue, model_version = await micro_batcher.submit(record)
+        else:
+            # Encoded straight from the row dict (using model_dump() for Pydantic v2)
+            scored = await inference_executor.score_records([record])
+            predicted_revenue = float(scored.predictions[0])
+            model_version = scored.model_version
         
-        # Make prediction
-        prediction = predictor.predict(df)
+        if shadow_scorer is not None:
+            shadow_scorer.submit([record], [predicted_revenue], model_version)
         
-        return PredictionOutput(
-            predicted_revenue=float(prediction[0]),
-            timestamp=datetime.now().isoformat()
-        )
+        with stage("format"):
+            output = PredictionOutput(
+                predicted_revenue=predicted_revenue,
+                timestamp=datetime.now().isoformat(),
+                model_version=model_version
+            )
+        handler_finished()
+        return output
+    except asyncio.QueueFull:
+        logger.warning("Micro-batch queue full, rejecting request")
+        raise HTTPException(status_code=503, detail="Prediction queue is full, retry later")
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
 
 
-@app.post("/predict/batch", response_model=BatchPredictionOutput)
-async def predict_batch(input_data: BatchPredictionInput):
+@app.post(
+    "/predict/batch",
+    response_model=BatchPredictionOutput,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "application/json": {
+                    "schema": {
+                        "anyOf": [
+                            {"$ref": "#/components/schemas/BatchPredictionInput"},
+                            {
+                                "title": "ColumnarBatchPredictionInput",
+                                "type": "object",
+                                "required": ["columns"],
+                                "properties": {
+                                    "columns": {"type": "object", "additionalProperties": {"type": "array"}}
+                                }
+                            }
+                        ]
+                    }
+                },
+                COLUMNAR_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}
+            }
+        }
+    }
+)
+async def predict_batch(
+    request: Request,
+    response_format: BatchFormat = Query(FULL_FORMAT, alias="format")
+):
     """
     Predict revenue for multiple product-store combinations
+    
+    The body is JSON rows ({"data": [...]}), JSON columns ({"columns":
+    {"Product_MRP": [...], ...}}, one list per feature, validated a column
+    at a time) or, with Content-Type application/vnd.superkart.columnar, one
+    binary buffer per feature with the categorical features
+    dictionary-encoded (see app/columnar.py).
+    
+    Accept: application/vnd.superkart.columnar returns the predictions in the
+    binary format. Otherwise ?format=compact returns them as a flat array of
+    floats with a single timestamp and model version, rendered straight from
+    the NumPy array; the default format has one object per row.
+    
+    With PROFILING_ENABLED, an X-Profile: 1 header or ?profile=1 runs the
+    request under the profiler and adds a "profile" breakdown to the response.
     """
+    batch = await read_batch(request)
+    handler_started()
+    check_deadline("dump")
+    if settings.PROFILING_ENABLED and profiling_requested(request):
+        return await profile_batch(batch)
     try:
-        # Convert to DataFrame (using model_dump() for Pydantic v2)
-        data_dicts = [item.model_dump() for item in input_data.data]
-        df = pd.DataFrame(data_dicts)
+        if isinstance(batch, BatchPredictionInput):
+            batch_rows.observe(len(batch.data))
+            
+            # Row dicts (using model_dump() for Pydantic v2)
+            with stage("dump"):
+                data = [item.model_dump() for item in batch.data]
+            
+            # Make predictions
+            scored = await inference_executor.score_records(data)
+        else:
+            # Column arrays go to the encoder as they are
+            data = batch
+            batch_rows.observe(len(next(iter(batch.values()))))
+            scored = await inference_executor.score_columns(batch)
         
-        # Make predictions
-        predictions = predictor.predict(df)
+        if shadow_scorer is not None:
+            shadow_scorer.submit(data, scored.predictions, scored.model_version)
         
-        # Format output
-        prediction_outputs = [
-            PredictionOutput(
-                predicted_revenue=float(pred),
-                timestamp=datetime.now().isoformat()
-            )
-            for pred in predictions
-        ]
+        if media_type_matches(request.headers.get("accept")):
+            handler_finished()
+            return columnar_batch_response(scored)
         
-        return BatchPredictionOutput(
-            predictions=prediction_outputs,
-            total_records=len(predictions),
-            timestamp=datetime.now().isoformat()
-        )
+        if response_format == COMPACT_FORMAT:
+            # Rendered here, so the serialize stage covers it
+            handler_finished()
+            return compact_batch_response(scored)
+        
+        with stage("format"):
+            output = format_batch(scored)
+        handler_finished()
+        return output
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Batch prediction error: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
 
 
+async def read_batch(request: Request) -> Union[BatchPredictionInput, Dict[str, Any]]:
+    """
+    Parse a /predict/batch body according to its Content-Type
+    
+    Returns:
+        BatchPredictionInput for JSON rows, or feature name to column array
+        for JSON columns and binary columnar bodies
+    """
+    body = await request.body()
+    if media_type_matches(request.headers.get("content-type"), COLUMNAR_MEDIA_TYPE):
+        try:
+            columns, _ = decode_columnar(
+                body,
+                categorical=CATEGORICAL_FEATURES,
+                numeric=NUMERIC_FEATURES,
+                integer=INTEGER_FEATURES
+            )
+        except ColumnarFormatError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid columnar batch: {str(e)}")
+        except ColumnValidationError as e:
+            # Same 422 as invalid JSON columns
+            raise RequestValidationError([{**error, "loc": ("body", "columns", *error["loc"])} for error in e.errors])
+        return columns
+    
+    # Errors are reported as 422 responses, like a body validated by FastAPI
+    try:
+        payload = orjson.loads(body)
+    except orjson.JSONDecodeError as e:
+        raise RequestValidationError([{
+            "type": "json_invalid",
+            "loc": ("body", e.pos),
+            "msg": "JSON decode error",
+            "input": {},
+            "ctx": {"error": e.msg}
+        }])
+    
+    if isinstance(payload, dict) and "columns" in payload:
+        try:
+            return columns_from_json(
+                payload["columns"],
+                categorical=CATEGORICAL_FEATURES,
+                numeric=NUMERIC_FEATURES,
+                integer=INTEGER_FEATURES
+            )
+        except ColumnValidationError as e:
+            raise RequestValidationError([{**error, "loc": ("body", "columns", *error["loc"])} for error in e.errors])
+    
+    try:
+        return BatchPredictionInput.model_validate(payload)
+    except ValidationError as e:
+        raise RequestValidationError(
+            [{**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)]
+        )
+
+
+@app.post(
+    "/predict/stream",
+    response_class=RequestStreamingResponse,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {NDJSON_MEDIA_TYPE: {"schema": {"$ref": "#/components/schemas/PredictionInput"}}}
+        }
+    }
+)
+async def predict_stream(request: Request):
+    """
+    Score NDJSON rows as they are uploaded and stream NDJSON predictions back
+    
+    Rows are scored in chunks of STREAM_CHUNK_ROWS as soon as a chunk has
+    arrived, and each chunk's predictions are sent before the next chunk is
+    read, so memory stays bounded by one chunk however long the upload is.
+    Clients must read the response while uploading (full duplex), otherwise
+    both sides end up waiting on full socket buffers.
+    
+    Each prediction is a {"predicted_revenue", "model_version"} line in
+    input order. An invalid row ends the stream with an {"error": {"row",
+    "type", "msg"}} line; its chunk is not scored and later rows are ignored.
+    A request deadline (X-Request-Timeout-Ms) that passes mid-stream ends it
+    the same way, with type "deadline_exceeded".
+    """
+    body_consumed = asyncio.Event()
+    
+    async def body_chunks() -> AsyncIterator[bytes]:
+        async for chunk in request.stream():
+            yield chunk
+        body_consumed.set()
+    
+    return RequestStreamingResponse(
+        stream_predictions(body_chunks()),
+        body_consumed=body_consumed,
+        media_type=NDJSON_MEDIA_TYPE
+    )
+
+
+async def stream_predictions(body: AsyncIterator[bytes]) -> AsyncIterator[bytes]:
+    """Predictions for the NDJSON rows of a request body, one chunk at a time"""
+    first_row = 0
+    try:
+        async for rows in read_ndjson_rows(body, settings.STREAM_CHUNK_ROWS, settings.STREAM_MAX_LINE_BYTES):
+            columns = columns_from_json(
+                rows_to_columns(rows, CATEGORICAL_FEATURES + NUMERIC_FEATURES),
+                categorical=CATEGORICAL_FEATURES,
+                numeric=NUMERIC_FEATURES,
+                integer=INTEGER_FEATURES
+            )
+            scored = await inference_executor.score_columns(columns)
+            stream_rows.inc(len(rows))
+            first_row += len(rows)
+            yield ndjson_predictions(scored.predictions, scored.model_version)
+    except ClientDisconnect:
+        logger.info(f"Client disconnected from /predict/stream after {first_row} rows")
+    except DeadlineExceeded as e:
+        # The response has started, so the stream ends with an error line instead of a 504
+        expired_requests.inc()
+        stream_errors.inc()
+        yield ndjson_error(first_row, "deadline_exceeded", e.detail)
+    except StreamFormatError as e:
+        stream_errors.inc()
+        yield ndjson_error(e.row, "json_invalid", str(e))
+    except ColumnValidationError as e:
+        stream_errors.inc()
+        error = e.errors[0]
+        row = first_row + (error["loc"][1] if len(error["loc"]) > 1 else 0)
+        yield ndjson_error(row, error["type"], f"{error['loc'][0]}: {error['msg']}")
+    except Exception as e:
+        stream_errors.inc()
+        logger.error(f"Streaming prediction error: {str(e)}")
+        yield ndjson_error(first_row, "prediction_error", f"Prediction failed: {str(e)}")
+
+
+@app.post(
+    "/jobs",
+    status_code=202,
+    openapi_extra={
+        "requestBody": {
+            "required": True,
+            "content": {
+                "text/csv": {"schema": {"type": "string"}},
+                "application/json": {"schema": {"$ref": "#/components/schemas/BatchPredictionInput"}},
+                COLUMNAR_MEDIA_TYPE: {"schema": {"type": "string", "format": "binary"}}
+            }
+        }
+    }
+)
+async def submit_job(request: Request):
+    """
+    Submit a batch to be scored in the background
+    
+    The body is a CSV file with a header row (Content-Type: text/csv),
+    written to disk as it is uploaded and validated chunk by chunk while the
+    job runs, or any body accepted by /predict/batch, validated up front.
+    Poll GET /jobs/{job_id} until the status is succeeded or failed, then
+    fetch the predictions as CSV from GET /jobs/{job_id}/result.
+    """
+    try:
+        job_id = batch_jobs.create()
+    except JobQueueFullError as e:
+        raise HTTPException(status_code=503, detail=f"Too many batch jobs pending, retry later ({str(e)})")
+    
+    try:
+        if media_type_matches(request.headers.get("content-type"), "text/csv"):
+            await spool_csv(request, batch_jobs.input_path(job_id))
+            # Quoted fields may span lines, so rows are only counted by the job's CSV parser
+            total_rows = None
+        else:
+            batch = await read_batch(request)
+            if isinstance(batch, BatchPredictionInput):
+                batch = {name: [getattr(item, name) for item in batch.data] for name in PredictionInput.model_fields}
+            total_rows = batch_jobs.write_columns(job_id, batch)
+        state = batch_jobs.submit(job_id, total_rows)
+    except ValueError as e:
+        batch_jobs.discard(job_id)
+        raise HTTPException(status_code=400, detail=str(e))
+    except (HTTPException, RequestValidationError):
+        batch_jobs.discard(job_id)
+        raise
+    except Exception as e:
+        batch_jobs.discard(job_id)
+        logger.error(f"Batch job submission error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch job submission failed: {str(e)}")
+    
+    return {
+        **state,
+        "status_url": f"/jobs/{job_id}",
+        "result_url": f"/jobs/{job_id}/result"
+    }
+
+
+async def spool_csv(request: Request, path: str) -> None:
+    """Write a CSV request body to disk as it arrives"""
+    with open(path, "wb") as f:
+        async for chunk in request.stream():
+            f.write(chunk)
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """Get the status and progress of a batch job"""
+    try:
+        return batch_jobs.status(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+
+@app.get("/jobs/{job_id}/result", response_class=FileResponse)
+async def job_result(job_id: str):
+    """Download the predictions of a succeeded batch job as CSV, in input order"""
+    try:
+        path = batch_jobs.result_path(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return FileResponse(path, media_type="text/csv", filename=f"predictions-{job_id}.csv")
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a pending batch job, or delete a finished one and its results"""
+    try:
+        return batch_jobs.cancel(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+
+
+def profiling_requested(request: Request) -> bool:
+    """True if the request asks to be profiled and may be"""
+    flag = request.headers.get("x-profile") or request.query_params.get("profile")
+    if flag not in ("1", "true", "yes"):
+        return False
+    if settings.ADMIN_TOKEN and not is_admin(request.headers.get("x-admin-token")):
+        raise HTTPException(status_code=403, detail="Profiling requires a valid X-Admin-Token")
+    return True
+
+
+async def profile_batch(batch: Union[BatchPredictionInput, Mapping[str, Any]]) -> JSONResponse:
+    """Score a batch under cProfile and return the predictions with the profile"""
+    def profiled_batch() -> BatchPredictionOutput:
+        # Everything on one thread, the profiler only sees the thread it runs on
+        if isinstance(batch, BatchPredictionInput):
+            return format_batch(predictor.score_records([item.model_dump() for item in batch.data]))
+        return format_batch(predictor.score_columns(batch))
+    
+    try:
+        loop = asyncio.get_running_loop()
+        output, profile = await loop.run_in_executor(None, profile_call, profiled_batch)
+        report = build_report(profile, profiled_batch.__name__)
+        if settings.PROFILING_OUTPUT_DIR:
+            report["profile_file"] = save_profile(profile, settings.PROFILING_OUTPUT_DIR, "predict-batch")
+    except Exception as e:
+        logger.error(f"Profiled batch prediction error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+    
+    logger.info(f"Profiled /predict/batch with {len(output.predictions)} rows: {report['total_ms']:.1f}ms")
+    return JSONResponse(content={**output.model_dump(), "profile": report})
+
+
+def format_batch(scored: ScoredBatch) -> BatchPredictionOutput:
+    """Build the batch response for scored rows"""
+    # One timestamp for the whole batch, the rows are scored together
+    timestamp = datetime.now().isoformat()
+    prediction_outputs = [
+        PredictionOutput(
+            predicted_revenue=pred,
+            timestamp=timestamp,
+            model_version=scored.model_version
+        )
+        for pred in np.asarray(scored.predictions, dtype=np.float64).tolist()
+    ]
+    
+    return BatchPredictionOutput(
+        predictions=prediction_outputs,
+        total_records=len(prediction_outputs),
+        timestamp=timestamp,
+        model_version=scored.model_version
+    )
+
+
 @app.get("/model/info")
 async def model_info():
     """Get model information"""
-    if model_loader.model is None:
+    if not model_loader.is_loaded():
         raise HTTPException(status_code=503, detail="Model not loaded")
     
+    return describe_model(model_loader)
+
+
+def describe_model(loader: ModelLoader) -> dict:
+    """Model information returned by /model/info and /models/{model_id}/info"""
     return {
-        "model_type": type(model_loader.model).__name__,
+        "model_type": loader.model_type,
+        "model_source": loader.source,
+        "model_version": loader.version,
+        "model_generation": loader.generation,
         "model_loaded": True,
         "expected_features": [
             "Product_Type",
@@ -214,4 +836,187 @@ async def model_info():
             "Product_Allocated_Area",
             "Store_Establishment_Year"
         ]
-    }
\ No newline at end of file
+    }
+
+
+async def registry_predictor(model_id: str) -> Predictor:
+    """Predictor of a registry model, loading it off the event loop on first use"""
+    try:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, model_registry.get, model_id)
+    except ModelNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e.args[0]))
+    except Exception as e:
+        logger.error(f"Failed to load model {model_id}: {str(e)}")
+        raise HTTPException(status_code=503, detail=f"Model {model_id} could not be loaded: {str(e)}")
+
+
+@app.get("/models")
+async def list_models():
+    """List the models in the models directory and whether they are loaded"""
+    loop = asyncio.get_running_loop()
+    models = await loop.run_in_executor(None, model_registry.list_models)
+    return {
+        "models": models,
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/models/{model_id}/info")
+async def registry_model_info(model_id: str):
+    """Get information on a model by name or version, loading it if needed"""
+    model_predictor = await registry_predictor(model_id)
+    if not model_predictor.model_loader.is_loaded():
+        raise HTTPException(status_code=503, detail="Model not loaded")
+    return describe_model(model_predictor.model_loader)
+
+
+@app.post("/models/{model_id}/predict", response_model=PredictionOutput)
+async def registry_predict_single(model_id: str, input_data: PredictionInput):
+    """
+    Predict revenue for a single row with a model chosen by name or version
+    """
+    model_predictor = await registry_predictor(model_id)
+    try:
+        scored = await inference_executor.score_records([input_data.model_dump()], predictor=model_predictor)
+        return PredictionOutput(
+            predicted_revenue=float(scored.predictions[0]),
+            timestamp=datetime.now().isoformat(),
+            model_version=scored.model_version
+        )
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        logger.error(f"Prediction error ({model_id}): {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Prediction failed: {str(e)}")
+
+
+@app.post("/models/{model_id}/predict/batch", response_model=BatchPredictionOutput)
+async def registry_predict_batch(
+    model_id: str,
+    input_data: BatchPredictionInput,
+    response_format: BatchFormat = Query(FULL_FORMAT, alias="format")
+):
+    """
+    Predict revenue for multiple rows with a model chosen by name or version
+    """
+    model_predictor = await registry_predictor(model_id)
+    try:
+        data_dicts = [item.model_dump() for item in input_data.data]
+        scored = await inference_executor.score_records(data_dicts, predictor=model_predictor)
+        if response_format == COMPACT_FORMAT:
+            return compact_batch_response(scored)
+        return format_batch(scored)
+    except DeadlineExceeded:
+        raise
+    except Exception as e:
+        logger.error(f"Batch prediction error ({model_id}): {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch prediction failed: {str(e)}")
+
+
+@app.get("/shadow/stats")
+async def shadow_stats():
+    """
+    Get divergence between the primary and the shadow model
+    
+    One entry per (primary version, shadow version) pair with the mean,
+    maximum and percentiles of the absolute difference of the predictions.
+    """
+    if shadow_scorer is None:
+        raise HTTPException(status_code=404, detail="Shadow scoring is not enabled (set SHADOW_MODEL and SHADOW_SAMPLE_RATE)")
+    
+    return {
+        "shadow_model": shadow_scorer.shadow_model,
+        "sample_rate": shadow_scorer.sample_rate,
+        "pairs": shadow_scorer.snapshot(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/admin/profile/flamegraph", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def flamegraph(seconds: Optional[float] = None):
+    """
+    Collapsed stacks sampled in this worker over the last seconds (default: the whole window)
+    
+    One "thread;outer;...;inner count" line per stack; render with
+    flamegraph.pl, inferno-flamegraph or speedscope.
+    """
+    if stack_sampler is None:
+        raise HTTPException(status_code=404, detail="Sampling profiler is disabled (SAMPLER_ENABLED=false)")
+    return PlainTextResponse(stack_sampler.collapsed(seconds))
+
+
+@app.post("/admin/model/reload", dependencies=[Depends(require_admin)])
+async def reload_model():
+    """
+    Reload the model from MODEL_PATH without downtime
+    
+    The current version keeps serving until the new one is loaded and
+    warmed; the response is sent once requests on the old version drained.
+    """
+    previous_version = model_loader.version
+    started = time.monotonic()
+    try:
+        loop = asyncio.get_running_loop()
+        loaded = await loop.run_in_executor(None, model_loader.reload_model)
+        inference_executor.refresh()
+    except FileNotFoundError as e:
+        raise HTTPException(status_code=404, detail=f"Model reload failed: {str(e)}")
+    except Exception as e:
+        logger.error(f"Model reload error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Model reload failed: {str(e)}")
+    
+    return {
+        "previous_version": previous_version,
+        "model_version": loaded.version,
+        "model_generation": loaded.generation,
+        "model_source": loaded.source,
+        "duration_seconds": round(time.monotonic() - started, 3),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/stats")
+async def stats():
+    """Get runtime metrics for this worker"""
+    return {
+        "metrics": metrics.snapshot(),
+        "timestamp": datetime.now().isoformat()
+    }
+
+
+@app.get("/metrics")
+async def prometheus_metrics():
+    """
+    Runtime metrics of all workers in the Prometheus text format
+    
+    Includes per-stage latency histograms (stage_<name>_seconds, see
+    app/instrumentation.py), batch sizes, requests in flight and model
+    load time. Counters and histograms are summed over the workers of the
+    host (including ones that have exited), gauges have one series per
+    live worker with a pid label. With METRICS_SYNC_INTERVAL_SECONDS=0
+    only the scraped worker's metrics are served.
+    """
+    if shared_metrics is None:
+        return Response(content=metrics.render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
+    content = await asyncio.get_running_loop().run_in_executor(None, shared_metrics.render)
+    return Response(content=content, media_type=PROMETHEUS_CONTENT_TYPE)
+
+
+@app.get("/stats/memory")
+async def memory_stats():
+    """
+    Get RSS and unique/shared memory of this worker and its sibling workers
+    
+    Sizes are in bytes; empty lists where /proc is not available.
+    """
+    workers = worker_memory()
+    return {
+        "worker": process_memory(os.getpid()),
+        "workers": workers,
+        "totals": {
+            name: sum(entry[name] for entry in workers)
+            for name in ("rss", "pss", "shared", "unique")
+        },
+        "timestamp": datetime.now().isoformat()
+    }
@@ -0,0 +1,90 @@
+import logging
+import os
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# smaps_rollup fields (kB) summed into each reported figure
+_SHARED_FIELDS = ("Shared_Clean", "Shared_Dirty")
+_UNIQUE_FIELDS = ("Private_Clean", "Private_Dirty")
+
+
+def process_memory(pid: int) -> Optional[Dict[str, int]]:
+    """
+    Memory use of one process, in bytes
+
+    Reads /proc/<pid>/smaps_rollup (Linux). "unique" is memory only this
+    process maps (what killing it would free), "shared" is memory mapped
+    by other processes too, such as model pages inherited copy-on-write
+    from a pre-fork parent, and "pss" splits shared pages evenly between
+    the processes mapping them.
+
+    Args:
+        pid: Process id
+
+    Returns:
+        Dictionary with pid, rss, pss, shared and unique, or None if the
+        process is gone or /proc is not available
+    """
+    fields: Dict[str, int] = {}
+    try:
+        with open(f"/proc/{pid}/smaps_rollup") as f:
+            for line in f:
+                parts = line.split()
+                if len(parts) == 3 and parts[2] == "kB":
+                    fields[parts[0].rstrip(":")] = int(parts[1]) * 1024
+    except (FileNotFoundError, ProcessLookupError, PermissionError):
+        return None
+    except OSError as e:
+        logger.debug(f"Cannot read memory of process {pid}: {str(e)}")
+        return None
+
+    return {
+        "pid": pid,
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": sum(fields.get(name, 0) for name in _SHARED_FIELDS),
+        "unique": sum(fields.get(name, 0) for name in _UNIQUE_FIELDS),
+    }
+
+
+def child_pids(pid: int) -> List[int]:
+    """Direct children of a process"""
+    try:
+        with open(f"/proc/{pid}/task/{pid}/children") as f:
+            return [int(child) for child in f.read().split()]
+    except OSError:
+        return []
+
+
+def worker_memory(parent_pid: Optional[int] = None) -> List[Dict[str, int]]:
+    """
+    Memory use of every worker of a server
+
+    Args:
+        parent_pid: Supervisor process (defaults to this process's parent,
+            i.e. the siblings of the calling worker)
+
+    Returns:
+        process_memory() for each child of parent_pid that could be read
+    """
+    parent_pid = parent_pid or os.getppid()
+    report = [process_memory(pid) for pid in child_pids(parent_pid)]
+    return [entry for entry in report if entry is not None]
+
+
+def format_report(report: List[Dict[str, int]]) -> str:
+    """One line per process plus a total, sizes in MiB"""
+    lines = [f"{'pid':>8} {'rss':>9} {'pss':>9} {'shared':>9} {'unique':>9}"]
+    for entry in report:
+        lines.append(
+            f"{entry['pid']:>8} " + " ".join(
+                f"{entry[name] / 2 ** 20:>9.1f}" for name in ("rss", "pss", "shared", "unique")
+            )
+        )
+    lines.append(
+        f"{'total':>8} " + " ".join(
+            f"{sum(entry[name] for entry in report) / 2 ** 20:>9.1f}" for name in ("rss", "pss", "shared", "unique")
+        )
+    )
+    return "\n".join(lines)
@@ -0,0 +1,402 @@
+import bisect
+import json
+import logging
+import math
+import os
+import threading
+from typing import Dict, Any, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Default latency buckets in seconds (0.5ms .. 10s)
+DEFAULT_LATENCY_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0
+)
+
+# Buckets for row counts (batch sizes)
+SIZE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+
+# Content type of the Prometheus text exposition format (Starlette appends "; charset=utf-8")
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+
+class Counter:
+    """
+    Monotonically increasing counter
+    """
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase the counter by amount"""
+        with self._lock:
+            self._value += amount
+
+    def reset(self) -> None:
+        """Start counting from zero"""
+        with self._lock:
+            self._value = 0.0
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Gauge:
+    """
+    Value that can go up and down (queue depth, configured limits, ...)
+    """
+
+    def __init__(self, name: str, description: str = ""):
+        self.name = name
+        self.description = description
+        self._value = 0.0
+        self._lock = threading.Lock()
+
+    def set(self, value: float) -> None:
+        """Set the gauge to value"""
+        with self._lock:
+            self._value = float(value)
+
+    def inc(self, amount: float = 1.0) -> None:
+        """Increase the gauge by amount"""
+        with self._lock:
+            self._value += amount
+
+    def dec(self, amount: float = 1.0) -> None:
+        """Decrease the gauge by amount"""
+        with self._lock:
+            self._value -= amount
+
+    @property
+    def value(self) -> float:
+        return self._value
+
+
+class Histogram:
+    """
+    Distribution of observed values over fixed cumulative buckets
+    """
+
+    def __init__(self, name: str, description: str = "", buckets: Optional[Sequence[float]] = None):
+        self.name = name
+        self.description = description
+        self.buckets = tuple(sorted(buckets or DEFAULT_LATENCY_BUCKETS))
+        # One extra slot for observations above the largest bucket (+Inf)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._count = 0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float) -> None:
+        """Record a single observation"""
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+
+    def reset(self) -> None:
+        """Drop every observation"""
+        with self._lock:
+            self._counts = [0] * (len(self.buckets) + 1)
+            self._sum = 0.0
+            self._count = 0
+
+    @property
+    def value(self) -> Dict[str, float]:
+        with self._lock:
+            count, total = self._count, self._sum
+        return {
+            "count": count,
+            "sum": total,
+            "avg": total / count if count else 0.0
+        }
+
+    def cumulative(self) -> Tuple[List[Tuple[float, int]], float, int]:
+        """
+        Consistent copy of the histogram in Prometheus form
+
+        Returns:
+            Tuple of ([(upper bound, observations <= bound), ..., (+Inf, count)], sum, count)
+        """
+        with self._lock:
+            counts, total, count = list(self._counts), self._sum, self._count
+        running = 0
+        buckets = []
+        for bound, bucket_count in zip(self.buckets + (math.inf,), counts):
+            running += bucket_count
+            buckets.append((bound, running))
+        return buckets, total, count
+
+
+class MetricsRegistry:
+    """
+    Process-local registry of named metrics
+
+    Metrics are created on first use and shared by name, so modules can
+    declare the metrics they update without coordinating with each other.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name: str, description: str, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = cls(name, description, **kwargs)
+                self._metrics[name] = metric
+            elif not isinstance(metric, cls):
+                raise ValueError(f"Metric {name} already registered as {type(metric).__name__}")
+            return metric
+
+    def counter(self, name: str, description: str = "") -> Counter:
+        """Get or create a counter"""
+        return self._get_or_create(Counter, name, description)
+
+    def gauge(self, name: str, description: str = "") -> Gauge:
+        """Get or create a gauge"""
+        return self._get_or_create(Gauge, name, description)
+
+    def histogram(
+        self,
+        name: str,
+        description: str = "",
+        buckets: Optional[Sequence[float]] = None
+    ) -> Histogram:
+        """Get or create a histogram"""
+        return self._get_or_create(Histogram, name, description, buckets=buckets)
+
+    def reset_counts(self) -> None:
+        """Zero every counter and histogram, keeping the gauges"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for metric in metrics:
+            if not isinstance(metric, Gauge):
+                metric.reset()
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get current value of every registered metric
+
+        Returns:
+            Dictionary mapping metric name to its current value
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {metric.name: metric.value for metric in metrics}
+
+    def export(self) -> Dict[str, Dict[str, Any]]:
+        """
+        JSON-serializable copy of every registered metric, for render_workers
+
+        Returns:
+            Metric name to {"type", "help"} plus "value" (counters and gauges)
+            or "buckets" ([upper bound, cumulative count] pairs), "sum" and
+            "count" (histograms)
+        """
+        with self._lock:
+            metrics = list(self._metrics.values())
+
+        exported = {}
+        for metric in metrics:
+            entry: Dict[str, Any] = {"help": metric.description}
+            if isinstance(metric, Histogram):
+                buckets, total, count = metric.cumulative()
+                # +Inf is not valid JSON; it is always the last bucket
+                entry.update(
+                    type="histogram", buckets=[[bound, n] for bound, n in buckets[:-1]], sum=total, count=count
+                )
+            else:
+                entry.update(type="counter" if isinstance(metric, Counter) else "gauge", value=metric.value)
+            exported[metric.name] = entry
+        return exported
+
+    def render_prometheus(self) -> str:
+        """
+        Render every registered metric in the Prometheus text exposition format
+
+        Returns:
+            Text served with PROMETHEUS_CONTENT_TYPE
+        """
+        return render_workers([(None, self.export())])
+
+
+def render_workers(workers: Sequence[Tuple[Optional[int], Dict[str, Dict[str, Any]]]]) -> str:
+    """
+    Render the exported metrics of one or more workers as one exposition
+
+    Counters and histograms are summed over the workers. Gauges (queue
+    depths, configured limits, ...) do not add up, so each worker's is
+    rendered as its own series with a pid label; a None pid renders them
+    without labels.
+
+    Args:
+        workers: (pid, MetricsRegistry.export()) per worker
+
+    Returns:
+        Text served with PROMETHEUS_CONTENT_TYPE
+    """
+    merged: Dict[str, Dict[str, Any]] = {}
+    for pid, exported in workers:
+        for name, entry in exported.items():
+            current = merged.get(name)
+            if current is None:
+                current = merged[name] = {"type": entry["type"], "help": entry["help"], "series": []}
+                if entry["type"] == "histogram":
+                    current.update(buckets=[[bound, 0] for bound, _ in entry["buckets"]], sum=0.0, count=0)
+                elif entry["type"] == "counter":
+                    current["value"] = 0.0
+            if current["type"] != entry["type"]:
+                continue
+            if entry["type"] == "histogram":
+                if len(entry["buckets"]) != len(current["buckets"]):
+                    continue
+                for bucket, (_, count) in zip(current["buckets"], entry["buckets"]):
+                    bucket[1] += count
+                current["sum"] += entry["sum"]
+                current["count"] += entry["count"]
+            elif entry["type"] == "counter":
+                current["value"] += entry["value"]
+            else:
+                current["series"].append((pid, entry["value"]))
+
+    lines = []
+    for name in sorted(merged):
+        metric = merged[name]
+        if metric["help"]:
+            description = metric["help"].replace("\\", "\\\\").replace("\n", "\\n")
+            lines.append(f"# HELP {name} {description}")
+        lines.append(f"# TYPE {name} {metric['type']}")
+        if metric["type"] == "histogram":
+            for bound, bucket_count in metric["buckets"]:
+                lines.append(f'{name}_bucket{{le="{_format_bound(bound)}"}} {bucket_count}')
+            lines.append(f'{name}_bucket{{le="+Inf"}} {metric["count"]}')
+            lines.append(f"{name}_sum {_format_value(metric['sum'])}")
+            lines.append(f"{name}_count {metric['count']}")
+        elif metric["type"] == "counter":
+            lines.append(f"{name} {_format_value(metric['value'])}")
+        else:
+            for pid, value in sorted(metric["series"], key=lambda series: series[0] or 0):
+                labels = "" if pid is None else f'{{pid="{pid}"}}'
+                lines.append(f"{name}{labels} {_format_value(value)}")
+    return "\n".join(lines) + "\n"
+
+
+class SharedMetrics:
+    """
+    Metrics of every worker process on the host, served by whichever worker is scraped
+
+    Each worker writes MetricsRegistry.export() to <directory>/<pid>.json
+    every interval_seconds, and once more right before it renders a scrape,
+    so every worker's part of the totals only ever grows between scrapes.
+    Files of workers that have exited are kept: their counters and
+    histograms stay in the sums (otherwise totals would drop when a worker
+    is replaced), their gauges are left out. The directory must be emptied
+    when the server starts (entrypoint.sh does).
+    """
+
+    def __init__(self, registry: MetricsRegistry, directory: str, interval_seconds: float = 1.0, pid: Optional[int] = None):
+        """
+        Initialize SharedMetrics
+
+        Args:
+            registry: This worker's registry
+            directory: Directory shared by the workers of the host
+            interval_seconds: Time between writes of this worker's file
+            pid: Process ID the file is named after (default: this process)
+        """
+        self.registry = registry
+        self.directory = directory
+        self.interval_seconds = interval_seconds
+        self.pid = pid or os.getpid()
+        self._write_lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> None:
+        """Write this worker's metrics now and then every interval_seconds"""
+        os.makedirs(self.directory, exist_ok=True)
+        self.write()
+        self._stopped.clear()
+        self._thread = threading.Thread(target=self._run, name="metrics-writer", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        """Stop the writer after a last write"""
+        self._stopped.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.write()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.interval_seconds):
+            self.write()
+
+    def write(self) -> None:
+        """Replace this worker's file with its current metrics"""
+        path = os.path.join(self.directory, f"{self.pid}.json")
+        try:
+            with self._write_lock:
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(self.registry.export(), f)
+                os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"Could not write worker metrics to {path}: {str(e)}")
+
+    def render(self) -> str:
+        """Metrics of all workers in the Prometheus text format"""
+        self.write()
+        workers = []
+        try:
+            names = sorted(os.listdir(self.directory))
+        except OSError:
+            names = []
+        for name in names:
+            if not name.endswith(".json"):
+                continue
+            try:
+                pid = int(name[:-len(".json")])
+                with open(os.path.join(self.directory, name)) as f:
+                    exported = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if pid != self.pid and not _alive(pid):
+                exported = {key: entry for key, entry in exported.items() if entry["type"] != "gauge"}
+            workers.append((pid, exported))
+        return render_workers(workers)
+
+
+def _alive(pid: int) -> bool:
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def _format_bound(bound: float) -> str:
+    return "+Inf" if math.isinf(bound) else repr(float(bound))
+
+
+def _format_value(value: float) -> str:
+    if math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+# Global registry used by the whole service
+metrics = MetricsRegistry()
@@ -1,39 +1,193 @@
 import joblib
 import logging
 import os
+import threading
+import time
+import numpy as np
+import pandas as pd
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Any
+from typing import Iterator, Optional, Any
 
 from app.config import settings
+from app.encoder import CompiledEncoder, UnsupportedPipelineError
+from app.tree_ensemble import TreeEnsemble, UnsupportedBoosterError
+from app.specialize import EnsembleSpecializer
+from app.artifact import ArtifactError, ModelArtifact, default_artifact_path, file_sha256
+from app.metrics import metrics
 
 logger = logging.getLogger(__name__)
 
 
+class LoadedModel:
+    """
+    One loaded version of the model and everything compiled from it
+    
+    Built completely before ModelLoader publishes it and not changed
+    afterwards (apart from a booster attached by a background thread), so a
+    request holding a reference scores every row with one consistent
+    version even while a reload swaps in the next one.
+    """
+    
+    def __init__(self, sha256: str, source: str, model_type: str, model: Optional[Any] = None):
+        """
+        Initialize LoadedModel
+        
+        Args:
+            sha256: Hex sha256 of the joblib model file
+            source: "joblib" or "artifact" (see app/artifact.py)
+            model_type: Class name of the fitted model
+            model: Unpickled sklearn pipeline (None when loaded from an artifact)
+        """
+        self.model = model
+        # Fast path built from the fitted pipeline (None if it cannot be compiled)
+        self.encoder: Optional[CompiledEncoder] = None
+        self.regressor: Optional[Any] = None
+        self.ensemble: Optional[TreeEnsemble] = None
+        self.specializer: Optional[EnsembleSpecializer] = None
+        self.sha256 = sha256
+        # 64-bit hash of the model file, identifies the model across processes
+        self.fingerprint = int.from_bytes(bytes.fromhex(sha256)[:8], "little")
+        # Reported to clients; derived from the file so every worker agrees
+        self.version = sha256[:12]
+        self.source = source
+        self.model_type = model_type
+        # Set when published; increases with every load, lets caches detect a swap
+        self.generation = 0
+        # Requests currently scoring with this version (guarded by ModelLoader._lock)
+        self.in_flight = 0
+    
+    @property
+    def compiled(self) -> bool:
+        """True when rows can be scored with the compiled encoder and a NumPy or XGBoost engine"""
+        return self.encoder is not None and (self.regressor is not None or self.ensemble is not None)
+
+
 class ModelLoader:
     """
     Handles loading of pretrained machine learning models
     Designed for inference-only operations (no training)
+    
+    The model being served is a LoadedModel that is replaced atomically:
+    reload_model() builds and warms the new version while the old one keeps
+    serving, swaps the reference, then waits for requests still running on
+    the old version to finish.
     """
     
-    def __init__(self, model_path: Optional[str] = None):
+    def __init__(self, model_path: Optional[str] = None, artifact_path: Optional[str] = None):
         """
         Initialize ModelLoader
         
         Args:
             model_path: Optional path to model file. If not provided, uses settings.MODEL_PATH
+            artifact_path: Optional artifact directory. If not provided, uses
+                settings.MODEL_ARTIFACT_PATH or the model path with an .artifact suffix
         """
         self.model_path = model_path or settings.MODEL_PATH
-        self.model: Optional[Any] = None
-        self._is_loaded = False
+        self.artifact_path = Path(
+            artifact_path or settings.MODEL_ARTIFACT_PATH or default_artifact_path(self.model_path)
+        )
+        self._current: Optional[LoadedModel] = None
+        self._generation = 0
+        # Guards _current and the in_flight counters, notified when a request finishes
+        self._lock = threading.Condition()
+        # One reload at a time
+        self._reload_lock = threading.Lock()
+        self._booster_thread: Optional[threading.Thread] = None
+        
+        self._load_seconds = metrics.histogram("model_load_seconds", "Time to load (and on reload, warm) a model")
+        self._reloads = metrics.counter("model_reloads_total", "Models swapped in by reload_model")
+        self._reload_failures = metrics.counter("model_reload_failures_total", "Reloads that kept the old model")
+        self._generation_gauge = metrics.gauge("model_generation", "Number of models loaded by this worker")
+        self._last_load_seconds = metrics.gauge("model_last_load_seconds", "Duration of the most recent model load")
+    
+    @property
+    def current(self) -> Optional[LoadedModel]:
+        """The version being served (None before the first successful load)"""
+        return self._current
     
-    def load_model(self) -> None:
+    # Attributes of the version being served, for callers that do not need a
+    # consistent snapshot (use acquire() when scoring)
+    
+    @property
+    def model(self) -> Optional[Any]:
+        return self._current.model if self._current else None
+    
+    @property
+    def encoder(self) -> Optional[CompiledEncoder]:
+        return self._current.encoder if self._current else None
+    
+    @property
+    def regressor(self) -> Optional[Any]:
+        return self._current.regressor if self._current else None
+    
+    @property
+    def ensemble(self) -> Optional[TreeEnsemble]:
+        return self._current.ensemble if self._current else None
+    
+    @property
+    def specializer(self) -> Optional[EnsembleSpecializer]:
+        return self._current.specializer if self._current else None
+    
+    @property
+    def fingerprint(self) -> int:
+        return self._current.fingerprint if self._current else 0
+    
+    @property
+    def generation(self) -> int:
+        return self._current.generation if self._current else 0
+    
+    @property
+    def version(self) -> Optional[str]:
+        return self._current.version if self._current else None
+    
+    @property
+    def source(self) -> Optional[str]:
+        return self._current.source if self._current else None
+    
+    @property
+    def model_type(self) -> Optional[str]:
+        return self._current.model_type if self._current else None
+    
+    @property
+    def compiled(self) -> bool:
+        return self._current is not None and self._current.compiled
+    
+    def load_model(self, use_artifact: Optional[bool] = None, background_booster: bool = False) -> None:
         """
         Load pretrained model from file
         
+        Uses the memory-mapped artifact built from the model file when one
+        exists and its checksum matches, otherwise unpickles the joblib file.
+        
+        Args:
+            use_artifact: Try the artifact first (defaults to settings.MODEL_ARTIFACT_ENABLED)
+            background_booster: Load the artifact's XGBoost booster (and the
+                xgboost import, most of the cold start) on a background thread;
+                the NumPy engines serve every batch size until it is ready
+        
         Raises:
             FileNotFoundError: If model file doesn't exist
             ValueError: If model file cannot be loaded
         """
+        started = time.monotonic()
+        loaded = self._load(use_artifact, background_booster)
+        self._publish(loaded)
+        self._observe_load(time.monotonic() - started)
+    
+    def _observe_load(self, seconds: float) -> None:
+        self._load_seconds.observe(seconds)
+        self._last_load_seconds.set(seconds)
+    
+    def _load(self, use_artifact: Optional[bool] = None, background_booster: bool = False) -> LoadedModel:
+        """Load a new LoadedModel without publishing it"""
+        if use_artifact is None:
+            use_artifact = settings.MODEL_ARTIFACT_ENABLED
+        if use_artifact:
+            loaded = self._load_artifact(background_booster)
+            if loaded is not None:
+                return loaded
+        
         try:
             # Convert to Path object for cross-platform compatibility
             model_path = Path(self.model_path)
@@ -47,9 +201,15 @@ class ModelLoader:
             
             # Load model using joblib
             logger.info(f"Loading model from: {self.model_path}")
-            self.model = joblib.load(model_path)
-            self._is_loaded = True
-            logger.info(f"Model loaded successfully. Model type: {type(self.model).__name__}")
+            model = joblib.load(model_path)
+            loaded = LoadedModel(file_sha256(model_path), "joblib", type(model).__name__, model=model)
+            logger.info(f"Model loaded successfully. Model type: {type(model).__name__}")
+            
+            if settings.COMPILED_ENCODER_ENABLED:
+                self._compile_encoder(loaded)
+                self._compile_ensemble(loaded)
+            
+            return loaded
             
         except FileNotFoundError as e:
             logger.error(f"Model file not found: {str(e)}")
@@ -58,21 +218,226 @@ class ModelLoader:
             logger.error(f"Error loading model: {str(e)}")
             raise ValueError(f"Failed to load model from {self.model_path}: {str(e)}")
     
+    def _publish(self, loaded: LoadedModel) -> Optional[LoadedModel]:
+        """Make loaded the version being served and return the previous one"""
+        with self._lock:
+            self._generation += 1
+            loaded.generation = self._generation
+            previous = self._current
+            self._current = loaded
+        self._generation_gauge.set(loaded.generation)
+        return previous
+    
+    def _load_artifact(self, background_booster: bool = False) -> Optional[LoadedModel]:
+        """
+        Open the memory-mapped artifact of the model file
+        
+        Returns:
+            LoadedModel, or None to fall back to joblib
+        """
+        model_path = Path(self.model_path)
+        artifact_path = self.artifact_path
+        if not artifact_path.exists():
+            return None
+        
+        try:
+            # Only trust an artifact built from the joblib file it sits next to
+            expected = file_sha256(model_path) if model_path.exists() else None
+            artifact = ModelArtifact.open(artifact_path, expected)
+        except ArtifactError as e:
+            logger.warning(f"Not using model artifact, loading joblib instead: {str(e)}")
+            return None
+        except Exception as e:
+            logger.warning(f"Failed to open model artifact {artifact_path}, loading joblib instead: {str(e)}")
+            return None
+        
+        loaded = LoadedModel(artifact.source_sha256, "artifact", artifact.model_type)
+        loaded.encoder = artifact.encoder
+        loaded.ensemble = artifact.ensemble
+        if settings.SPECIALIZATION_CACHE_SIZE > 0:
+            loaded.specializer = EnsembleSpecializer(
+                artifact.ensemble,
+                artifact.encoder.categorical_columns,
+                max_entries=settings.SPECIALIZATION_CACHE_SIZE,
+                max_grid_cells=settings.SPECIALIZATION_MAX_GRID_CELLS
+            )
+        logger.info(f"Model loaded from artifact {artifact_path} ({artifact.ensemble.n_trees} trees, memory-mapped)")
+        
+        if background_booster:
+            self._booster_thread = threading.Thread(
+                target=self._load_booster,
+                args=(artifact, loaded),
+                name="booster-loader",
+                daemon=True
+            )
+            self._booster_thread.start()
+        else:
+            self._load_booster(artifact, loaded)
+        return loaded
+    
+    def _load_booster(self, artifact: ModelArtifact, loaded: LoadedModel) -> None:
+        """Attach the artifact's XGBoost booster to the version built from it"""
+        try:
+            regressor = artifact.load_regressor()
+        except Exception as e:
+            logger.warning(f"Failed to load XGBoost booster from artifact, using the NumPy engines: {str(e)}")
+            return
+        if regressor is not None:
+            loaded.regressor = regressor
+            logger.info("XGBoost booster loaded from artifact")
+    
+    def wait_for_booster(self, timeout: Optional[float] = None) -> None:
+        """
+        Wait until a booster started with background_booster has loaded
+        
+        Args:
+            timeout: Maximum seconds to wait (None waits indefinitely)
+        """
+        if self._booster_thread is not None:
+            self._booster_thread.join(timeout)
+    
+    def _compile_encoder(self, loaded: LoadedModel) -> None:
+        """
+        Build the NumPy feature encoder from the fitted preprocessing step
+        
+        Only [ColumnTransformer, XGBoost regressor] pipelines are compiled. The
+        compiled path is checked against the pipeline on probe rows and
+        discarded on any mismatch, so predictions never change.
+        """
+        steps = getattr(loaded.model, "steps", None)
+        if not steps or len(steps) != 2 or not hasattr(steps[-1][1], "get_booster"):
+            logger.info("Model is not a [preprocessor, XGBoost] pipeline, compiled encoder disabled")
+            return
+        
+        try:
+            encoder = CompiledEncoder.from_column_transformer(steps[0][1])
+            regressor = steps[-1][1]
+            
+            probe = self._probe_frame(encoder)
+            expected = loaded.model.predict(probe)
+            actual = regressor.predict(encoder.encode_frame(probe))
+            if not np.allclose(actual, expected, rtol=1e-6, atol=1e-4):
+                logger.warning("Compiled encoder does not match the pipeline, using the pipeline")
+                return
+        except UnsupportedPipelineError as e:
+            logger.info(f"Compiled encoder not available: {str(e)}")
+            return
+        except Exception as e:
+            logger.warning(f"Failed to compile encoder, using the pipeline: {str(e)}")
+            return
+        
+        loaded.encoder = encoder
+        loaded.regressor = regressor
+        logger.info(f"Compiled encoder ready ({encoder.n_features} features)")
+    
+    def _compile_ensemble(self, loaded: LoadedModel) -> None:
+        """
+        Convert the booster's trees into flat arrays for the NumPy engine
+        
+        Requires the compiled encoder. Like the encoder, the ensemble is
+        checked against the booster on probe rows and discarded on mismatch.
+        """
+        if loaded.encoder is None:
+            return
+        
+        try:
+            ensemble = TreeEnsemble.from_booster(loaded.regressor.get_booster())
+            
+            X = loaded.encoder.encode_frame(self._probe_frame(loaded.encoder))
+            expected = loaded.regressor.predict(X)
+            actual = ensemble.predict(X)
+            if not np.allclose(actual, expected, rtol=1e-5, atol=1e-3):
+                logger.warning("Tree ensemble does not match the booster, NumPy engine disabled")
+                return
+        except UnsupportedBoosterError as e:
+            logger.info(f"NumPy engine not available: {str(e)}")
+            return
+        except Exception as e:
+            logger.warning(f"Failed to convert booster, NumPy engine disabled: {str(e)}")
+            return
+        
+        loaded.ensemble = ensemble
+        logger.info(
+            f"Tree ensemble ready ({ensemble.n_trees} trees, {ensemble.n_nodes} nodes, "
+            f"max depth {ensemble.max_depth})"
+        )
+        
+        if settings.SPECIALIZATION_CACHE_SIZE > 0:
+            loaded.specializer = EnsembleSpecializer(
+                ensemble,
+                loaded.encoder.categorical_columns,
+                max_entries=settings.SPECIALIZATION_CACHE_SIZE,
+                max_grid_cells=settings.SPECIALIZATION_MAX_GRID_CELLS
+            )
+    
+    def warm(self, loaded: Optional[LoadedModel] = None) -> None:
+        """
+        Run probe rows through every engine of a version before it serves traffic
+        
+        Builds the specialized ensembles of the probe combinations and pages
+        in the arrays, so the first requests do not pay for it.
+        
+        Args:
+            loaded: Version to warm (defaults to the one being served)
+        """
+        loaded = loaded or self._current
+        if loaded is None or not loaded.compiled:
+            return
+        
+        X = self.probe_matrix(loaded)
+        if loaded.ensemble is not None:
+            loaded.ensemble.predict(X)
+        if loaded.specializer is not None:
+            loaded.specializer.predict(X)
+        if loaded.regressor is not None:
+            loaded.regressor.predict(X)
+    
+    def probe_matrix(self, loaded: Optional[LoadedModel] = None) -> Optional[np.ndarray]:
+        """
+        Encoded probe rows covering every category of every categorical column
+        
+        Args:
+            loaded: Version to encode for (defaults to the one being served)
+            
+        Returns:
+            Encoded matrix, or None if the version has no compiled encoder
+        """
+        loaded = loaded or self._current
+        if loaded is None or not loaded.compiled:
+            return None
+        return loaded.encoder.encode_frame(self._probe_frame(loaded.encoder))
+    
+    @staticmethod
+    def _probe_frame(encoder: CompiledEncoder) -> pd.DataFrame:
+        """Build probe rows that cover every category of every categorical column"""
+        n_rows = max([len(block.categories) for block in encoder.blocks] + [2])
+        columns = {}
+        for block in encoder.blocks:
+            if block.is_categorical:
+                columns[block.column] = [
+                    block.categories[i % len(block.categories)] for i in range(n_rows)
+                ]
+            else:
+                spread = np.linspace(-2.0, 2.0, n_rows)
+                columns[block.column] = block.mean + spread * block.scale
+        return pd.DataFrame(columns)
+    
     def get_model(self) -> Any:
         """
         Get the loaded model
         
         Returns:
-            Loaded model object
+            Loaded model object (None when loaded from an artifact, which
+            has no sklearn pipeline; see compiled)
             
         Raises:
             ValueError: If model is not loaded
         """
-        if not self._is_loaded or self.model is None:
+        if not self.is_loaded():
             raise ValueError(
                 "Model not loaded. Call load_model() first or ensure model loading succeeded."
             )
-        return self.model
+        return self._current.model
     
     def is_loaded(self) -> bool:
         """
@@ -81,14 +446,86 @@ class ModelLoader:
         Returns:
             True if model is loaded, False otherwise
         """
-        return self._is_loaded and self.model is not None
+        return self._current is not None
     
-    def reload_model(self) -> None:
+    @contextmanager
+    def acquire(self) -> Iterator[LoadedModel]:
         """
-        Reload model from file (useful for model updates)
+        Pin the version being served for the duration of a request
+        
+        Yields:
+            LoadedModel to score with; a reload waits for it to be released
+            before reporting the old version drained
+            
+        Raises:
+            ValueError: If model is not loaded
         """
-        logger.info("Reloading model...")
-        self.model = None
-        self._is_loaded = False
-        self.load_model()
-
+        with self._lock:
+            loaded = self._current
+            if loaded is None:
+                raise ValueError(
+                    "Model not loaded. Call load_model() first or ensure model loading succeeded."
+                )
+            loaded.in_flight += 1
+        try:
+            yield loaded
+        finally:
+            with self._lock:
+                loaded.in_flight -= 1
+                if loaded.in_flight == 0:
+                    self._lock.notify_all()
+    
+    def reload_model(self, drain_timeout: Optional[float] = None) -> LoadedModel:
+        """
+        Reload model from file without downtime (useful for model updates)
+        
+        The current version keeps serving while the new one is loaded and
+        warmed; then the new version is swapped in atomically and requests
+        still running on the old one are allowed to finish.
+        
+        Args:
+            drain_timeout: Seconds to wait for in-flight requests on the old
+                version (defaults to settings.MODEL_RELOAD_DRAIN_SECONDS)
+        
+        Returns:
+            The LoadedModel now being served
+        
+        Raises:
+            FileNotFoundError: If model file doesn't exist (old version stays live)
+            ValueError: If model file cannot be loaded (old version stays live)
+        """
+        with self._reload_lock:
+            logger.info("Reloading model...")
+            started = time.monotonic()
+            try:
+                loaded = self._load()
+                self.warm(loaded)
+            except Exception:
+                self._reload_failures.inc()
+                logger.error(f"Reload failed, still serving version {self.version}")
+                raise
+            
+            previous = self._publish(loaded)
+            self._reloads.inc()
+            self._observe_load(time.monotonic() - started)
+            logger.info(
+                f"Model version {loaded.version} is live "
+                f"(was {previous.version if previous else None}, {time.monotonic() - started:.2f}s)"
+            )
+            
+            if previous is not None:
+                self._drain(previous, settings.MODEL_RELOAD_DRAIN_SECONDS if drain_timeout is None else drain_timeout)
+            return loaded
+    
+    def _drain(self, previous: LoadedModel, timeout: float) -> None:
+        """Wait for requests still scoring with a replaced version"""
+        with self._lock:
+            drained = self._lock.wait_for(lambda: previous.in_flight == 0, timeout)
+            remaining = previous.in_flight
+        if drained:
+            logger.info(f"Model version {previous.version} drained")
+        else:
+            logger.warning(
+                f"Model version {previous.version} still has {remaining} requests in flight after {timeout}s; "
+                f"they finish on the old version"
+            )
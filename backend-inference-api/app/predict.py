@@ -1,16 +1,117 @@
 import pandas as pd
 import numpy as np
 import logging
-from typing import List
+from typing import Any, Dict, List, Mapping, NamedTuple, Optional, Union
 
-from app.model_loader import ModelLoader
+from app.config import settings
+from app.metrics import SIZE_BUCKETS, metrics
+from app.instrumentation import stage
+from app.model_loader import LoadedModel, ModelLoader
+from app.tree_ensemble import TreeEnsemble
+from app.specialize import EnsembleSpecializer
+from app.prediction_cache import PredictionCache
+from app.shared_cache import SharedPredictionCache
+from app.dedup import unique_rows
+from app.threads import SharedThreadUsage, ThreadPolicy, available_cpus
 
 logger = logging.getLogger(__name__)
 
 
+class InferenceEngine:
+    """
+    Scores an encoded feature matrix
+    """
+    
+    name = "base"
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        raise NotImplementedError
+
+
+class XGBoostEngine(InferenceEngine):
+    """
+    Native XGBoost prediction (OpenMP, best for large batches)
+    """
+    
+    name = "xgboost"
+    
+    def __init__(self, regressor: Any):
+        self.regressor = regressor
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        if xgboost_threads is None:
+            return self.regressor.predict(X)
+        return xgboost_threads.predict(self.regressor, X)
+
+
+class NumpyTreeEngine(InferenceEngine):
+    """
+    Vectorized NumPy tree evaluation (no per-call library overhead, best for small batches)
+    """
+    
+    name = "numpy"
+    
+    def __init__(self, ensemble: TreeEnsemble):
+        self.ensemble = ensemble
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.ensemble.predict(X)
+
+
+class SpecializedEngine(InferenceEngine):
+    """
+    Ensembles pruned per categorical combination (best for batches dominated by few combinations)
+    """
+    
+    name = "specialized"
+    
+    def __init__(self, specializer: EnsembleSpecializer, fallback: InferenceEngine):
+        self.specializer = specializer
+        self.fallback = fallback
+    
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        return self.specializer.predict(
+            X,
+            fallback=self.fallback.predict,
+            min_group_rows=settings.SPECIALIZATION_MIN_GROUP_ROWS
+        )
+
+
+def _create_thread_policy() -> Optional[ThreadPolicy]:
+    """Build the XGBoost thread policy configured in settings (None if disabled)"""
+    if not settings.XGBOOST_ADAPTIVE_THREADS:
+        return None
+    
+    usage = None
+    if settings.XGBOOST_THREADS_SHARED_NAME:
+        try:
+            usage = SharedThreadUsage(settings.XGBOOST_THREADS_SHARED_NAME)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Shared XGBoost thread usage unavailable, counting this worker only: {str(e)}")
+    return ThreadPolicy(
+        settings.XGBOOST_THREAD_CPUS or available_cpus(),
+        min_rows_per_thread=settings.XGBOOST_MIN_ROWS_PER_THREAD,
+        usage=usage
+    )
+
+
+# Thread counts of the XGBoost calls of every Predictor in this process
+xgboost_threads = _create_thread_policy()
+
+
+class ScoredBatch(NamedTuple):
+    """Predictions together with the version of the model that produced them"""
+    
+    predictions: np.ndarray
+    model_version: Optional[str]
+
+
 class Predictor:
     """
     Handles prediction logic using the loaded model
+    
+    Each call pins the model version being served (ModelLoader.acquire), so
+    a reload never mixes two versions within one batch.
     """
     
     def __init__(self, model_loader: ModelLoader):
@@ -26,6 +127,107 @@ class Predictor:
             "Product_Allocated_Area",
             "Store_Establishment_Year"
         ]
+        self._engine_rows = {
+            name: metrics.counter(f"inference_engine_{name}_rows_total", f"Rows scored by the {name} engine")
+            for name in (XGBoostEngine.name, NumpyTreeEngine.name, SpecializedEngine.name)
+        }
+        self._batch_rows = metrics.histogram(
+            "inference_batch_rows", "Rows per model call (after the prediction cache and deduplication)", buckets=SIZE_BUCKETS
+        )
+        self._dedup_rows = metrics.counter(
+            "inference_dedup_rows_total", "Rows of batches checked for duplicate rows"
+        )
+        self._dedup_unique_rows = metrics.counter(
+            "inference_dedup_unique_rows_total", "Distinct rows scored out of inference_dedup_rows_total"
+        )
+        self._dedup_ratio = metrics.histogram(
+            "inference_dedup_ratio", "Distinct rows / rows per deduplicated batch",
+            buckets=(0.01, 0.05, 0.1, 0.25, 0.5, 0.75, 0.9, 1.0)
+        )
+        self.cache = self._create_cache()
+    
+    @staticmethod
+    def _create_cache() -> Optional[Union[PredictionCache, SharedPredictionCache]]:
+        """Build the prediction cache configured in settings (None if disabled)"""
+        if settings.PREDICTION_CACHE_BACKEND == "shared":
+            try:
+                return SharedPredictionCache(
+                    name=settings.SHARED_CACHE_NAME,
+                    n_slots=settings.SHARED_CACHE_SLOTS,
+                    ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS,
+                    quantum=settings.PREDICTION_CACHE_QUANTUM
+                )
+            except (OSError, ValueError) as e:
+                logger.warning(f"Shared prediction cache unavailable, using a per-worker cache: {str(e)}")
+        
+        if settings.PREDICTION_CACHE_SIZE > 0:
+            return PredictionCache(
+                max_entries=settings.PREDICTION_CACHE_SIZE,
+                ttl_seconds=settings.PREDICTION_CACHE_TTL_SECONDS,
+                quantum=settings.PREDICTION_CACHE_QUANTUM
+            )
+        return None
+    
+    def select_engine(self, n_rows: int, model: Optional[LoadedModel] = None) -> InferenceEngine:
+        """
+        Pick the engine for a batch of n_rows encoded rows
+        
+        Args:
+            n_rows: Number of rows to score
+            model: Model version to bind to (defaults to the one being served)
+            
+        Returns:
+            Engine bound to the model
+        """
+        model = model or self.model_loader.current
+        regressor = model.regressor
+        ensemble = model.ensemble
+        specializer = model.specializer
+        choice = settings.INFERENCE_ENGINE
+        
+        if ensemble is not None and (
+            regressor is None
+            or (choice in ("auto", "specialized") and n_rows <= settings.NUMPY_ENGINE_MAX_ROWS)
+        ):
+            fallback = NumpyTreeEngine(ensemble)
+        else:
+            fallback = XGBoostEngine(regressor)
+        
+        if choice == "xgboost" and regressor is not None:
+            return XGBoostEngine(regressor)
+        if choice == "numpy" and ensemble is not None:
+            return NumpyTreeEngine(ensemble)
+        if choice in ("auto", "specialized") and specializer is not None:
+            return SpecializedEngine(specializer, fallback)
+        return fallback
+    
+    def _predict_encoded(self, model: LoadedModel, X: np.ndarray) -> np.ndarray:
+        """
+        Score an encoded matrix with the engine chosen for its size
+        
+        Batches of at least BATCH_DEDUP_MIN_ROWS rows are factorized first:
+        each distinct row is scored once and its prediction copied back to
+        every row that repeats it.
+        """
+        if 0 < settings.BATCH_DEDUP_MIN_ROWS <= len(X):
+            with stage("dedup"):
+                unique = unique_rows(X)
+            n_unique = len(X) if unique is None else len(unique.first_rows)
+            self._dedup_rows.inc(len(X))
+            self._dedup_unique_rows.inc(n_unique)
+            self._dedup_ratio.observe(n_unique / len(X))
+            if unique is not None:
+                return self._score_encoded(model, X[unique.first_rows])[unique.inverse]
+        return self._score_encoded(model, X)
+    
+    def _score_encoded(self, model: LoadedModel, X: np.ndarray) -> np.ndarray:
+        """Score every row of an encoded matrix with the engine chosen for its size"""
+        engine = self.select_engine(len(X), model)
+        with stage("predict"):
+            predictions = engine.predict(X)
+        self._engine_rows[engine.name].inc(len(X))
+        self._batch_rows.observe(len(X))
+        return predictions
     
     def validate_input(self, df: pd.DataFrame) -> bool:
         """
@@ -53,18 +255,148 @@ class Predictor:
         Returns:
             Array of predictions
         """
+        return self.score_frame(df).predictions
+    
+    def predict_records(self, records: List[Dict[str, Any]]) -> np.ndarray:
+        """
+        Make predictions on row dictionaries without building a DataFrame
+        
+        Args:
+            records: List of dictionaries with required features
+            
+        Returns:
+            Array of predictions
+        """
+        return self.score_records(records).predictions
+    
+    def score_frame(self, df: pd.DataFrame) -> ScoredBatch:
+        """
+        Make predictions on input data and report the model version used
+        
+        Args:
+            df: Input DataFrame with required features
+            
+        Returns:
+            ScoredBatch
+        """
+        with self.model_loader.acquire() as model:
+            if self.cache is None:
+                return ScoredBatch(self._score_frame(model, df), model.version)
+            
+            self.validate_input(df)
+            records = df[self.expected_columns].to_dict("records")
+            return ScoredBatch(self._predict_cached(model, records), model.version)
+    
+    def score_records(self, records: List[Dict[str, Any]]) -> ScoredBatch:
+        """
+        Make predictions on row dictionaries and report the model version used
+        
+        Args:
+            records: List of dictionaries with required features
+            
+        Returns:
+            ScoredBatch
+        """
+        with self.model_loader.acquire() as model:
+            if self.cache is None:
+                return ScoredBatch(self._score_records(model, records), model.version)
+            return ScoredBatch(self._predict_cached(model, records), model.version)
+    
+    def score_columns(self, columns: Mapping[str, Any]) -> ScoredBatch:
+        """
+        Make predictions on column arrays and report the model version used
+        
+        Columns go straight into the encoder (pandas Categoricals are mapped
+        per category, not per row). Bypasses the prediction cache, whose keys
+        are built per row.
+        
+        Args:
+            columns: Mapping of feature name to NumPy array or pandas Categorical
+            
+        Returns:
+            ScoredBatch
+        """
+        with self.model_loader.acquire() as model:
+            return ScoredBatch(self._score_columns(model, columns), model.version)
+    
+    def _predict_cached(self, model: LoadedModel, records: List[Dict[str, Any]]) -> np.ndarray:
+        """Serve rows from the prediction cache and score only the misses"""
+        try:
+            keys = [self.cache.make_key(record) for record in records]
+        except KeyError as e:
+            raise ValueError(f"Missing required columns: {{{str(e)}}}")
+        
+        # Entries are stored under the version that scored them, so a reload
+        # landing meanwhile never serves them for the new model
+        version = getattr(model, self.cache.version_attribute)
+        predictions, missing = self.cache.get_many(keys, version)
+        if missing:
+            scored = self._score_records(model, [records[i] for i in missing])
+            predictions[missing] = scored
+            self.cache.put_many([keys[i] for i in missing], scored, version)
+        return predictions
+    
+    def _score_frame(self, model: LoadedModel, df: pd.DataFrame) -> np.ndarray:
+        """Score a DataFrame with the model, bypassing the cache"""
         try:
             # Validate input
             self.validate_input(df)
             
-            # Get model
-            model = self.model_loader.get_model()
+            if model.compiled:
+                # Compiled encoder: straight to the dense matrix, no ColumnTransformer
+                with stage("encode"):
+                    X = model.encoder.encode_frame(df)
+                predictions = self._predict_encoded(model, X)
+            else:
+                # Ensure columns are in correct order
+                df = df[self.expected_columns]
+                
+                # Make predictions
+                predictions = self._predict_pipeline(model.model, df)
+            
+            logger.info(f"Generated {len(predictions)} predictions")
+            
+            return predictions
+        
+        except Exception as e:
+            logger.error(f"Prediction error: {str(e)}")
+            raise
+    
+    def _score_records(self, model: LoadedModel, records: List[Dict[str, Any]]) -> np.ndarray:
+        """Score row dictionaries with the model, bypassing the cache"""
+        if not model.compiled:
+            with stage("frame"):
+                df = pd.DataFrame(records)
+            return self._score_frame(model, df)
+        
+        try:
+            with stage("encode"):
+                X = model.encoder.encode_records(records)
+            predictions = self._predict_encoded(model, X)
             
-            # Ensure columns are in correct order
-            df = df[self.expected_columns]
+            logger.info(f"Generated {len(predictions)} predictions")
             
-            # Make predictions
-            predictions = model.predict(df)
+            return predictions
+        
+        except Exception as e:
+            logger.error(f"Prediction error: {str(e)}")
+            raise
+    
+    def _score_columns(self, model: LoadedModel, columns: Mapping[str, Any]) -> np.ndarray:
+        """Score column arrays with the model, bypassing the cache"""
+        missing_cols = set(self.expected_columns) - set(columns.keys())
+        if missing_cols:
+            raise ValueError(f"Missing required columns: {missing_cols}")
+        
+        if not model.compiled:
+            with stage("frame"):
+                df = pd.DataFrame({col: columns[col] for col in self.expected_columns})
+            return self._score_frame(model, df)
+        
+        try:
+            with stage("encode"):
+                X = model.encoder.encode_columns(columns)
+            predictions = self._predict_encoded(model, X)
             
             logger.info(f"Generated {len(predictions)} predictions")
             
@@ -73,4 +405,18 @@ class Predictor:
         except Exception as e:
             logger.error(f"Prediction error: {str(e)}")
             raise
-    
\ No newline at end of file
+    
+    def _predict_pipeline(self, pipeline: Any, df: pd.DataFrame) -> np.ndarray:
+        """Score with the sklearn model, timing preprocessing and the regressor separately"""
+        steps = getattr(pipeline, "steps", None)
+        if not steps or len(steps) < 2:
+            with stage("predict"):
+                return pipeline.predict(df)
+        
+        # Same as Pipeline.predict, one stage per half
+        with stage("encode"):
+            Xt = pipeline[:-1].transform(df)
+        with stage("predict"):
+            predictions = steps[-1][1].predict(Xt)
+        self._batch_rows.observe(len(df))
+        return predictions
@@ -0,0 +1,182 @@
+import logging
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Input features in key order
+KEY_COLUMNS = (
+    "Product_Type",
+    "Store_Type",
+    "Store_Location_City_Type",
+    "Store_Size",
+    "Product_Sugar_Content",
+    "Product_Weight",
+    "Product_MRP",
+    "Product_Allocated_Area",
+    "Store_Establishment_Year",
+)
+NUMERIC_COLUMNS = frozenset((
+    "Product_Weight",
+    "Product_MRP",
+    "Product_Allocated_Area",
+    "Store_Establishment_Year",
+))
+
+
+def make_key(record: Dict[str, Any], quantum: float = 0.0) -> Tuple:
+    """
+    Build the cache key for one row of raw features
+
+    Args:
+        record: Dictionary with the input features
+        quantum: Grid numeric features are rounded to (0 keeps exact values)
+
+    Returns:
+        Hashable key
+    """
+    key = []
+    for column in KEY_COLUMNS:
+        value = record[column]
+        if column in NUMERIC_COLUMNS and value is not None:
+            value = float(value)
+            if math.isnan(value):
+                value = None
+            elif quantum > 0:
+                value = round(value / quantum)
+        key.append(value)
+    return tuple(key)
+
+
+class PredictionCache:
+    """
+    In-process cache of predictions keyed on the raw input features
+
+    Numeric features are snapped to a grid of quantum before hashing, so
+    inputs that only differ below that resolution share an entry (a
+    quantum of 0 keys on exact values). Entries expire after ttl_seconds
+    and the least recently used entry is dropped once max_entries is
+    reached. Every entry belongs to a model generation; a lookup with a
+    newer generation empties the cache, so a reloaded model never serves
+    predictions computed by the previous one.
+    """
+
+    # LoadedModel attribute identifying the model the entries belong to
+    version_attribute = "generation"
+
+    def __init__(self, max_entries: int, ttl_seconds: float = 0.0, quantum: float = 0.0):
+        """
+        Initialize PredictionCache
+
+        Args:
+            max_entries: Maximum number of cached predictions
+            ttl_seconds: Lifetime of an entry (0 disables expiry)
+            quantum: Grid numeric features are rounded to when building keys
+        """
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self.quantum = quantum
+        self.generation: Optional[int] = None
+        # key -> (prediction, expiry time)
+        self._entries: "OrderedDict[Hashable, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = metrics.counter("prediction_cache_hits_total", "Rows served from the prediction cache")
+        self._misses = metrics.counter("prediction_cache_misses_total", "Rows that had to be scored by the model")
+        self._evictions = metrics.counter(
+            "prediction_cache_evictions_total", "Entries dropped to stay within the size limit"
+        )
+        self._expirations = metrics.counter("prediction_cache_expirations_total", "Entries dropped after their TTL")
+        self._invalidations = metrics.counter(
+            "prediction_cache_invalidations_total", "Cache flushes caused by a model reload"
+        )
+        self._size = metrics.gauge("prediction_cache_size", "Predictions currently cached")
+
+    def make_key(self, record: Dict[str, Any]) -> Tuple:
+        """Build the cache key for one row of raw features"""
+        return make_key(record, self.quantum)
+
+    def get_many(self, keys: Sequence[Hashable], generation: int) -> Tuple[np.ndarray, List[int]]:
+        """
+        Look up predictions for a batch of keys
+
+        Args:
+            keys: Keys built with make_key
+            generation: Generation of the currently loaded model
+
+        Returns:
+            Tuple of (float32 predictions with cached values filled in,
+            positions of the keys that were not found)
+        """
+        predictions = np.empty(len(keys), dtype=np.float32)
+        missing: List[int] = []
+        now = time.monotonic()
+
+        with self._lock:
+            self._check_generation(generation)
+            for position, key in enumerate(keys):
+                entry = self._entries.get(key)
+                if entry is not None and self.ttl_seconds > 0 and entry[1] <= now:
+                    del self._entries[key]
+                    self._expirations.inc()
+                    entry = None
+                if entry is None:
+                    missing.append(position)
+                    continue
+                self._entries.move_to_end(key)
+                predictions[position] = entry[0]
+            self._size.set(len(self._entries))
+
+        self._hits.inc(len(keys) - len(missing))
+        self._misses.inc(len(missing))
+        return predictions, missing
+
+    def put_many(self, keys: Sequence[Hashable], predictions: Sequence[float], generation: int) -> None:
+        """
+        Store predictions computed by the model of a given generation
+
+        Predictions from a model that has been replaced meanwhile are dropped.
+
+        Args:
+            keys: Keys built with make_key
+            predictions: Prediction for each key
+            generation: Generation of the model that computed them
+        """
+        expires_at = time.monotonic() + self.ttl_seconds
+
+        with self._lock:
+            self._check_generation(generation)
+            if generation != self.generation:
+                return
+            for key, prediction in zip(keys, predictions):
+                self._entries[key] = (float(prediction), expires_at)
+                self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self._evictions.inc()
+            self._size.set(len(self._entries))
+
+    def clear(self) -> None:
+        """Drop every cached prediction"""
+        with self._lock:
+            self._entries.clear()
+            self._size.set(0)
+
+    def _check_generation(self, generation: int) -> None:
+        """Flush the cache when a newer model generation shows up (lock held)"""
+        if self.generation is None or generation > self.generation:
+            if self._entries:
+                logger.info(f"Model generation {generation} loaded, flushing {len(self._entries)} cached predictions")
+                self._invalidations.inc()
+            self._entries.clear()
+            self.generation = generation
+
+    def __len__(self) -> int:
+        return len(self._entries)
@@ -0,0 +1,174 @@
+"""
+Pre-fork server: load the model once, then fork the uvicorn workers
+
+Usage (entrypoint.sh runs this when SERVING_MODE=prefork):
+    python -m app.prefork --host 0.0.0.0 --port 8000 --workers 4
+
+The parent imports the app, loads and warms the model, moves every live
+object to the permanent GC generation (gc.freeze) and binds the listening
+socket. Workers are then forked and serve on that shared socket. The
+model pages are inherited copy-on-write and, because the GC no longer
+touches the frozen objects, stay shared instead of being copied into
+every worker. The parent restarts workers that die and logs per-worker
+RSS and unique/shared memory.
+"""
+import os
+
+# OpenMP's thread pool does not survive fork(): a worker that inherits a pool
+# started by the parent can hang in its first parallel region. The parent
+# runs OpenMP single-threaded (no pool), workers restore the thread count.
+_OMP_NUM_THREADS = os.environ.get("OMP_NUM_THREADS")
+os.environ["OMP_NUM_THREADS"] = "1"
+
+import argparse
+import gc
+import logging
+import signal
+import socket
+import time
+from typing import Set
+
+import uvicorn
+
+from app.config import settings
+from app.memory import format_report, process_memory, worker_memory
+
+logger = logging.getLogger("app.prefork")
+
+# Seconds between checks for dead workers
+SUPERVISE_INTERVAL = 1.0
+
+
+def preload():
+    """
+    Import the app and load and warm the model in the parent
+
+    Returns:
+        The app.main module
+    """
+    from app import main as server
+
+    # Loads the artifact booster synchronously: no thread may be running at fork
+    server.model_loader.load_model()
+    # Builds the specialized ensembles of the probe combinations and
+    # touches every code path once, so workers inherit them warm
+    server.model_loader.warm()
+    return server
+
+
+def run_worker(server, config: uvicorn.Config, sock: socket.socket) -> None:
+    """Body of a forked worker, never returns"""
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+
+    if _OMP_NUM_THREADS is None:
+        os.environ.pop("OMP_NUM_THREADS", None)
+    else:
+        os.environ["OMP_NUM_THREADS"] = _OMP_NUM_THREADS
+    regressor = server.model_loader.regressor
+    if regressor is not None and getattr(regressor, "n_jobs", None) is None:
+        regressor.set_params(n_jobs=int(_OMP_NUM_THREADS or os.cpu_count() or 1))
+
+    status = 0
+    try:
+        uvicorn.Server(config).run(sockets=[sock])
+    except BaseException:
+        logger.exception(f"Worker {os.getpid()} crashed")
+        status = 1
+    finally:
+        os._exit(status)
+
+
+def spawn_worker(server, config: uvicorn.Config, sock: socket.socket) -> int:
+    """Fork one worker and return its pid"""
+    pid = os.fork()
+    if pid == 0:
+        run_worker(server, config, sock)
+    logger.info(f"Started worker {pid}")
+    return pid
+
+
+def log_memory(parent_pid: int) -> None:
+    """Log the memory report of the parent and its workers"""
+    report = [entry for entry in [process_memory(parent_pid)] + worker_memory(parent_pid) if entry]
+    if report:
+        logger.info("Memory per process (MiB, first row is the parent):\n" + format_report(report))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default=settings.INFERENCE_API_HOST)
+    parser.add_argument("--port", type=int, default=settings.INFERENCE_API_PORT)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--log-level", default=settings.LOG_LEVEL.lower())
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=args.log_level.upper(),
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    config = uvicorn.Config(
+        "app.main:app",
+        host=args.host,
+        port=args.port,
+        log_level=args.log_level,
+        access_log=True,
+        proxy_headers=True,
+        forwarded_allow_ips="*"
+    )
+
+    started = time.monotonic()
+    server = preload()
+    # Import the app in the parent too, so workers do not each re-import it
+    config.load()
+    gc.collect()
+    gc.freeze()
+    logger.info(
+        f"Model loaded in parent in {time.monotonic() - started:.2f}s, "
+        f"{gc.get_freeze_count()} objects frozen"
+    )
+
+    sock = config.bind_socket()
+    workers: Set[int] = set()
+    for _ in range(max(1, args.workers)):
+        workers.add(spawn_worker(server, config, sock))
+
+    stopping = False
+
+    def stop(signum, frame):
+        nonlocal stopping
+        stopping = True
+        for pid in list(workers):
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    signal.signal(signal.SIGTERM, stop)
+    signal.signal(signal.SIGINT, stop)
+
+    next_report = time.monotonic() + min(30.0, settings.PREFORK_MEMORY_REPORT_SECONDS or 30.0)
+    while workers:
+        try:
+            pid, status = os.waitpid(-1, os.WNOHANG)
+        except ChildProcessError:
+            break
+        if pid:
+            workers.discard(pid)
+            if not stopping:
+                logger.warning(f"Worker {pid} exited with status {status}, restarting")
+                workers.add(spawn_worker(server, config, sock))
+            continue
+
+        if settings.PREFORK_MEMORY_REPORT_SECONDS > 0 and time.monotonic() >= next_report:
+            log_memory(os.getpid())
+            next_report = time.monotonic() + settings.PREFORK_MEMORY_REPORT_SECONDS
+        time.sleep(SUPERVISE_INTERVAL)
+
+    sock.close()
+    logger.info("All workers stopped")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,177 @@
+import cProfile
+import logging
+import os
+import pstats
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Call-tree nodes below this fraction of the profiled call's time are folded into their parent
+MIN_FRACTION = 0.01
+# Deepest call-tree level reported
+MAX_DEPTH = 25
+
+# Path fragment -> library, checked in order
+LIBRARIES = (
+    ("/xgboost/", "xgboost"),
+    ("/sklearn/", "sklearn"),
+    ("/pandas/", "pandas"),
+    ("/numpy/", "numpy"),
+    ("/pydantic/", "pydantic"),
+    ("/app/", "app"),
+)
+
+FunctionKey = Tuple[str, int, str]
+
+
+def profile_call(function: Callable[[], Any]) -> Tuple[Any, cProfile.Profile]:
+    """
+    Run function under the deterministic profiler
+
+    Only the calling thread is profiled, so function must do all its work
+    in this thread (call Predictor methods directly, not through the
+    inference executor).
+
+    Returns:
+        Tuple of (function's result, profile)
+    """
+    profile = cProfile.Profile()
+    profile.enable()
+    try:
+        result = function()
+    finally:
+        profile.disable()
+    return result, profile
+
+
+def _label(key: FunctionKey) -> str:
+    filename, line, name = key
+    if filename == "~":
+        # C function, name is e.g. "<method 'predict' of ...>" or "<built-in method numpy...>"
+        return name
+    return f"{_short_path(filename)}:{line}({name})"
+
+
+def _short_path(filename: str) -> str:
+    """Path relative to site-packages or the app directory"""
+    for marker in ("site-packages/", "dist-packages/"):
+        if marker in filename:
+            return filename.split(marker, 1)[1]
+    if "/app/" in filename:
+        return "app/" + filename.rsplit("/app/", 1)[1]
+    return filename
+
+
+def _library(key: FunctionKey) -> Optional[str]:
+    for fragment, library in LIBRARIES:
+        if fragment in key[0]:
+            return library
+    return None if key[0] == "~" else "other"
+
+
+def library_breakdown(stats: pstats.Stats) -> Dict[str, float]:
+    """
+    Own time per library, in milliseconds
+
+    C functions have no file; their time is attributed to the library of
+    the Python function that spent most time calling them.
+    """
+    totals: Dict[str, float] = {}
+    for key, (_, _, own, _, callers) in stats.stats.items():
+        library = _library(key)
+        if library is None:
+            caller = max(callers.items(), key=lambda item: item[1][3], default=None)
+            library = (_library(caller[0]) or "other") if caller else "other"
+        totals[library] = totals.get(library, 0.0) + own * 1000.0
+    return dict(sorted(totals.items(), key=lambda item: -item[1]))
+
+
+def call_tree(stats: pstats.Stats, root_name: str) -> Optional[Dict[str, Any]]:
+    """
+    Call tree below the profiled function
+
+    Edges carry the time spent in a callee when called from that parent
+    (cProfile records caller/callee pairs, not full stacks, so a function
+    called from several places shows its per-parent share under each).
+
+    Args:
+        stats: Stats of the profile
+        root_name: Name of the profiled function
+
+    Returns:
+        Nested {"function", "ms", "calls", "children"} dictionaries, or None
+        if root_name was not profiled
+    """
+    callees: Dict[FunctionKey, List[Tuple[FunctionKey, int, float]]] = {}
+    for key, (_, _, _, _, callers) in stats.stats.items():
+        for caller, (_, calls, _, cumulative) in callers.items():
+            callees.setdefault(caller, []).append((key, calls, cumulative))
+
+    roots = [key for key in stats.stats if key[2] == root_name]
+    if not roots:
+        return None
+    root = max(roots, key=lambda key: stats.stats[key][3])
+    total = stats.stats[root][3] or 1e-12
+
+    def build(key: FunctionKey, calls: int, cumulative: float, path: frozenset, depth: int) -> Dict[str, Any]:
+        node: Dict[str, Any] = {
+            "function": _label(key),
+            "ms": round(cumulative * 1000.0, 3),
+            "calls": calls,
+        }
+        if depth < MAX_DEPTH:
+            children = [
+                build(child, child_calls, child_cumulative, path | {child}, depth + 1)
+                for child, child_calls, child_cumulative in sorted(callees.get(key, []), key=lambda edge: -edge[2])
+                if child not in path and child_cumulative >= MIN_FRACTION * total
+            ]
+            if children:
+                node["children"] = children
+        return node
+
+    return build(root, stats.stats[root][1], stats.stats[root][3], frozenset([root]), 0)
+
+
+def build_report(profile: cProfile.Profile, root_name: str, top: int = 15) -> Dict[str, Any]:
+    """
+    Summary of a profile returned to the client
+
+    Returns:
+        Dictionary with the total time, own time per library, the top
+        functions by own time and the call tree below root_name
+    """
+    stats = pstats.Stats(profile)
+    top_functions = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:top]
+    return {
+        "total_ms": round(stats.total_tt * 1000.0, 3),
+        "by_library_ms": {library: round(ms, 3) for library, ms in library_breakdown(stats).items()},
+        "top_functions": [
+            {
+                "function": _label(key),
+                "own_ms": round(own * 1000.0, 3),
+                "cumulative_ms": round(cumulative * 1000.0, 3),
+                "calls": calls,
+            }
+            for key, (_, calls, own, cumulative, _) in top_functions
+        ],
+        "call_tree": call_tree(stats, root_name),
+    }
+
+
+def save_profile(profile: cProfile.Profile, output_dir: str, prefix: str) -> Optional[str]:
+    """
+    Write the raw profile for pstats, snakeviz or gprof2dot
+
+    Returns:
+        Path of the written file, or None if it could not be written
+    """
+    try:
+        os.makedirs(output_dir, exist_ok=True)
+        path = Path(output_dir) / f"{prefix}-{time.strftime('%Y%m%d-%H%M%S')}-{os.getpid()}-{time.monotonic_ns()}.prof"
+        profile.dump_stats(str(path))
+        return str(path)
+    except OSError as e:
+        logger.warning(f"Failed to write profile to {output_dir}: {str(e)}")
+        return None
@@ -0,0 +1,288 @@
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from app.artifact import ARRAY_NAMES, MANIFEST_FILE, file_sha256
+from app.metrics import metrics
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+
+logger = logging.getLogger(__name__)
+
+# Shortest version prefix accepted in place of a model name
+MIN_VERSION_PREFIX = 6
+
+
+class ModelNotFoundError(KeyError):
+    """Raised when no model in the models directory matches a name or version"""
+
+
+class RegistryEntry:
+    """
+    A model found in the models directory
+    """
+
+    def __init__(self, name: str, model_path: Path, artifact_path: Path, sha256: str):
+        self.name = name
+        self.model_path = model_path
+        self.artifact_path = artifact_path
+        self.sha256 = sha256
+
+    @property
+    def version(self) -> str:
+        # Same derivation as LoadedModel.version
+        return self.sha256[:12]
+
+
+def model_footprint(loader: ModelLoader) -> int:
+    """
+    Approximate memory held by a loaded model, in bytes
+
+    The on-disk size of what was loaded (the pickled pipeline, or the
+    artifact's arrays and booster) plus the NumPy tree arrays compiled from
+    a pipeline. Used to bound the registry, not an exact measurement.
+    """
+    current = loader.current
+    if current is None:
+        return 0
+    if current.source == "artifact":
+        return sum(path.stat().st_size for path in loader.artifact_path.iterdir() if path.is_file())
+
+    size = Path(loader.model_path).stat().st_size
+    if current.ensemble is not None:
+        size += sum(getattr(current.ensemble, name).nbytes for name in ARRAY_NAMES)
+    return size
+
+
+class ModelRegistry:
+    """
+    Serves every model in a directory, loading them on first use
+
+    Models are discovered as <name>.joblib files and <name>.artifact
+    directories (an artifact is used instead of its joblib file when the
+    checksums match, see ModelLoader). A model is addressed by its name or
+    by a prefix of its version (the sha256 of the model file). Loaded models
+    are kept in an LRU bounded by count and by approximate size
+    (model_footprint); the default model is never evicted. A request that is
+    still scoring with an evicted model finishes with it.
+    """
+
+    def __init__(
+        self,
+        models_dir: str,
+        default: Predictor,
+        max_loaded: int = 4,
+        max_bytes: int = 0
+    ):
+        """
+        Initialize ModelRegistry
+
+        Args:
+            models_dir: Directory scanned for models
+            default: Predictor of the model at MODEL_PATH, served for its
+                name and version and never evicted
+            max_loaded: Maximum models loaded besides the default one
+            max_bytes: Maximum total model_footprint of those models (0 for no limit)
+        """
+        self.models_dir = Path(models_dir)
+        self.default = default
+        self.default_name = Path(default.model_loader.model_path).stem
+        self.max_loaded = max(1, max_loaded)
+        self.max_bytes = max_bytes
+        self._entries: Dict[str, RegistryEntry] = {}
+        # name -> (predictor, footprint) in LRU order
+        self._loaded: "OrderedDict[str, Tuple[Predictor, int]]" = OrderedDict()
+        # (path, mtime, size) -> sha256 of the files seen by the last scan, so
+        # rescans only hash changed files
+        self._hashes: Dict[Tuple[str, int, int], str] = {}
+        self._lock = threading.Lock()
+        self._load_locks: Dict[str, threading.Lock] = {}
+
+        self._hits = metrics.counter("model_registry_hits_total", "Registry requests served by a loaded model")
+        self._loads = metrics.counter("model_registry_loads_total", "Models loaded by the registry on first use")
+        self._evictions = metrics.counter("model_registry_evictions_total", "Models unloaded to stay within the limits")
+        self._loaded_gauge = metrics.gauge("model_registry_loaded", "Models loaded by the registry")
+        self._bytes_gauge = metrics.gauge("model_registry_bytes", "Approximate memory of models loaded by the registry")
+
+    def discover(self) -> List[RegistryEntry]:
+        """
+        Rescan the models directory
+
+        Returns:
+            Entries sorted by name
+        """
+        entries: Dict[str, RegistryEntry] = {}
+        # Only files of this scan are kept: older versions of rewritten files drop out
+        hashes: Dict[Tuple[str, int, int], str] = {}
+        if self.models_dir.is_dir():
+            for path in sorted(self.models_dir.iterdir()):
+                if path.name.startswith("."):
+                    continue
+                if path.suffix == ".joblib" and path.is_file():
+                    name = path.stem
+                    sha256 = self._sha256(path, hashes)
+                elif path.suffix == ".artifact" and (path / MANIFEST_FILE).is_file():
+                    name = path.stem
+                    if name in entries or path.with_suffix(".joblib").exists():
+                        # Same model as the joblib file next to it
+                        continue
+                    sha256 = self._manifest_sha256(path)
+                else:
+                    continue
+                if sha256 is None:
+                    continue
+                entries[name] = RegistryEntry(name, path.with_suffix(".joblib"), path.with_suffix(".artifact"), sha256)
+
+        with self._lock:
+            self._entries = entries
+        self._hashes = hashes
+        return sorted(entries.values(), key=lambda entry: entry.name)
+
+    def _sha256(self, path: Path, hashes: Dict[Tuple[str, int, int], str]) -> Optional[str]:
+        try:
+            stat = path.stat()
+            key = (str(path), stat.st_mtime_ns, stat.st_size)
+            if key not in hashes:
+                hashes[key] = self._hashes.get(key) or file_sha256(path)
+            return hashes[key]
+        except OSError as e:
+            logger.warning(f"Skipping model {path}: {str(e)}")
+            return None
+
+    @staticmethod
+    def _manifest_sha256(path: Path) -> Optional[str]:
+        try:
+            with open(path / MANIFEST_FILE) as f:
+                return json.load(f)["source"]["sha256"]
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Skipping model artifact {path}: {str(e)}")
+            return None
+
+    def resolve(self, model_id: str) -> str:
+        """
+        Name of the model addressed by a name or version prefix
+
+        Rescans the models directory once if nothing matches.
+
+        Raises:
+            ModelNotFoundError: If no model, or more than one version, matches
+        """
+        default_version = self.default.model_loader.version
+        for attempt in range(2):
+            if model_id == self.default_name or (
+                default_version and len(model_id) >= MIN_VERSION_PREFIX and default_version.startswith(model_id)
+            ):
+                return self.default_name
+            with self._lock:
+                entries = dict(self._entries)
+            if model_id in entries:
+                return model_id
+            if len(model_id) >= MIN_VERSION_PREFIX:
+                matches = [entry.name for entry in entries.values() if entry.sha256.startswith(model_id)]
+                if len(matches) > 1:
+                    raise ModelNotFoundError(f"Version {model_id} is ambiguous: {', '.join(sorted(matches))}")
+                if matches:
+                    return matches[0]
+            if attempt == 0:
+                self.discover()
+        raise ModelNotFoundError(f"No model named or versioned {model_id} in {self.models_dir}")
+
+    def get(self, model_id: str) -> Predictor:
+        """
+        Predictor for a model, loading it on first use
+
+        Blocking (loads the model); call it off the event loop.
+
+        Args:
+            model_id: Model name or version prefix
+
+        Returns:
+            Predictor bound to the model
+
+        Raises:
+            ModelNotFoundError: If no model matches model_id
+            FileNotFoundError, ValueError: If the model cannot be loaded
+        """
+        name = self.resolve(model_id)
+        if name == self.default_name:
+            return self.default
+
+        with self._lock:
+            if name in self._loaded:
+                self._loaded.move_to_end(name)
+                self._hits.inc()
+                return self._loaded[name][0]
+            entry = self._entries.get(name)
+            if entry is None:
+                raise ModelNotFoundError(f"Model {name} was removed from {self.models_dir}")
+            load_lock = self._load_locks.setdefault(name, threading.Lock())
+
+        # One load per model; other models keep loading and serving meanwhile
+        with load_lock:
+            with self._lock:
+                if name in self._loaded:
+                    self._loaded.move_to_end(name)
+                    return self._loaded[name][0]
+
+            logger.info(f"Loading model {name} (version {entry.version}) into the registry")
+            loader = ModelLoader(str(entry.model_path), str(entry.artifact_path))
+            loader.load_model()
+            loader.warm()
+            predictor = Predictor(loader)
+            footprint = model_footprint(loader)
+
+            with self._lock:
+                self._loaded[name] = (predictor, footprint)
+                self._loads.inc()
+                self._evict()
+            return predictor
+
+    def _evict(self) -> None:
+        """Unload least recently used models until within the limits (lock held)"""
+        while len(self._loaded) > 1 and (
+            len(self._loaded) > self.max_loaded
+            or (self.max_bytes > 0 and self.loaded_bytes > self.max_bytes)
+        ):
+            name, (_, footprint) = self._loaded.popitem(last=False)
+            self._evictions.inc()
+            logger.info(f"Unloaded model {name} from the registry ({footprint / 2 ** 20:.1f} MiB)")
+        self._loaded_gauge.set(len(self._loaded))
+        self._bytes_gauge.set(self.loaded_bytes)
+
+    @property
+    def loaded_bytes(self) -> int:
+        return sum(footprint for _, footprint in self._loaded.values())
+
+    def list_models(self) -> List[Dict[str, object]]:
+        """
+        Describe every model in the directory and the default model
+
+        Returns:
+            One dictionary per model with name, version, loaded, default and path
+        """
+        entries = {entry.name: entry for entry in self.discover()}
+        default_loader = self.default.model_loader
+        models = [{
+            "name": self.default_name,
+            "version": default_loader.version,
+            "loaded": default_loader.is_loaded(),
+            "default": True,
+            "path": str(default_loader.model_path),
+        }]
+        with self._lock:
+            loaded = set(self._loaded)
+        for name, entry in sorted(entries.items()):
+            if name == self.default_name:
+                continue
+            models.append({
+                "name": name,
+                "version": entry.version,
+                "loaded": name in loaded,
+                "default": False,
+                "path": os.fspath(entry.model_path if entry.model_path.exists() else entry.artifact_path),
+            })
+        return models
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import os
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+from app.artifact import MANIFEST_FILE, file_sha256
+from app.model_loader import LoadedModel, ModelLoader
+
+logger = logging.getLogger(__name__)
+
+
+class ModelWatcher:
+    """
+    Reloads the model when its file changes on disk
+
+    Polls the mtime and size of MODEL_PATH and of the artifact manifest. A
+    change only triggers ModelLoader.reload_model when the model file's
+    sha256 differs from the version being served, so touching the file or
+    rebuilding the artifact of the same model does not reload it. Replace
+    the model file atomically (write elsewhere, then mv); a file caught
+    half-written fails to load, keeps the old version serving, and is
+    retried once it changes again.
+    """
+
+    def __init__(
+        self,
+        model_loader: ModelLoader,
+        interval_seconds: float,
+        on_reload: Optional[Callable[[LoadedModel], None]] = None
+    ):
+        """
+        Initialize ModelWatcher
+
+        Args:
+            model_loader: Loader whose model is reloaded
+            interval_seconds: Seconds between checks of the files
+            on_reload: Called with the new version after each reload
+        """
+        self.model_loader = model_loader
+        self.interval = interval_seconds
+        self.on_reload = on_reload
+        self._last_stat: Optional[Tuple] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """Start polling on the running event loop"""
+        if self.is_running:
+            return
+        self._last_stat = self._stat()
+        self._task = asyncio.create_task(self._run())
+        logger.info(f"Watching {self.model_loader.model_path} for model updates every {self.interval}s")
+
+    async def stop(self) -> None:
+        """Stop polling"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _stat(self) -> Tuple:
+        """(mtime, size) of the model file and the artifact manifest, None where missing"""
+        stats = []
+        for path in (Path(self.model_loader.model_path), self.model_loader.artifact_path / MANIFEST_FILE):
+            try:
+                stat = os.stat(path)
+                stats.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stats.append(None)
+        return tuple(stats)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.interval)
+            stat = self._stat()
+            if stat == self._last_stat:
+                continue
+            self._last_stat = stat
+            try:
+                # Hashing, loading and warming are blocking; keep them off the event loop
+                await loop.run_in_executor(None, self.check)
+            except Exception as e:
+                logger.error(f"Model reload after file change failed: {str(e)}")
+
+    def check(self) -> bool:
+        """
+        Reload the model if the file's contents differ from the version being served
+
+        Returns:
+            True if a new version was swapped in
+
+        Raises:
+            FileNotFoundError, ValueError: If the new file cannot be loaded
+                (the current version keeps serving)
+        """
+        model_path = Path(self.model_loader.model_path)
+        if not model_path.exists():
+            return False
+        current = self.model_loader.current
+        if current is not None and current.sha256 == file_sha256(model_path):
+            return False
+        logger.info(f"{model_path} changed, reloading model")
+        loaded = self.model_loader.reload_model()
+        if self.on_reload is not None:
+            self.on_reload(loaded)
+        return True
@@ -0,0 +1,67 @@
+from datetime import datetime
+from typing import Any
+
+import numpy as np
+import orjson
+from fastapi.responses import Response
+
+from app.columnar import MEDIA_TYPE as COLUMNAR_MEDIA_TYPE, encode_predictions
+from app.predict import ScoredBatch
+
+# Values of the format query parameter of the batch endpoints
+FULL_FORMAT = "full"
+COMPACT_FORMAT = "compact"
+
+
+class CompactJSONResponse(Response):
+    """
+    JSON response rendered with orjson
+
+    NumPy arrays are written straight from their buffer, without building
+    a Python float per element first.
+    """
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY)
+
+
+def compact_batch_response(scored: ScoredBatch) -> CompactJSONResponse:
+    """
+    Batch response with the predictions as a flat array of floats
+
+    Same keys as BatchPredictionOutput, but "predictions" holds one number
+    per row instead of one object with its own timestamp and model version.
+
+    Args:
+        scored: Predictions and model version of the batch
+
+    Returns:
+        Rendered response
+    """
+    # float64 so values print as in the full format (float32 would be rounded to its shortest form)
+    predictions = np.ascontiguousarray(scored.predictions, dtype=np.float64)
+    return CompactJSONResponse({
+        "predictions": predictions,
+        "total_records": len(predictions),
+        "timestamp": datetime.now().isoformat(),
+        "model_version": scored.model_version,
+    })
+
+
+def columnar_batch_response(scored: ScoredBatch) -> Response:
+    """
+    Batch response in the binary columnar format
+
+    A single "predictions" column in the predictions' own float dtype, with
+    total_records, timestamp and model_version in the header metadata.
+
+    Args:
+        scored: Predictions and model version of the batch
+
+    Returns:
+        Rendered response
+    """
+    body = encode_predictions(scored.predictions, scored.model_version)
+    return Response(body, media_type=COLUMNAR_MEDIA_TYPE)
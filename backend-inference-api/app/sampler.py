@@ -0,0 +1,186 @@
+import collections
+import logging
+import sys
+import threading
+import time
+from typing import Counter, Deque, Dict, Optional, Tuple
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# Frames at the top of a thread that is blocked waiting for work, (file suffix, function)
+IDLE_FRAMES = frozenset((
+    ("threading.py", "wait"),
+    ("selectors.py", "select"),
+    ("queue.py", "get"),
+    ("concurrent/futures/thread.py", "_worker"),
+    ("asyncio/runners.py", "run"),
+    ("asyncio/base_events.py", "run_forever"),
+    ("asyncio/base_events.py", "run_until_complete"),
+    ("multiprocessing/connection.py", "_recv"),
+))
+
+# Seconds of samples aggregated per slice of the rolling window
+SLICE_SECONDS = 10.0
+
+
+class StackSampler:
+    """
+    Sampling profiler for every thread of the process
+
+    A daemon thread wakes every interval_seconds, reads the current stack
+    of all other threads with sys._current_frames() and counts each stack.
+    Counts are kept in slices of SLICE_SECONDS covering the last
+    window_seconds, and served in the collapsed-stack format read by
+    flamegraph.pl, speedscope and inferno. Threads blocked waiting for
+    work are skipped unless include_idle is set.
+
+    The work per sample is a walk over each thread's frames, so the cost
+    grows with the number of threads and stack depth but not with traffic;
+    the measured share of wall time is exported as sampler_overhead_ratio.
+    """
+
+    def __init__(
+        self,
+        interval_seconds: float = 0.02,
+        window_seconds: float = 300.0,
+        max_depth: int = 128,
+        include_idle: bool = False
+    ):
+        """
+        Initialize StackSampler
+
+        Args:
+            interval_seconds: Time between samples
+            window_seconds: Age of the oldest samples kept
+            max_depth: Frames kept per stack (innermost ones)
+            include_idle: Also count threads waiting for work
+        """
+        self.interval = max(0.001, interval_seconds)
+        self.window = window_seconds
+        self.max_depth = max_depth
+        self.include_idle = include_idle
+        # (slice start, stack counts) from oldest to newest
+        self._slices: Deque[Tuple[float, Counter[str]]] = collections.deque()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # code object -> frame label, labels are built once per function
+        self._labels: Dict[object, str] = {}
+
+        self._samples = metrics.counter("sampler_samples_total", "Stacks recorded by the sampling profiler")
+        self._overhead = metrics.gauge("sampler_overhead_ratio", "Share of wall time spent taking samples")
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the sampling thread"""
+        if self.is_running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+        logger.info(f"Sampling profiler started ({1 / self.interval:.0f} Hz, {self.window:.0f}s window)")
+
+    def stop(self) -> None:
+        """Stop the sampling thread"""
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own_id = threading.get_ident()
+        busy = 0.0
+        started = time.monotonic()
+        while not self._stop.wait(self.interval):
+            sample_started = time.perf_counter()
+            self.sample(exclude=own_id)
+            busy += time.perf_counter() - sample_started
+
+            elapsed = time.monotonic() - started
+            if elapsed >= SLICE_SECONDS:
+                self._overhead.set(busy / elapsed)
+                busy, started = 0.0, time.monotonic()
+
+    def sample(self, exclude: Optional[int] = None) -> int:
+        """
+        Record the current stack of every thread
+
+        Args:
+            exclude: Thread id to skip (the sampling thread itself)
+
+        Returns:
+            Number of stacks recorded
+        """
+        names = {thread.ident: thread.name for thread in threading.enumerate()}
+        stacks = []
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == exclude:
+                continue
+            if not self.include_idle and self._is_idle(frame):
+                continue
+            stacks.append(self._collapse(names.get(thread_id, str(thread_id)), frame))
+
+        now = time.monotonic()
+        with self._lock:
+            if not self._slices or now - self._slices[-1][0] >= SLICE_SECONDS:
+                self._slices.append((now, collections.Counter()))
+                while self._slices and now - self._slices[0][0] > self.window + SLICE_SECONDS:
+                    self._slices.popleft()
+            self._slices[-1][1].update(stacks)
+        self._samples.inc(len(stacks))
+        return len(stacks)
+
+    @staticmethod
+    def _is_idle(frame) -> bool:
+        filename = frame.f_code.co_filename
+        name = frame.f_code.co_name
+        return any(filename.endswith(suffix) and name == function for suffix, function in IDLE_FRAMES)
+
+    def _label(self, code) -> str:
+        label = self._labels.get(code)
+        if label is None:
+            filename = code.co_filename
+            if "-packages/" in filename:
+                # site-packages/numpy/... -> numpy/...
+                filename = filename.split("-packages/", 1)[1]
+            elif "/lib/python" in filename:
+                # /usr/lib/python3.11/threading.py -> threading.py
+                filename = filename.split("/lib/python", 1)[1].split("/", 1)[-1]
+            elif "/app/" in filename:
+                filename = "app/" + filename.rsplit("/app/", 1)[1]
+            # ";" separates frames in the collapsed format
+            label = f"{code.co_name} ({filename}:{code.co_firstlineno})".replace(";", ":")
+            self._labels[code] = label
+        return label
+
+    def _collapse(self, thread_name: str, frame) -> str:
+        """Thread name and frames from outermost to innermost, joined with ';'"""
+        labels = []
+        while frame is not None and len(labels) < self.max_depth:
+            labels.append(self._label(frame.f_code))
+            frame = frame.f_back
+        labels.append(thread_name.replace(";", ":").replace(" ", "_"))
+        return ";".join(reversed(labels))
+
+    def collapsed(self, seconds: Optional[float] = None) -> str:
+        """
+        Stacks of the last seconds in the collapsed-stack format
+
+        Args:
+            seconds: Age of the oldest samples included (defaults to the whole window)
+
+        Returns:
+            One "frame;frame;frame count" line per distinct stack
+        """
+        cutoff = time.monotonic() - (self.window if seconds is None else seconds) - SLICE_SECONDS
+        totals: Counter[str] = collections.Counter()
+        with self._lock:
+            for slice_start, counts in self._slices:
+                if slice_start >= cutoff:
+                    totals.update(counts)
+        return "".join(f"{stack} {count}\n" for stack, count in sorted(totals.items()))
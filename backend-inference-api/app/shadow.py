@@ -0,0 +1,218 @@
+import logging
+import queue
+import random
+import threading
+import time
+from typing import Any, Dict, List, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from app.metrics import metrics
+from app.registry import ModelRegistry
+
+logger = logging.getLogger(__name__)
+
+# Percentiles of the absolute difference reported per model pair
+PERCENTILES = (50, 90, 99)
+
+
+class DivergenceStats:
+    """
+    Differences between primary and shadow predictions for one pair of model versions
+
+    Count, mean and maximum cover every compared row; percentiles are
+    computed over the last window rows.
+    """
+
+    def __init__(self, window: int):
+        self.rows = 0
+        self.batches = 0
+        self._sum_abs = 0.0
+        self._sum_diff = 0.0
+        self._max_abs = 0.0
+        # Ring buffer of the most recent absolute differences
+        self._window = np.zeros(max(1, window), dtype=np.float64)
+        self._position = 0
+        self._lock = threading.Lock()
+
+    def add(self, primary: np.ndarray, shadow: np.ndarray) -> None:
+        """Record a batch of predictions from both models"""
+        diff = np.asarray(shadow, dtype=np.float64) - np.asarray(primary, dtype=np.float64)
+        abs_diff = np.abs(diff)
+        with self._lock:
+            self.rows += len(diff)
+            self.batches += 1
+            self._sum_abs += float(abs_diff.sum())
+            self._sum_diff += float(diff.sum())
+            self._max_abs = max(self._max_abs, float(abs_diff.max(initial=0.0)))
+
+            size = len(self._window)
+            recent = abs_diff[-size:]
+            positions = (self._position + np.arange(len(recent))) % size
+            self._window[positions] = recent
+            self._position += len(recent)
+
+    def snapshot(self) -> Dict[str, float]:
+        """Current statistics as plain numbers"""
+        with self._lock:
+            recent = self._window[:min(self._position, len(self._window))]
+            result = {
+                "rows": self.rows,
+                "batches": self.batches,
+                "mean_abs_diff": self._sum_abs / self.rows if self.rows else 0.0,
+                "mean_diff": self._sum_diff / self.rows if self.rows else 0.0,
+                "max_abs_diff": self._max_abs,
+            }
+            for percentile, value in zip(
+                PERCENTILES,
+                np.percentile(recent, PERCENTILES) if len(recent) else [0.0] * len(PERCENTILES)
+            ):
+                result[f"p{percentile}_abs_diff"] = float(value)
+        return result
+
+
+class ShadowScorer:
+    """
+    Scores a sample of live traffic with a shadow model off the request path
+
+    Request handlers call submit() with the rows they scored and the primary
+    predictions; a sampled batch is queued without blocking (and dropped
+    when the queue is full) and a background thread scores it with the
+    shadow model from the ModelRegistry, recording divergence statistics
+    per (primary version, shadow version) pair. Shadow failures are logged
+    and counted, never raised to clients.
+    """
+
+    def __init__(
+        self,
+        registry: ModelRegistry,
+        shadow_model: str,
+        sample_rate: float,
+        max_queue: int = 1000,
+        window: int = 10000
+    ):
+        """
+        Initialize ShadowScorer
+
+        Args:
+            registry: Registry the shadow model is loaded from
+            shadow_model: Name or version prefix of the shadow model
+            sample_rate: Fraction of requests scored by the shadow model (0..1)
+            max_queue: Sampled batches waiting to be scored before new ones are dropped
+            window: Rows per model pair kept for the percentiles
+        """
+        self.registry = registry
+        self.shadow_model = shadow_model
+        self.sample_rate = min(1.0, max(0.0, sample_rate))
+        self.window = window
+        self._queue: "queue.Queue[Optional[Tuple[Any, np.ndarray, Optional[str]]]]" = queue.Queue(
+            maxsize=max(1, max_queue)
+        )
+        self._stats: Dict[Tuple[Optional[str], str], DivergenceStats] = {}
+        self._stats_lock = threading.Lock()
+        self._thread: Optional[threading.Thread] = None
+
+        self._sampled = metrics.counter("shadow_sampled_total", "Requests queued for shadow scoring")
+        self._dropped = metrics.counter("shadow_dropped_total", "Sampled requests dropped because the queue was full")
+        self._errors = metrics.counter("shadow_errors_total", "Shadow scoring failures")
+        self._rows = metrics.counter("shadow_rows_total", "Rows scored by the shadow model")
+        self._latency = metrics.histogram("shadow_scoring_seconds", "Time to score a sampled request with the shadow model")
+        self._queue_depth = metrics.gauge("shadow_queue_depth", "Sampled requests waiting for the shadow model")
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def start(self) -> None:
+        """Start the background scoring thread"""
+        if self.is_running:
+            return
+        self._thread = threading.Thread(target=self._run, name="shadow-scorer", daemon=True)
+        self._thread.start()
+        logger.info(f"Shadow scoring {self.sample_rate:.1%} of requests with model {self.shadow_model}")
+
+    def stop(self, timeout: float = 5.0) -> None:
+        """Stop the scoring thread after the batch it is working on"""
+        thread, self._thread = self._thread, None
+        if thread is None:
+            return
+        # submit() no longer queues; drop pending samples to make room for the stop marker
+        while True:
+            try:
+                self._queue.get_nowait()
+            except queue.Empty:
+                break
+        self._queue.put(None)
+        thread.join(timeout)
+
+    def submit(
+        self,
+        records: Union[List[Dict[str, Any]], Mapping[str, Any]],
+        predictions: Sequence[float],
+        model_version: Optional[str]
+    ) -> bool:
+        """
+        Queue a scored request for the shadow model if it is sampled
+
+        Never blocks.
+
+        Args:
+            records: Rows the primary model scored, as row dictionaries or
+                a mapping of column arrays
+            predictions: Primary predictions for the rows
+            model_version: Version of the primary model
+
+        Returns:
+            True if the request was queued
+        """
+        if not self.is_running or random.random() >= self.sample_rate:
+            return False
+        try:
+            self._queue.put_nowait((records, np.asarray(predictions), model_version))
+        except queue.Full:
+            self._dropped.inc()
+            return False
+        self._sampled.inc()
+        self._queue_depth.set(self._queue.qsize())
+        return True
+
+    def _run(self) -> None:
+        while True:
+            item = self._queue.get()
+            self._queue_depth.set(self._queue.qsize())
+            if item is None:
+                return
+            records, primary, primary_version = item
+            try:
+                self._score(records, primary, primary_version)
+            except Exception as e:
+                self._errors.inc()
+                logger.warning(f"Shadow scoring with model {self.shadow_model} failed: {str(e)}")
+
+    def _score(
+        self,
+        records: Union[List[Dict[str, Any]], Mapping[str, Any]],
+        primary: np.ndarray,
+        primary_version: Optional[str]
+    ) -> None:
+        started = time.monotonic()
+        shadow = self.registry.get(self.shadow_model)
+        scored = shadow.score_columns(records) if isinstance(records, Mapping) else shadow.score_records(records)
+        self._latency.observe(time.monotonic() - started)
+        self._rows.inc(len(primary))
+
+        key = (primary_version, scored.model_version)
+        with self._stats_lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                stats = self._stats[key] = DivergenceStats(self.window)
+        stats.add(primary, scored.predictions)
+
+    def snapshot(self) -> List[Dict[str, Any]]:
+        """Divergence statistics for every model pair seen so far"""
+        with self._stats_lock:
+            items = list(self._stats.items())
+        return [
+            {"primary_version": primary, "shadow_version": shadow, **stats.snapshot()}
+            for (primary, shadow), stats in items
+        ]
@@ -0,0 +1,234 @@
+import hashlib
+import logging
+import time
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Dict, Hashable, List, Sequence, Tuple
+
+import numpy as np
+
+from app.metrics import metrics
+from app.prediction_cache import make_key
+
+logger = logging.getLogger(__name__)
+
+# One table slot: 64-bit feature hash, model version, prediction, write time
+# and a checksum over the other fields. Slots are written without locks, so
+# a reader that sees a half-written slot gets a checksum mismatch (a miss).
+SLOT_DTYPE = np.dtype([
+    ("key", "<u8"),
+    ("version", "<u8"),
+    ("value", "<f8"),
+    ("stamp", "<f8"),
+    ("check", "<u8"),
+])
+HEADER_DTYPE = np.dtype([("magic", "<u8"), ("n_slots", "<u8")])
+HEADER_BYTES = 64
+MAGIC = 0x53554B4152543031
+# Keeps all-zero (never written) slots from passing the checksum
+CHECK_SALT = np.uint64(0x9E3779B97F4A7C15)
+
+# Slots probed per key; a key lives in one of the PROBE_SLOTS slots after its home slot
+PROBE_SLOTS = 8
+
+# Attempts to attach while another worker is still creating the segment
+ATTACH_RETRIES = 50
+
+
+def hash_key(key: Tuple) -> int:
+    """Stable 64-bit hash of a cache key (never 0, which marks empty slots)"""
+    digest = hashlib.blake2b(repr(key).encode(), digest_size=8).digest()
+    return int.from_bytes(digest, "little") or 1
+
+
+def _checksum(key: np.ndarray, version: np.ndarray, value: np.ndarray, stamp: np.ndarray) -> np.ndarray:
+    return (
+        np.asarray(key, dtype=np.uint64)
+        ^ np.asarray(version, dtype=np.uint64)
+        ^ np.ascontiguousarray(value, dtype=np.float64).view(np.uint64)
+        ^ np.ascontiguousarray(stamp, dtype=np.float64).view(np.uint64)
+        ^ CHECK_SALT
+    )
+
+
+class SharedPredictionCache:
+    """
+    Prediction cache shared by every worker process on the host
+
+    A fixed-size open-addressing hash table in a named
+    multiprocessing.shared_memory segment: the first worker creates it and
+    the others attach by name, so one warm table serves all uvicorn
+    workers and memory use is n_slots * SLOT_DTYPE.itemsize regardless of
+    traffic. Keys are hashed with a stable 64-bit hash and looked up in a
+    window of PROBE_SLOTS slots; on insert the key's own slot, an empty,
+    expired or other-model slot is reused, otherwise the oldest entry in
+    the window is evicted. Each entry records the model version it was
+    computed with and only matches lookups for the same version.
+    """
+
+    # LoadedModel attribute identifying the model the entries belong to
+    version_attribute = "fingerprint"
+
+    def __init__(self, name: str, n_slots: int, ttl_seconds: float = 0.0, quantum: float = 0.0):
+        """
+        Initialize SharedPredictionCache
+
+        Args:
+            name: Name of the shared memory segment
+            n_slots: Table size, rounded up to a power of two
+            ttl_seconds: Lifetime of an entry (0 disables expiry)
+            quantum: Grid numeric features are rounded to when building keys
+
+        Raises:
+            ValueError: If an existing segment has a different layout
+        """
+        self.name = name
+        self.n_slots = 1 << max(PROBE_SLOTS, int(n_slots) - 1).bit_length()
+        self.ttl_seconds = ttl_seconds
+        self.quantum = quantum
+        self._mask = np.uint64(self.n_slots - 1)
+        self._probe = np.arange(PROBE_SLOTS, dtype=np.uint64)
+
+        self._shm = self._open(name, HEADER_BYTES + self.n_slots * SLOT_DTYPE.itemsize)
+        header = np.ndarray((), dtype=HEADER_DTYPE, buffer=self._shm.buf)
+        if header["magic"] == 0:
+            # Fresh segment is zero-filled; concurrent initializers write the same values
+            header["n_slots"] = self.n_slots
+            header["magic"] = MAGIC
+        elif header["magic"] != MAGIC or header["n_slots"] != self.n_slots:
+            n_existing = int(header["n_slots"])
+            self._shm.close()
+            raise ValueError(
+                f"Shared memory segment {name} has an incompatible layout "
+                f"({n_existing} slots, expected {self.n_slots})"
+            )
+        self._slots = np.ndarray((self.n_slots,), dtype=SLOT_DTYPE, buffer=self._shm.buf, offset=HEADER_BYTES)
+
+        self._hits = metrics.counter("shared_cache_hits_total", "Rows served from the shared prediction cache")
+        self._misses = metrics.counter("shared_cache_misses_total", "Rows not found in the shared prediction cache")
+        self._evictions = metrics.counter(
+            "shared_cache_evictions_total", "Live entries overwritten because their probe window was full"
+        )
+        metrics.gauge("shared_cache_slots", "Slots in the shared prediction cache").set(self.n_slots)
+
+    @staticmethod
+    def _open(name: str, size: int) -> shared_memory.SharedMemory:
+        """Create the named segment, or attach to it if another worker already did"""
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+            logger.info(f"Created shared prediction cache {name} ({size} bytes)")
+        except FileExistsError:
+            for _ in range(ATTACH_RETRIES):
+                try:
+                    shm = shared_memory.SharedMemory(name=name)
+                    if shm.size >= size:
+                        break
+                    shm.close()
+                except (FileNotFoundError, ValueError):
+                    # Creator has not sized the segment yet
+                    pass
+                time.sleep(0.01)
+            else:
+                raise ValueError(f"Shared memory segment {name} is smaller than {size} bytes")
+            logger.info(f"Attached to shared prediction cache {name}")
+
+        # The segment outlives any single worker; without this the resource
+        # tracker unlinks it when the first process that touched it exits
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+    def make_key(self, record: Dict[str, Any]) -> int:
+        """Build the 64-bit cache key for one row of raw features"""
+        return hash_key(make_key(record, self.quantum))
+
+    def _windows(self, hashes: np.ndarray) -> np.ndarray:
+        """Slot indices probed for each hash, shape (n, PROBE_SLOTS)"""
+        return ((hashes[:, None] + self._probe) & self._mask).astype(np.int64)
+
+    def _live(self, slots: np.ndarray, version: int, now: float) -> np.ndarray:
+        """Slots that are fully written, belong to version and have not expired"""
+        live = (slots["version"] == np.uint64(version)) & (
+            slots["check"] == _checksum(slots["key"], slots["version"], slots["value"], slots["stamp"])
+        )
+        if self.ttl_seconds > 0:
+            live &= slots["stamp"] > now - self.ttl_seconds
+        return live
+
+    def get_many(self, keys: Sequence[Hashable], version: int) -> Tuple[np.ndarray, List[int]]:
+        """
+        Look up predictions for a batch of keys
+
+        Args:
+            keys: Keys built with make_key
+            version: Fingerprint of the currently loaded model
+
+        Returns:
+            Tuple of (float32 predictions with cached values filled in,
+            positions of the keys that were not found)
+        """
+        hashes = np.asarray(keys, dtype=np.uint64).reshape(-1)
+        if len(hashes) == 0:
+            return np.empty(0, dtype=np.float32), []
+
+        # Copy the windows out first so a concurrent writer cannot change them mid-check
+        slots = self._slots[self._windows(hashes)]
+        found = (slots["key"] == hashes[:, None]) & self._live(slots, version, time.time())
+
+        hit = found.any(axis=1)
+        first = found.argmax(axis=1)
+        predictions = slots["value"][np.arange(len(hashes)), first].astype(np.float32)
+        missing = np.flatnonzero(~hit).tolist()
+
+        self._hits.inc(len(hashes) - len(missing))
+        self._misses.inc(len(missing))
+        return predictions, missing
+
+    def put_many(self, keys: Sequence[Hashable], predictions: Sequence[float], version: int) -> None:
+        """
+        Store predictions computed by the model with the given fingerprint
+
+        Args:
+            keys: Keys built with make_key
+            predictions: Prediction for each key
+            version: Fingerprint of the model that computed them
+        """
+        hashes = np.asarray(keys, dtype=np.uint64).reshape(-1)
+        if len(hashes) == 0:
+            return
+        now = time.time()
+        version_u8 = np.uint64(version)
+
+        for key, window, prediction in zip(hashes, self._windows(hashes), predictions):
+            slots = self._slots[window]
+            live = self._live(slots, version, now)
+
+            same = np.flatnonzero(slots["key"] == key)
+            if same.size:
+                target = same[0]
+            elif not live.all():
+                target = int(np.argmin(live))
+            else:
+                target = int(np.argmin(slots["stamp"]))
+                self._evictions.inc()
+
+            value = np.float64(prediction)
+            stamp = np.float64(now)
+            check = _checksum(key, version_u8, value, stamp).reshape(-1)[0]
+            self._slots[window[target]] = (key, version_u8, value, stamp, check)
+
+    def clear(self) -> None:
+        """Drop every cached prediction (for all workers)"""
+        self._slots[:] = np.zeros((), dtype=SLOT_DTYPE)
+
+    def close(self) -> None:
+        """Detach from the shared memory segment"""
+        self._slots = None
+        self._shm.close()
+
+    def unlink(self) -> None:
+        """Remove the shared memory segment once every worker has closed it"""
+        # unlink() unregisters from the resource tracker, so register it back first
+        resource_tracker.register(self._shm._name, "shared_memory")
+        self._shm.unlink()
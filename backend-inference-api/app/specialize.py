@@ -0,0 +1,260 @@
+import logging
+import threading
+from collections import OrderedDict
+from typing import Callable, List, Optional
+
+import numpy as np
+
+from app.metrics import metrics
+from app.tree_ensemble import TreeEnsemble
+
+logger = logging.getLogger(__name__)
+
+# Grids are only built when the pruned trees split on at most this many features
+MAX_GRID_FEATURES = 2
+
+
+class SpecializedEnsemble:
+    """
+    Tree ensemble pruned for one combination of categorical inputs
+
+    When the pruned trees split on few enough numeric features, the
+    ensemble is also compiled into a lookup grid: the thresholds of each
+    remaining feature cut its axis into cells and the ensemble is constant
+    inside every cell, so scoring a row is one searchsorted per feature
+    plus a single gather. Rows with missing values in those features fall
+    back to the pruned trees.
+    """
+
+    def __init__(self, ensemble: TreeEnsemble, max_grid_cells: int):
+        """
+        Initialize SpecializedEnsemble
+
+        Args:
+            ensemble: Pruned tree ensemble
+            max_grid_cells: Largest lookup grid to build (0 disables grids)
+        """
+        self.ensemble = ensemble
+        self.grid_features: List[int] = []
+        self.edges: List[np.ndarray] = []
+        self.grid: Optional[np.ndarray] = None
+
+        features = ensemble.split_features()
+        if len(features) > MAX_GRID_FEATURES or max_grid_cells <= 0:
+            return
+
+        internal = ensemble.left != ensemble.right
+        edges = [
+            np.unique(ensemble.threshold[internal & (ensemble.feature == f)]).astype(np.float32)
+            for f in features
+        ]
+        shape = tuple(len(e) + 1 for e in edges)
+        if int(np.prod(shape, dtype=np.int64)) > max_grid_cells:
+            return
+
+        self.grid_features = features
+        self.edges = edges
+        self.grid = self._paint(shape)
+
+    @property
+    def nbytes(self) -> int:
+        grid_bytes = self.grid.nbytes if self.grid is not None else 0
+        arrays = (self.ensemble.feature, self.ensemble.threshold, self.ensemble.left,
+                  self.ensemble.right, self.ensemble.default_left, self.ensemble.value)
+        return grid_bytes + sum(a.nbytes for a in arrays)
+
+    def _paint(self, shape: tuple) -> np.ndarray:
+        """
+        Add every leaf's value to the grid cells its region covers
+
+        Trees are painted in order, so each cell sums leaf values in the
+        same float32 order as XGBoost and the grid matches it exactly.
+        """
+        ensemble = self.ensemble
+        position = {feature: axis for axis, feature in enumerate(self.grid_features)}
+        grid = np.full(shape, ensemble.base_score, dtype=np.float32)
+
+        for root in ensemble.roots:
+            stack = [(int(root), [(0, n) for n in shape])]
+            while stack:
+                node, bounds = stack.pop()
+                if ensemble.left[node] == ensemble.right[node]:
+                    grid[tuple(slice(lo, hi) for lo, hi in bounds)] += ensemble.value[node]
+                    continue
+
+                axis = position[int(ensemble.feature[node])]
+                # Cell j holds values with j thresholds <= x, so x < edges[k] means j <= k
+                split = int(np.searchsorted(self.edges[axis], ensemble.threshold[node])) + 1
+                lo, hi = bounds[axis]
+                if lo < min(hi, split):
+                    left_bounds = list(bounds)
+                    left_bounds[axis] = (lo, min(hi, split))
+                    stack.append((int(ensemble.left[node]), left_bounds))
+                if max(lo, split) < hi:
+                    right_bounds = list(bounds)
+                    right_bounds[axis] = (max(lo, split), hi)
+                    stack.append((int(ensemble.right[node]), right_bounds))
+        return grid
+
+    def predict(self, X: np.ndarray) -> np.ndarray:
+        """
+        Score rows that share this categorical combination
+
+        Args:
+            X: float32 feature matrix, NaN marks missing values
+
+        Returns:
+            float32 array of predictions
+        """
+        if self.grid is None:
+            return self.ensemble.predict(X)
+
+        values = X[:, self.grid_features]
+        cells = tuple(
+            np.searchsorted(edges, values[:, axis], side="right")
+            for axis, edges in enumerate(self.edges)
+        )
+        predictions = self.grid[cells]
+
+        missing = np.isnan(values).any(axis=1)
+        if missing.any():
+            predictions[missing] = self.ensemble.predict(X[missing])
+        return predictions
+
+
+class EnsembleSpecializer:
+    """
+    Tree ensembles specialized per combination of categorical inputs
+
+    Once the one-hot and ordinal columns of a row are fixed, most
+    categorical splits are decided. The first row seen for a combination
+    pays for pruning those splits away; the pruned ensemble is kept in a
+    bounded LRU so later rows only traverse the numeric splits.
+    """
+
+    def __init__(
+        self,
+        ensemble: TreeEnsemble,
+        categorical_columns: List[int],
+        max_entries: int,
+        max_grid_cells: int = 0
+    ):
+        """
+        Initialize EnsembleSpecializer
+
+        Args:
+            ensemble: Full tree ensemble
+            categorical_columns: Encoded feature columns derived from categorical inputs
+            max_entries: Maximum number of specialized ensembles kept in memory
+            max_grid_cells: Largest lookup grid built per combination (0 disables grids)
+        """
+        self.ensemble = ensemble
+        self.categorical_columns = np.asarray(categorical_columns, dtype=np.int64)
+        self.max_entries = max(1, max_entries)
+        self.max_grid_cells = max_grid_cells
+        self._cache: "OrderedDict[bytes, SpecializedEnsemble]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hits = metrics.counter(
+            "specialization_cache_hits_total", "Lookups served by a cached specialized ensemble"
+        )
+        self._misses = metrics.counter(
+            "specialization_cache_misses_total", "Lookups that had to prune a new ensemble"
+        )
+        self._evictions = metrics.counter(
+            "specialization_cache_evictions_total", "Specialized ensembles evicted from the LRU"
+        )
+        self._size = metrics.gauge(
+            "specialization_cache_size", "Specialized ensembles currently cached"
+        )
+        self._bytes = metrics.gauge(
+            "specialization_cache_bytes", "Memory held by cached specialized ensembles"
+        )
+        # A reloaded model starts with an empty cache
+        self._size.set(0)
+        self._bytes.set(0)
+
+    def get(self, categorical_values: np.ndarray) -> SpecializedEnsemble:
+        """
+        Get the ensemble specialized for one combination of categorical columns
+
+        Args:
+            categorical_values: Encoded values of categorical_columns (float32, NaN for absent)
+
+        Returns:
+            SpecializedEnsemble for that combination
+        """
+        key = np.ascontiguousarray(categorical_values, dtype=np.float32).tobytes()
+        with self._lock:
+            specialized = self._cache.get(key)
+            if specialized is not None:
+                self._cache.move_to_end(key)
+                self._hits.inc()
+                return specialized
+
+        # Prune outside the lock; two threads racing on one key just build it twice
+        self._misses.inc()
+        fixed = {
+            int(column): float(value)
+            for column, value in zip(self.categorical_columns, categorical_values)
+        }
+        specialized = SpecializedEnsemble(self.ensemble.specialize(fixed), self.max_grid_cells)
+
+        with self._lock:
+            previous = self._cache.pop(key, None)
+            if previous is not None:
+                self._bytes.dec(previous.nbytes)
+            self._cache[key] = specialized
+            self._bytes.inc(specialized.nbytes)
+            while len(self._cache) > self.max_entries:
+                _, evicted = self._cache.popitem(last=False)
+                self._bytes.dec(evicted.nbytes)
+                self._evictions.inc()
+            self._size.set(len(self._cache))
+        return specialized
+
+    def predict(
+        self,
+        X: np.ndarray,
+        fallback: Optional[Callable[[np.ndarray], np.ndarray]] = None,
+        min_group_rows: int = 1
+    ) -> np.ndarray:
+        """
+        Score rows, grouping them by categorical combination
+
+        Each group costs one cache lookup plus a grid lookup, so batches
+        spread over many combinations are cheaper to score with the full
+        ensemble; those are handed to fallback.
+
+        Args:
+            X: float32 feature matrix, NaN marks missing values
+            fallback: Scores X when it has fewer than min_group_rows rows per combination
+            min_group_rows: Average rows per combination needed to specialize
+
+        Returns:
+            float32 array of predictions
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+        if n_rows == 0:
+            return np.empty(0, dtype=np.float32)
+
+        categorical = np.ascontiguousarray(X[:, self.categorical_columns])
+        if n_rows == 1:
+            return self.get(categorical[0]).predict(X)
+
+        row_keys = categorical.view(np.dtype((np.void, categorical.dtype.itemsize * categorical.shape[1])))
+        _, first_rows, inverse = np.unique(row_keys.ravel(), return_index=True, return_inverse=True)
+        if fallback is not None and len(first_rows) > max(1, n_rows // max(1, min_group_rows)):
+            return fallback(X)
+
+        predictions = np.empty(n_rows, dtype=np.float32)
+        order = np.argsort(inverse, kind="stable")
+        bounds = np.cumsum(np.bincount(inverse))
+        start = 0
+        for group, stop in enumerate(bounds):
+            rows = order[start:stop]
+            specialized = self.get(categorical[first_rows[group]])
+            predictions[rows] = specialized.predict(X[rows])
+            start = stop
+        return predictions
@@ -0,0 +1,120 @@
+import asyncio
+from typing import Any, AsyncIterator, Dict, List, Sequence
+
+import numpy as np
+import orjson
+from starlette.responses import StreamingResponse
+from starlette.types import Receive
+
+NDJSON_MEDIA_TYPE = "application/x-ndjson"
+
+
+class StreamFormatError(ValueError):
+    """Raised when an NDJSON request body cannot be split into rows"""
+
+    def __init__(self, row: int, message: str):
+        super().__init__(f"Row {row}: {message}")
+        self.row = row
+
+
+async def read_ndjson_rows(
+    byte_chunks: AsyncIterator[bytes],
+    chunk_rows: int,
+    max_line_bytes: int
+) -> AsyncIterator[List[Any]]:
+    """
+    Decode an NDJSON byte stream into lists of rows
+
+    Lists are yielded as soon as chunk_rows rows have arrived (the last one
+    may be shorter), so at most one list of rows and one partial line are
+    held at a time, whatever the size of the stream. Blank lines are skipped.
+
+    Args:
+        byte_chunks: Body chunks as received (e.g. Request.stream())
+        chunk_rows: Rows per yielded list
+        max_line_bytes: Longest accepted line
+
+    Raises:
+        StreamFormatError: On a line that is not JSON or is too long
+    """
+    chunk_rows = max(1, chunk_rows)
+    rows: List[Any] = []
+    row_number = 0
+    pending = b""
+    finished = False
+    while not finished:
+        try:
+            data = await byte_chunks.__anext__()
+        except StopAsyncIteration:
+            data, finished = b"", True
+
+        lines = (pending + data).split(b"\n")
+        # Last piece is an incomplete line unless the stream has ended
+        pending = b"" if finished else lines.pop()
+        if len(pending) > max_line_bytes:
+            raise StreamFormatError(row_number, f"Line is longer than {max_line_bytes} bytes")
+
+        for line in lines:
+            line = line.strip()
+            if not line:
+                continue
+            if len(line) > max_line_bytes:
+                raise StreamFormatError(row_number, f"Line is longer than {max_line_bytes} bytes")
+            try:
+                rows.append(orjson.loads(line))
+            except orjson.JSONDecodeError as e:
+                raise StreamFormatError(row_number, f"Invalid JSON: {e.msg}")
+            row_number += 1
+            if len(rows) >= chunk_rows:
+                yield rows
+                rows = []
+
+    if rows:
+        yield rows
+
+
+def rows_to_columns(rows: List[Any], features: Sequence[str]) -> Dict[str, List[Any]]:
+    """
+    Transpose decoded rows into one list per feature
+
+    A row that is not an object, or lacks a feature, contributes None,
+    which columns_from_json reports as an invalid value at that row.
+    """
+    return {
+        feature: [row.get(feature) if isinstance(row, dict) else None for row in rows]
+        for feature in features
+    }
+
+
+def ndjson_predictions(predictions: np.ndarray, model_version: Any) -> bytes:
+    """One {"predicted_revenue", "model_version"} line per prediction"""
+    # float64 so values print as in the JSON batch responses
+    return b"".join(
+        orjson.dumps({"predicted_revenue": value, "model_version": model_version}) + b"\n"
+        for value in np.asarray(predictions, dtype=np.float64).tolist()
+    )
+
+
+def ndjson_error(row: int, error_type: str, message: str) -> bytes:
+    """Line ending a stream that failed at a row"""
+    return orjson.dumps({"error": {"row": row, "type": error_type, "msg": message}}) + b"\n"
+
+
+class RequestStreamingResponse(StreamingResponse):
+    """
+    StreamingResponse whose content iterator reads the request body
+
+    StreamingResponse watches for the client disconnecting by receiving
+    messages from the client, which would take request body chunks away
+    from the content iterator. Here it starts watching only once
+    body_consumed is set (disconnects during the upload surface in the
+    iterator as ClientDisconnect instead).
+    """
+
+    def __init__(self, content: AsyncIterator[bytes], body_consumed: asyncio.Event, **kwargs: Any):
+        super().__init__(content, **kwargs)
+        self.body_consumed = body_consumed
+
+    async def listen_for_disconnect(self, receive: Receive) -> None:
+        await self.body_consumed.wait()
+        await super().listen_for_disconnect(receive)
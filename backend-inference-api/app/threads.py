@@ -0,0 +1,338 @@
+import copy
+import fcntl
+import json
+import logging
+import math
+import os
+import tempfile
+import threading
+import time
+import weakref
+from contextlib import contextmanager
+from multiprocessing import resource_tracker, shared_memory
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+
+from app.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+# One slot per worker process: its pid and the XGBoost threads its calls are using
+SLOT_DTYPE = np.dtype([("pid", "<i8"), ("threads", "<i8")])
+MAX_PROCESSES = 256
+
+# Batch sizes timed by the calibration
+CALIBRATION_SIZES = (16, 64, 256, 1024, 4096, 16384)
+# A thread count is used from the smallest size where it is this much faster than the previous one
+CALIBRATION_MARGIN = 0.1
+CALIBRATION_REPEATS = 3
+
+
+def available_cpus() -> int:
+    """CPUs this process may run on: its affinity mask, capped by a cgroup CPU quota"""
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:
+        cpus = os.cpu_count() or 1
+
+    quota = None
+    try:
+        # cgroup v2: "<quota> <period>" or "max <period>"
+        with open("/sys/fs/cgroup/cpu.max") as f:
+            limit, period = f.read().split()[:2]
+        if limit != "max":
+            quota = int(limit) / int(period)
+    except (OSError, ValueError):
+        try:
+            # cgroup v1: quota of -1 means unlimited
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_quota_us") as f:
+                limit = int(f.read())
+            with open("/sys/fs/cgroup/cpu/cpu.cfs_period_us") as f:
+                period = int(f.read())
+            if limit > 0 and period > 0:
+                quota = limit / period
+        except (OSError, ValueError):
+            pass
+
+    if quota is not None:
+        cpus = min(cpus, math.ceil(quota))
+    return max(1, cpus)
+
+
+def thread_levels(cpus: int) -> List[int]:
+    """Thread counts tried: powers of two below cpus, then cpus"""
+    levels = [1]
+    while levels[-1] * 2 < cpus:
+        levels.append(levels[-1] * 2)
+    if cpus > 1:
+        levels.append(cpus)
+    return levels
+
+
+class SharedThreadUsage:
+    """
+    XGBoost threads in use by every worker process on the host
+
+    A table of MAX_PROCESSES (pid, threads) slots in a named
+    multiprocessing.shared_memory segment. Each worker claims one slot (under
+    a file lock, reusing slots of dead workers) and only ever writes its
+    own, so the total is read without locks.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self._shm = self._open(name, MAX_PROCESSES * SLOT_DTYPE.itemsize)
+        self._slots = np.ndarray((MAX_PROCESSES,), dtype=SLOT_DTYPE, buffer=self._shm.buf)
+        self._lock_path = os.path.join(tempfile.gettempdir(), f"{name}.lock")
+        self._slot: Optional[int] = None
+        self._slot_pid: Optional[int] = None
+
+    @staticmethod
+    def _open(name: str, size: int) -> shared_memory.SharedMemory:
+        """Create the named segment, or attach to it if another worker already did"""
+        try:
+            shm = shared_memory.SharedMemory(name=name, create=True, size=size)
+        except FileExistsError:
+            shm = shared_memory.SharedMemory(name=name)
+            if shm.size < size:
+                shm.close()
+                raise ValueError(f"Shared memory segment {name} is smaller than {size} bytes")
+
+        # The segment outlives any single worker; without this the resource
+        # tracker unlinks it when the first process that touched it exits
+        try:
+            resource_tracker.unregister(shm._name, "shared_memory")
+        except Exception:
+            pass
+        return shm
+
+    def _own_slot(self) -> int:
+        """Index of this process's slot, claimed on first use (and again after a fork)"""
+        pid = os.getpid()
+        if self._slot_pid == pid:
+            return self._slot
+
+        with open(self._lock_path, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            pids = self._slots["pid"]
+            free = [i for i in range(MAX_PROCESSES) if pids[i] == pid or not _alive(int(pids[i]))]
+            if not free:
+                raise ValueError(f"All {MAX_PROCESSES} slots of {self.name} are taken by live processes")
+            self._slot = free[0]
+            self._slots[self._slot] = (pid, 0)
+        self._slot_pid = pid
+        return self._slot
+
+    def publish(self, threads: int) -> None:
+        """Record the threads this process is using"""
+        self._slots[self._own_slot()]["threads"] = threads
+
+    def others(self) -> int:
+        """Threads in use by the other live processes"""
+        own = self._own_slot()
+        busy = np.flatnonzero(self._slots["threads"] > 0)
+        total = 0
+        for i in busy:
+            if i == own:
+                continue
+            if _alive(int(self._slots[i]["pid"])):
+                total += int(self._slots[i]["threads"])
+            else:
+                # Worker died during a call
+                self._slots[i]["threads"] = 0
+        return total
+
+
+def _alive(pid: int) -> bool:
+    if pid <= 0:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class ThreadPolicy:
+    """
+    Chooses the XGBoost thread count of each prediction call
+
+    The batch size sets a ceiling: a thread count is only used for batches
+    of at least min_rows[threads] rows, below that spinning up OpenMP
+    threads costs more than it saves (one thread for single rows). The
+    CPUs left over by the calls already running, in this worker and, with
+    shared usage, in every worker on the host, set the other: concurrent
+    large batches split the CPUs instead of each starting one thread per
+    core.
+
+    XGBoost's thread count is a booster parameter, and changing it while
+    another thread predicts is not safe, so each thread count gets its own
+    copy of the regressor (created on first use).
+    """
+
+    def __init__(
+        self,
+        cpus: int,
+        min_rows_per_thread: int = 1024,
+        usage: Optional[SharedThreadUsage] = None
+    ):
+        """
+        Initialize ThreadPolicy
+
+        Args:
+            cpus: CPUs shared by the XGBoost calls of all workers
+            min_rows_per_thread: Rows per thread until calibrated
+            usage: Thread usage shared with the other workers (None counts this process only)
+        """
+        self.cpus = max(1, int(cpus))
+        self.usage = usage
+        levels = thread_levels(self.cpus)
+        self.min_rows: Dict[int, int] = {threads: (threads - 1) * min_rows_per_thread for threads in levels}
+        self._lock = threading.Lock()
+        self._in_use = 0
+        self._clones: "weakref.WeakKeyDictionary[Any, Dict[int, Any]]" = weakref.WeakKeyDictionary()
+
+        self._call_threads = metrics.histogram(
+            "xgboost_call_threads", "Threads per XGBoost prediction call", buckets=tuple(levels)
+        )
+        metrics.gauge("xgboost_thread_cpus", "CPUs shared by XGBoost calls on the host").set(self.cpus)
+
+    def threads_for(self, n_rows: int) -> int:
+        """Threads worth using for a batch of n_rows rows, ignoring other calls"""
+        return max(threads for threads, rows in self.min_rows.items() if n_rows >= rows)
+
+    @contextmanager
+    def reserve(self, n_rows: int) -> Iterator[int]:
+        """Hold the threads of one call of n_rows rows, yielding their number"""
+        wanted = self.threads_for(n_rows)
+        with self._lock:
+            threads = wanted
+            if wanted > 1:
+                others = self.usage.others() if self.usage is not None else 0
+                threads = max(1, min(wanted, self.cpus - others - self._in_use))
+            self._in_use += threads
+            self._publish()
+        self._call_threads.observe(threads)
+        try:
+            yield threads
+        finally:
+            with self._lock:
+                self._in_use -= threads
+                self._publish()
+
+    def _publish(self) -> None:
+        if self.usage is None:
+            return
+        try:
+            self.usage.publish(self._in_use)
+        except ValueError as e:
+            logger.warning(f"Shared XGBoost thread usage unavailable, counting this worker only: {str(e)}")
+            self.usage = None
+
+    def predict(self, regressor: Any, X: np.ndarray) -> np.ndarray:
+        """Predict with the thread count chosen for X"""
+        with self.reserve(len(X)) as threads:
+            return self.regressor_for(regressor, threads).predict(X)
+
+    def regressor_for(self, regressor: Any, threads: int) -> Any:
+        """Copy of regressor set to use threads threads"""
+        with self._lock:
+            clones = self._clones.setdefault(regressor, {})
+            clone = clones.get(threads)
+            if clone is None:
+                clone = copy.deepcopy(regressor)
+                clone.set_params(n_jobs=threads)
+                clones[threads] = clone
+        return clone
+
+    def calibrate(self, regressor: Any, X: np.ndarray, key: str) -> Dict[int, int]:
+        """
+        Measure from which batch size each thread count pays off on this host
+
+        The first worker to get here times the regressor and saves the result
+        to a file named after key (the model fingerprint) and the CPU count;
+        the other workers wait for it and read the file, so the workers do not
+        skew each other's timings.
+
+        Args:
+            regressor: XGBoost regressor to time
+            X: Encoded rows, repeated to make each batch size
+            key: Identifies the model in the file name
+
+        Returns:
+            The new min_rows table
+        """
+        levels = thread_levels(self.cpus)
+        if len(levels) == 1:
+            return self.min_rows
+
+        path = os.path.join(tempfile.gettempdir(), f"superkart-threads-{key}-{self.cpus}.json")
+        with open(f"{path}.lock", "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                with open(path) as f:
+                    min_rows = {int(threads): int(rows) for threads, rows in json.load(f).items()}
+                logger.info(f"XGBoost thread crossovers read from {path}: {min_rows}")
+            except (OSError, ValueError, AttributeError):
+                started = time.monotonic()
+                min_rows = measure_crossovers(
+                    lambda threads, batch: self.regressor_for(regressor, threads).predict(batch),
+                    X,
+                    levels
+                )
+                tmp_path = f"{path}.tmp"
+                with open(tmp_path, "w") as f:
+                    json.dump(min_rows, f)
+                os.replace(tmp_path, path)
+                logger.info(
+                    f"XGBoost thread crossovers calibrated in {time.monotonic() - started:.2f}s: {min_rows}"
+                )
+        self.min_rows = min_rows
+        return min_rows
+
+
+def measure_crossovers(
+    predict: Callable[[int, np.ndarray], Any],
+    X: np.ndarray,
+    levels: Sequence[int],
+    sizes: Sequence[int] = CALIBRATION_SIZES
+) -> Dict[int, int]:
+    """
+    Smallest batch size from which each thread count beats the one before it
+
+    Thread counts that are not CALIBRATION_MARGIN faster than the previous
+    one at any size are left out (and so are the ones above them).
+
+    Args:
+        predict: Callable(threads, batch) scoring a batch
+        X: Encoded rows, repeated to make each batch size
+        levels: Increasing thread counts, starting with 1
+        sizes: Increasing batch sizes
+
+    Returns:
+        Thread count to minimum rows, always with {1: 0}
+    """
+    def best_time(threads: int, batch: np.ndarray) -> float:
+        timings = []
+        for _ in range(CALIBRATION_REPEATS):
+            started = time.perf_counter()
+            predict(threads, batch)
+            timings.append(time.perf_counter() - started)
+        return min(timings)
+
+    batches = {size: np.resize(X, (size, X.shape[1])) for size in sizes}
+    min_rows = {levels[0]: 0}
+    for previous, threads in zip(levels, levels[1:]):
+        start = min_rows[previous]
+        for size in sizes:
+            if size < start:
+                continue
+            if best_time(threads, batches[size]) < best_time(previous, batches[size]) * (1 - CALIBRATION_MARGIN):
+                min_rows[threads] = size
+                break
+        else:
+            break
+    return min_rows
@@ -0,0 +1,315 @@
+import json
+import logging
+from typing import Any, Dict, List
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+# Objectives whose prediction is the raw margin (no link function)
+IDENTITY_OBJECTIVES = {
+    "reg:squarederror",
+    "reg:absoluteerror",
+    "reg:pseudohubererror",
+    "reg:linear",
+}
+
+# Rows evaluated at once; keeps the (rows x trees) node-index temporaries in cache
+DEFAULT_CHUNK_ROWS = 1024
+
+
+class UnsupportedBoosterError(ValueError):
+    """Raised when a booster cannot be converted to flat arrays"""
+
+
+class TreeEnsemble:
+    """
+    Flat-array representation of a gradient-boosted tree ensemble
+
+    All trees share one set of node arrays (global node indices). Leaves
+    point to themselves with a NaN threshold (x >= NaN is false for every x,
+    +inf included), so every row can be advanced max_depth times without
+    checking for termination, one level of all trees per step.
+    """
+
+    def __init__(
+        self,
+        feature: np.ndarray,
+        threshold: np.ndarray,
+        left: np.ndarray,
+        right: np.ndarray,
+        default_left: np.ndarray,
+        value: np.ndarray,
+        roots: np.ndarray,
+        base_score: float,
+        max_depth: int
+    ):
+        """
+        Initialize TreeEnsemble
+
+        Args:
+            feature: Split feature index per node (0 for leaves)
+            threshold: Split threshold per node, row goes left if x < threshold
+                (NaN for leaves)
+            left: Left child per node (self for leaves)
+            right: Right child per node (self for leaves)
+            default_left: Direction taken by missing (NaN) values per node
+            value: Leaf value per node (0 for internal nodes)
+            roots: Root node index of every tree
+            base_score: Constant added to the sum of leaf values
+            max_depth: Depth of the deepest tree
+        """
+        self.feature = feature
+        self.threshold = threshold
+        self.left = left
+        self.right = right
+        self.default_left = default_left
+        self.value = value
+        self.roots = roots
+        self.base_score = float(base_score)
+        self.max_depth = int(max_depth)
+
+    @property
+    def n_trees(self) -> int:
+        return len(self.roots)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.feature)
+
+    @classmethod
+    def from_booster(cls, booster: Any) -> "TreeEnsemble":
+        """
+        Convert a fitted xgboost.Booster into flat arrays
+
+        Raises:
+            UnsupportedBoosterError: For non-tree boosters, categorical splits,
+                multi-output models or objectives with a link function
+        """
+        model = json.loads(booster.save_raw("json"))
+        learner = model["learner"]
+
+        objective = learner["objective"]["name"]
+        if objective not in IDENTITY_OBJECTIVES:
+            raise UnsupportedBoosterError(f"Objective {objective} is not supported")
+
+        gradient_booster = learner["gradient_booster"]
+        if gradient_booster["name"] != "gbtree":
+            raise UnsupportedBoosterError(f"Booster {gradient_booster['name']} is not supported")
+
+        model_param = learner["learner_model_param"]
+        if int(model_param.get("num_target", "1")) != 1 or int(model_param.get("num_class", "0")) > 1:
+            raise UnsupportedBoosterError("Multi-output models are not supported")
+
+        return cls.from_tree_dicts(
+            gradient_booster["model"]["trees"],
+            base_score=float(model_param["base_score"])
+        )
+
+    @classmethod
+    def from_tree_dicts(cls, trees: List[Dict[str, Any]], base_score: float) -> "TreeEnsemble":
+        """
+        Build flat arrays from XGBoost JSON tree dumps
+
+        Nodes are renumbered breadth-first so that the children of every
+        split are adjacent (right == left + 1).
+        """
+        features, thresholds, lefts, defaults, values, leaves, roots = [], [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+
+        for tree in trees:
+            if any(tree.get("split_type", [])):
+                raise UnsupportedBoosterError("Categorical splits are not supported")
+
+            left = tree["left_children"]
+            right = tree["right_children"]
+            order, depth = _breadth_first_order(left, right)
+            new_id = {old: offset + position for position, old in enumerate(order)}
+
+            for old in order:
+                if left[old] < 0:
+                    # Leaves loop to themselves: x >= NaN is false and NaN defaults left
+                    features.append(0)
+                    thresholds.append(np.nan)
+                    lefts.append(new_id[old])
+                    defaults.append(True)
+                    values.append(tree["split_conditions"][old])
+                    leaves.append(True)
+                else:
+                    features.append(tree["split_indices"][old])
+                    thresholds.append(tree["split_conditions"][old])
+                    lefts.append(new_id[left[old]])
+                    defaults.append(bool(tree["default_left"][old]))
+                    values.append(0.0)
+                    leaves.append(False)
+
+            roots.append(offset)
+            max_depth = max(max_depth, depth)
+            offset += len(order)
+
+        if not roots:
+            raise UnsupportedBoosterError("Booster has no trees")
+
+        left = np.asarray(lefts, dtype=np.int32)
+        return cls(
+            feature=np.asarray(features, dtype=np.int32),
+            threshold=np.asarray(thresholds, dtype=np.float32),
+            left=left,
+            right=np.where(leaves, left, left + 1).astype(np.int32),
+            default_left=np.asarray(defaults, dtype=bool),
+            value=np.asarray(values, dtype=np.float32),
+            roots=np.asarray(roots, dtype=np.int32),
+            base_score=base_score,
+            max_depth=max_depth
+        )
+
+    def specialize(self, fixed: Dict[int, float]) -> "TreeEnsemble":
+        """
+        Prune the ensemble for fixed values of some features
+
+        Splits on a fixed feature are resolved once here, so the pruned
+        trees only contain splits on the remaining features. Trees that
+        collapse to a single leaf are kept (rather than folded into
+        base_score) so leaf values are still summed in XGBoost's order.
+
+        Args:
+            fixed: Mapping of feature index to its value (NaN for missing)
+
+        Returns:
+            Pruned TreeEnsemble producing the same predictions for rows
+            with those feature values
+        """
+        def resolve(node: int) -> int:
+            while self.left[node] != self.right[node] and int(self.feature[node]) in fixed:
+                value = fixed[int(self.feature[node])]
+                go_left = bool(self.default_left[node]) if np.isnan(value) else value < self.threshold[node]
+                node = int(self.left[node] if go_left else self.right[node])
+            return node
+
+        features, thresholds, lefts, defaults, values, leaves, roots = [], [], [], [], [], [], []
+        max_depth = 0
+        offset = 0
+
+        for root in self.roots:
+            root = resolve(int(root))
+
+            # Breadth-first over the pruned tree, allocating split children in pairs
+            order = [root]
+            level = [root]
+            children_of = {}
+            depth = 0
+            while level:
+                next_level = []
+                for node in level:
+                    if self.left[node] != self.right[node]:
+                        pair = (resolve(int(self.left[node])), resolve(int(self.right[node])))
+                        children_of[node] = pair
+                        next_level.extend(pair)
+                if next_level:
+                    depth += 1
+                order.extend(next_level)
+                level = next_level
+
+            new_id = {}
+            for position, node in enumerate(order):
+                new_id[node] = offset + position
+            for node in order:
+                if node in children_of:
+                    features.append(int(self.feature[node]))
+                    thresholds.append(self.threshold[node])
+                    lefts.append(new_id[children_of[node][0]])
+                    defaults.append(bool(self.default_left[node]))
+                    values.append(0.0)
+                    leaves.append(False)
+                else:
+                    features.append(0)
+                    thresholds.append(np.nan)
+                    lefts.append(new_id[node])
+                    defaults.append(True)
+                    values.append(self.value[node])
+                    leaves.append(True)
+
+            roots.append(offset)
+            max_depth = max(max_depth, depth)
+            offset += len(order)
+
+        left = np.asarray(lefts, dtype=np.int32)
+        return TreeEnsemble(
+            feature=np.asarray(features, dtype=np.int32),
+            threshold=np.asarray(thresholds, dtype=np.float32),
+            left=left,
+            right=np.where(leaves, left, left + 1).astype(np.int32),
+            default_left=np.asarray(defaults, dtype=bool),
+            value=np.asarray(values, dtype=np.float32),
+            roots=np.asarray(roots, dtype=np.int32),
+            base_score=self.base_score,
+            max_depth=max_depth
+        )
+
+    def split_features(self) -> List[int]:
+        """Sorted feature indices used by at least one split"""
+        internal = self.left != self.right
+        return sorted(set(self.feature[internal].tolist()))
+
+    def predict(self, X: np.ndarray, chunk_rows: int = DEFAULT_CHUNK_ROWS) -> np.ndarray:
+        """
+        Score rows by walking all trees level by level
+
+        Args:
+            X: float32 feature matrix, NaN marks missing values
+            chunk_rows: Rows evaluated at once
+
+        Returns:
+            float32 array of predictions
+        """
+        X = np.asarray(X, dtype=np.float32)
+        n_rows = X.shape[0]
+        predictions = np.empty(n_rows, dtype=np.float32)
+        for start in range(0, n_rows, chunk_rows):
+            stop = min(start + chunk_rows, n_rows)
+            predictions[start:stop] = self._predict_chunk(X[start:stop])
+        return predictions
+
+    def _predict_chunk(self, X: np.ndarray) -> np.ndarray:
+        n_rows, n_features = X.shape
+        # Missing values are resolved by picking a column copy where NaN was
+        # replaced so that x < threshold sends it the node's default way
+        doubled = np.empty((n_rows, 2 * n_features), dtype=np.float32)
+        doubled[:, :n_features] = np.where(np.isnan(X), -np.inf, X)
+        doubled[:, n_features:] = np.where(np.isnan(X), np.inf, X)
+        column = self.feature + np.where(self.default_left, 0, n_features).astype(np.int32)
+
+        flat = doubled.ravel()
+        row_offset = (np.arange(n_rows, dtype=np.int64) * (2 * n_features))[:, None]
+        node = np.broadcast_to(self.roots, (n_rows, self.n_trees))
+
+        for _ in range(self.max_depth):
+            x = flat.take(row_offset + column.take(node))
+            # Children are adjacent, so go right by adding one
+            node = self.left.take(node) + (x >= self.threshold.take(node))
+
+        # Sum in float32 tree by tree starting from base_score, the same
+        # order XGBoost uses, so results match bit for bit
+        leaves = self.value.take(node)
+        predictions = np.full(n_rows, self.base_score, dtype=np.float32)
+        for tree in range(self.n_trees):
+            predictions += leaves[:, tree]
+        return predictions
+
+
+def _breadth_first_order(left: List[int], right: List[int]):
+    """Breadth-first node order (children of a split adjacent) and tree depth"""
+    order = [0]
+    level = [0]
+    depth = 0
+    while True:
+        children = []
+        for node in level:
+            if left[node] >= 0:
+                children.extend((left[node], right[node]))
+        if not children:
+            return order, depth
+        order.extend(children)
+        level = children
+        depth += 1
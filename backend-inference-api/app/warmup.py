@@ -0,0 +1,209 @@
+import asyncio
+import logging
+import statistics
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+from app.metrics import metrics
+from app.model_loader import ModelLoader
+
+logger = logging.getLogger(__name__)
+
+# Values accepted by the transform service's InputValidator
+# (input-transform-service/app/validators.py), which is what real traffic holds
+VALID_VALUES = {
+    "Product_Type": [
+        "Meat", "Snack Foods", "Soft Drinks", "Dairy", "Household",
+        "Fruits and Vegetables", "Frozen Foods", "Breakfast",
+        "Baking Goods", "Health and Hygiene", "Starchy Foods",
+        "Breads", "Canned", "Seafood", "Hard Drinks", "Others"
+    ],
+    "Store_Type": ["Supermarket Type1", "Supermarket Type2", "Supermarket Type3", "Grocery Store"],
+    "Store_Location_City_Type": ["Tier 1", "Tier 2", "Tier 3"],
+    "Store_Size": ["Small", "Medium", "High"],
+    "Product_Sugar_Content": ["No Sugar", "Low Sugar", "Regular"],
+}
+NUMERIC_RANGES = {
+    "Product_Weight": (4.0, 22.0),
+    "Product_MRP": (31.0, 266.0),
+    "Product_Allocated_Area": (0.004, 0.298),
+    "Store_Establishment_Year": (1987, 2009),
+}
+INTEGER_FEATURES = ("Store_Establishment_Year",)
+
+# Readiness states
+STARTING = "starting"
+WARMING = "warming"
+READY = "ready"
+NOT_READY = "not_ready"
+
+ScoreColumns = Callable[[Dict[str, Any]], Awaitable[Any]]
+
+
+def synthetic_columns(n_rows: int, rng: Optional[np.random.Generator] = None) -> Dict[str, Any]:
+    """
+    Random rows within the validator's values, as columns for score_columns
+
+    Args:
+        n_rows: Number of rows
+        rng: Random generator (a fixed seed by default)
+
+    Returns:
+        Feature name to pandas Categorical or float64 array
+    """
+    rng = rng or np.random.default_rng(0)
+    columns: Dict[str, Any] = {}
+    for name, values in VALID_VALUES.items():
+        columns[name] = pd.Categorical.from_codes(rng.integers(0, len(values), n_rows), categories=values)
+    for name, (low, high) in NUMERIC_RANGES.items():
+        if name in INTEGER_FEATURES:
+            columns[name] = rng.integers(low, high + 1, n_rows).astype(np.float64)
+        else:
+            columns[name] = rng.uniform(low, high, n_rows)
+    return columns
+
+
+class WorkerReadiness:
+    """
+    Warms a worker up and reports whether it should receive traffic
+
+    Once the model is loaded, runs prepare (e.g. the XGBoost thread
+    calibration) and then synthetic batches of each warm-up size through
+    the serving path, so the first real requests do not pay for
+    allocating buffers, paging in the model and starting thread pools.
+    The worker becomes ready when the median latency of single-row calls
+    afterwards is within max_latency_ms; if it is not (or warm-up fails),
+    it is checked again every retry_seconds.
+    """
+
+    def __init__(
+        self,
+        model_loader: ModelLoader,
+        score: ScoreColumns,
+        batch_sizes: Sequence[int] = (1, 16, 256, 4096),
+        rounds: int = 3,
+        max_latency_ms: float = 100.0,
+        check_samples: int = 5,
+        retry_seconds: float = 5.0,
+        prepare: Optional[Callable[[], None]] = None
+    ):
+        """
+        Initialize WorkerReadiness
+
+        Args:
+            model_loader: Loader of the served model
+            score: Async callable scoring a dict of columns (InferenceExecutor.score_columns)
+            batch_sizes: Rows of the warm-up batches (empty skips warm-up)
+            rounds: Times each warm-up batch is scored
+            max_latency_ms: Highest median single-row latency of a ready worker (0 skips the check)
+            check_samples: Single-row calls timed by the self-check
+            retry_seconds: Wait before checking again after a failed self-check
+            prepare: Blocking callable run (on a thread) before warm-up
+        """
+        self.model_loader = model_loader
+        self.score = score
+        self.batch_sizes = [int(size) for size in batch_sizes]
+        self.rounds = max(1, rounds)
+        self.max_latency_ms = max_latency_ms
+        self.check_samples = max(1, check_samples)
+        self.retry_seconds = retry_seconds
+        self.prepare = prepare
+        self.status = STARTING
+        self.reason: Optional[str] = None
+        self.latency_ms: Optional[float] = None
+        self.warmup_seconds: Optional[float] = None
+        self._task: Optional[asyncio.Task] = None
+        self._ready = metrics.gauge("worker_ready", "1 once the worker is warm and passed its latency self-check")
+        self._warmup = metrics.gauge("warmup_seconds", "Duration of the last warm-up")
+
+    @property
+    def ready(self) -> bool:
+        return self.status == READY
+
+    def as_dict(self) -> Dict[str, Any]:
+        """Readiness details for the health endpoints"""
+        return {
+            "status": self.status,
+            "reason": self.reason,
+            "self_check_latency_ms": self.latency_ms,
+            "warmup_seconds": self.warmup_seconds
+        }
+
+    async def start(self) -> None:
+        """Start warming up in the background"""
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """Cancel a warm-up still running"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def _set(self, status: str, reason: Optional[str] = None) -> None:
+        self.status = status
+        self.reason = reason
+        self._ready.set(1 if status == READY else 0)
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        if not self.model_loader.is_loaded():
+            self._set(NOT_READY, "Model is not loaded")
+            return
+
+        self._set(WARMING)
+        # The artifact's booster may still be loading on a background thread
+        await loop.run_in_executor(None, self.model_loader.wait_for_booster)
+        if self.prepare is not None:
+            await loop.run_in_executor(None, self.prepare)
+
+        while True:
+            try:
+                started = time.monotonic()
+                await self.warm_up()
+                self.warmup_seconds = time.monotonic() - started
+                self._warmup.set(self.warmup_seconds)
+                self.latency_ms = await self.self_check()
+            except Exception as e:
+                logger.error(f"Warm-up failed: {str(e)}")
+                self._set(NOT_READY, f"Warm-up failed: {str(e)}")
+            else:
+                if self.max_latency_ms <= 0 or self.latency_ms <= self.max_latency_ms:
+                    self._set(READY)
+                    logger.info(
+                        f"Worker ready after {self.warmup_seconds:.2f}s of warm-up "
+                        f"(single-row latency {self.latency_ms:.1f} ms)"
+                    )
+                    return
+                self._set(
+                    NOT_READY,
+                    f"Single-row latency {self.latency_ms:.1f} ms is above {self.max_latency_ms:.1f} ms"
+                )
+                logger.warning(f"Latency self-check failed: {self.reason}")
+            await asyncio.sleep(self.retry_seconds)
+
+    async def warm_up(self) -> None:
+        """Score synthetic batches of every warm-up size"""
+        rng = np.random.default_rng(0)
+        for size in self.batch_sizes:
+            columns = synthetic_columns(size, rng)
+            for _ in range(self.rounds):
+                await self.score(columns)
+
+    async def self_check(self) -> float:
+        """Median latency in ms of single-row calls"""
+        rng = np.random.default_rng(1)
+        timings = []
+        for _ in range(self.check_samples):
+            columns = synthetic_columns(1, rng)
+            started = time.perf_counter()
+            await self.score(columns)
+            timings.append((time.perf_counter() - started) * 1000.0)
+        return statistics.median(timings)
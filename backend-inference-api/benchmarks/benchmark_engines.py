@@ -0,0 +1,88 @@
+"""
+Benchmark the native XGBoost and NumPy tree engines across batch sizes
+
+Usage (from backend-inference-api/):
+    python benchmarks/benchmark_engines.py
+    python benchmarks/benchmark_engines.py --model models/superkart_model.joblib --max-rows 1000000
+
+Prints per-engine latency and throughput for each batch size and the
+largest batch size where the NumPy engine is still faster, which is a
+good value for NUMPY_ENGINE_MAX_ROWS on that host.
+"""
+import argparse
+import logging
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.model_loader import ModelLoader
+from app.predict import NumpyTreeEngine, XGBoostEngine
+
+
+def random_columns(loader: ModelLoader, n_rows: int, seed: int = 0) -> dict:
+    """Random raw feature values drawn from the fitted categories and scaler ranges"""
+    rng = np.random.default_rng(seed)
+    columns = {}
+    for block in loader.encoder.blocks:
+        if block.is_categorical:
+            columns[block.column] = rng.choice(np.asarray(block.categories, dtype=object), n_rows)
+        else:
+            columns[block.column] = rng.normal(block.mean, block.scale, n_rows)
+    return columns
+
+
+def time_call(fn, min_seconds: float = 0.2, max_repeats: int = 1000) -> float:
+    """Best-of-N wall time of fn in seconds"""
+    fn()
+    best = float("inf")
+    spent = 0.0
+    repeats = 0
+    while spent < min_seconds and repeats < max_repeats:
+        start = time.perf_counter()
+        fn()
+        elapsed = time.perf_counter() - start
+        best = min(best, elapsed)
+        spent += elapsed
+        repeats += 1
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="models/superkart_model.joblib", help="Path to the joblib model")
+    parser.add_argument("--max-rows", type=int, default=1_000_000, help="Largest batch size to benchmark")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+
+    loader = ModelLoader(args.model)
+    loader.load_model()
+    if loader.encoder is None or loader.ensemble is None:
+        raise SystemExit("Model could not be compiled, nothing to compare")
+
+    engines = [XGBoostEngine(loader.regressor), NumpyTreeEngine(loader.ensemble)]
+    sizes = [n for n in (1, 10, 100, 1_000, 10_000, 100_000, 1_000_000) if n <= args.max_rows]
+    X_all = loader.encoder.encode_columns(random_columns(loader, sizes[-1]))
+
+    print(f"{'rows':>10} " + " ".join(f"{e.name + ' ms':>14} {e.name + ' rows/s':>16}" for e in engines))
+    crossover = 0
+    for n_rows in sizes:
+        X = X_all[:n_rows]
+        timings = [time_call(lambda: engine.predict(X)) for engine in engines]
+        print(f"{n_rows:>10} " + " ".join(
+            f"{t * 1000:>14.3f} {n_rows / t:>16,.0f}" for t in timings
+        ))
+        if timings[1] < timings[0]:
+            crossover = n_rows
+
+    np.testing.assert_array_equal(engines[1].predict(X_all[:1000]), engines[0].predict(X_all[:1000]))
+    print(f"\nNumPy engine faster up to {crossover} rows (suggested NUMPY_ENGINE_MAX_ROWS)")
+
+
+if __name__ == "__main__":
+    main()
@@ -24,6 +24,21 @@ if ! echo "$WORKERS" | grep -qE '^[0-9]+$'; then
     exit 1
 fi
 
+SERVING_MODE=${SERVING_MODE:-uvicorn}
+
+# Worker metrics files of a previous run would be added to this run's totals
+rm -rf "${METRICS_DIR:-${TMPDIR:-/tmp}/superkart-metrics}"
+
+# Pre-fork mode: load the model once in a parent process and fork the
+# workers so they share the model memory copy-on-write
+if [ "$SERVING_MODE" = "prefork" ]; then
+    exec python -m app.prefork \
+        --host 0.0.0.0 \
+        --port "$PORT" \
+        --workers "$WORKERS" \
+        --log-level "$LOG_LEVEL"
+fi
+
 # Start uvicorn with environment variables
 # Using exec to ensure proper signal handling
 exec uvicorn app.main:app \
@@ -0,0 +1,113 @@
+import pytest
+import asyncio
+import json
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.admission import AdmissionController, AdmissionMiddleware, AdmissionRejected, path_pattern
+
+
+class TestAdmissionController:
+    """Test suite for the concurrency limit and wait queue"""
+
+    def test_slots_are_handed_over_in_arrival_order(self):
+        """Test waiting requests get freed slots first come first served, and a full queue sheds"""
+        async def run():
+            controller = AdmissionController(max_concurrent=1, max_queue=2, max_wait_seconds=0)
+            order = []
+
+            async def request(name):
+                await controller.acquire()
+                order.append(name)
+                await asyncio.sleep(0.01)
+                controller.release(0.01)
+
+            await controller.acquire()
+            waiting = [asyncio.create_task(request(name)) for name in ("a", "b")]
+            await asyncio.sleep(0)
+            assert controller.queue_depth == 2
+
+            with pytest.raises(AdmissionRejected) as excinfo:
+                await controller.acquire()
+            assert excinfo.value.status_code == 429
+            assert excinfo.value.retry_after >= 1
+
+            controller.release()
+            await asyncio.gather(*waiting)
+            assert order == ["a", "b"]
+            assert (controller.active, controller.queue_depth) == (0, 0)
+
+        asyncio.run(run())
+
+    def test_wait_timeout_and_cancelled_waiters(self):
+        """Test a request waiting too long gets 503, and abandoned waits give nothing back twice"""
+        async def run():
+            controller = AdmissionController(max_concurrent=1, max_queue=4, max_wait_seconds=0.05)
+            await controller.acquire()
+
+            with pytest.raises(AdmissionRejected) as excinfo:
+                await controller.acquire()
+            assert excinfo.value.status_code == 503
+            assert controller.queue_depth == 0
+
+            cancelled = asyncio.create_task(controller.acquire())
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await cancelled
+            assert controller.queue_depth == 0
+
+            controller.release()
+            assert controller.active == 0
+
+        asyncio.run(run())
+
+
+class TestAdmissionMiddleware:
+    """Test suite for shedding HTTP requests"""
+
+    def test_sheds_matching_paths_with_retry_after(self):
+        """Test scoring paths beyond the limits get 429 with Retry-After and other paths pass"""
+        async def run():
+            release = asyncio.Event()
+
+            async def app(scope, receive, send):
+                if scope["path"] == "/predict/batch":
+                    await release.wait()
+                await send({"type": "http.response.start", "status": 200, "headers": []})
+                await send({"type": "http.response.body", "body": b"{}"})
+
+            controller = AdmissionController(max_concurrent=1, max_queue=0, max_wait_seconds=1)
+            middleware = AdmissionMiddleware(app, controller, path_pattern(r"/predict(/batch)?"))
+
+            async def call(path, method="POST"):
+                messages = []
+
+                async def receive():
+                    return {"type": "http.request", "body": b"", "more_body": False}
+
+                async def send(message):
+                    messages.append(message)
+
+                await middleware({"type": "http", "method": method, "path": path}, receive, send)
+                return messages
+
+            running = asyncio.create_task(call("/predict/batch"))
+            await asyncio.sleep(0)
+
+            shed = await call("/predict")
+            assert shed[0]["status"] == 429
+            assert (b"retry-after", b"1") in shed[0]["headers"]
+            assert "capacity" in json.loads(shed[1]["body"])["detail"]
+
+            assert (await call("/health"))[0]["status"] == 200
+            assert (await call("/predict", method="GET"))[0]["status"] == 200
+
+            release.set()
+            assert (await running)[0]["status"] == 200
+            assert (await call("/predict"))[0]["status"] == 200
+
+        asyncio.run(run())
@@ -0,0 +1,88 @@
+import pytest
+import numpy as np
+import json
+import shutil
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.artifact import ArtifactError, ModelArtifact, build_artifact
+from app.config import settings
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+
+class TestModelArtifact:
+    """Test suite for the memory-mapped model artifact"""
+
+    @pytest.fixture(scope="class")
+    def pipeline_loader(self):
+        """Model loader with the joblib pipeline"""
+        loader = ModelLoader(MODEL_PATH)
+        loader.load_model(use_artifact=False)
+        return loader
+
+    @pytest.fixture
+    def model_dir(self, tmp_path):
+        """Copy of the shipped joblib with a freshly built artifact next to it"""
+        model_path = tmp_path / "model.joblib"
+        shutil.copy(MODEL_PATH, model_path)
+        build_artifact(str(model_path))
+        return tmp_path
+
+    def test_loader_uses_artifact(self, model_dir, pipeline_loader):
+        """Test the artifact is memory-mapped and predicts exactly like the pipeline"""
+        loader = ModelLoader(str(model_dir / "model.joblib"))
+        loader.load_model()
+        assert loader.source == "artifact"
+        assert loader.model is None
+        assert isinstance(loader.ensemble.threshold, np.memmap)
+        assert loader.fingerprint == pipeline_loader.fingerprint
+
+        probe = ModelLoader._probe_frame(loader.encoder)
+        expected = pipeline_loader.model.predict(probe)
+        X = loader.encoder.encode_frame(probe)
+        np.testing.assert_array_equal(Predictor(loader)._predict_encoded(loader.current, X), expected)
+        np.testing.assert_array_equal(loader.regressor.predict(X), expected)
+
+    def test_background_booster(self, model_dir):
+        """Test the NumPy engines serve until the booster finishes loading"""
+        loader = ModelLoader(str(model_dir / "model.joblib"))
+        loader.load_model(background_booster=True)
+        assert loader.is_loaded()
+        loader.wait_for_booster()
+        assert loader.regressor is not None
+
+    def test_stale_artifact_falls_back_to_joblib(self, model_dir):
+        """Test an artifact built from another joblib is ignored"""
+        manifest_path = model_dir / "model.artifact" / "manifest.json"
+        manifest = json.loads(manifest_path.read_text())
+        manifest["source"]["sha256"] = "0" * 64
+        manifest_path.write_text(json.dumps(manifest))
+
+        loader = ModelLoader(str(model_dir / "model.joblib"))
+        loader.load_model()
+        assert loader.source == "joblib"
+        assert loader.model is not None
+
+    def test_artifact_disabled(self, model_dir, monkeypatch):
+        """Test MODEL_ARTIFACT_ENABLED=false always loads joblib"""
+        monkeypatch.setattr(settings, "MODEL_ARTIFACT_ENABLED", False)
+        loader = ModelLoader(str(model_dir / "model.joblib"))
+        loader.load_model()
+        assert loader.source == "joblib"
+
+    def test_verify_detects_corruption(self, model_dir):
+        """Test verify catches files that no longer match the manifest"""
+        artifact = ModelArtifact.open(model_dir / "model.artifact")
+        artifact.verify()
+
+        with open(model_dir / "model.artifact" / "value.npy", "r+b") as f:
+            f.seek(-4, os.SEEK_END)
+            f.write(b"\x00\x00\x80\x7f")
+        with pytest.raises(ArtifactError):
+            ModelArtifact.open(model_dir / "model.artifact").verify()
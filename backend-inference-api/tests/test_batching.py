@@ -0,0 +1,119 @@
+import pytest
+import asyncio
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.batching import MicroBatcher
+from app.predict import ScoredBatch
+
+
+class FakePredictor:
+    """Predictor stand-in that returns Product_MRP and records batch sizes"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    def score_records(self, records):
+        self.batch_sizes.append(len(records))
+        return ScoredBatch(np.array([record["Product_MRP"] for record in records], dtype=float), "v1")
+
+
+class TestMicroBatcher:
+    """Test suite for MicroBatcher class"""
+
+    def test_concurrent_requests_share_one_batch(self):
+        """Test concurrent rows are scored together and routed back to their callers"""
+        predictor = FakePredictor()
+
+        async def scenario():
+            batcher = MicroBatcher(predictor, window_ms=50, max_batch_size=16, max_queue_size=64)
+            await batcher.start()
+            try:
+                return await asyncio.gather(
+                    *(batcher.submit({"Product_MRP": float(i)}) for i in range(10))
+                )
+            finally:
+                await batcher.stop()
+
+        results = asyncio.run(scenario())
+        assert results == [(float(i), "v1") for i in range(10)]
+        assert predictor.batch_sizes == [10]
+
+    def test_max_batch_size_splits_batches(self):
+        """Test batches never exceed max_batch_size"""
+        predictor = FakePredictor()
+
+        async def scenario():
+            batcher = MicroBatcher(predictor, window_ms=50, max_batch_size=4, max_queue_size=64)
+            await batcher.start()
+            try:
+                return await asyncio.gather(
+                    *(batcher.submit({"Product_MRP": float(i)}) for i in range(10))
+                )
+            finally:
+                await batcher.stop()
+
+        results = asyncio.run(scenario())
+        assert results == [(float(i), "v1") for i in range(10)]
+        assert max(predictor.batch_sizes) <= 4
+        assert sum(predictor.batch_sizes) == 10
+
+    def test_queue_full_rejects(self):
+        """Test submit raises QueueFull when the queue is at capacity"""
+        predictor = FakePredictor()
+
+        async def scenario():
+            batcher = MicroBatcher(predictor, window_ms=50, max_batch_size=1, max_queue_size=1)
+            await batcher.start()
+            try:
+                tasks = [asyncio.create_task(batcher.submit({"Product_MRP": float(i)})) for i in range(3)]
+                return await asyncio.gather(*tasks, return_exceptions=True)
+            finally:
+                await batcher.stop()
+
+        results = asyncio.run(scenario())
+        assert any(isinstance(r, asyncio.QueueFull) for r in results)
+
+    def test_prediction_error_propagates(self):
+        """Test model errors are raised to every caller in the batch"""
+
+        class FailingPredictor:
+            def score_records(self, records):
+                raise ValueError("boom")
+
+        async def scenario():
+            batcher = MicroBatcher(FailingPredictor(), window_ms=10, max_batch_size=8, max_queue_size=8)
+            await batcher.start()
+            try:
+                return await asyncio.gather(
+                    *(batcher.submit({"Product_MRP": 1.0}) for _ in range(3)),
+                    return_exceptions=True
+                )
+            finally:
+                await batcher.stop()
+
+        results = asyncio.run(scenario())
+        assert all(isinstance(r, ValueError) for r in results)
+
+    def test_stop_fails_rows_being_scored(self):
+        """Test rows already taken off the queue get an error instead of hanging when the batcher stops"""
+
+        class BlockedExecutor:
+            async def score_records(self, records):
+                await asyncio.Event().wait()
+
+        async def scenario():
+            batcher = MicroBatcher(FakePredictor(), window_ms=1, max_batch_size=8, max_queue_size=8,
+                                   executor=BlockedExecutor())
+            await batcher.start()
+            pending = [asyncio.create_task(batcher.submit({"Product_MRP": 1.0})) for _ in range(2)]
+            await asyncio.sleep(0.05)
+            await batcher.stop()
+            return await asyncio.wait_for(asyncio.gather(*pending, return_exceptions=True), 1)
+
+        results = asyncio.run(scenario())
+        assert all(isinstance(r, RuntimeError) and "stopped" in str(r) for r in results)
@@ -0,0 +1,222 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import columnar
+from app.columnar import ColumnarFormatError, ColumnValidationError, columns_from_json, media_type_matches
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+CATEGORICAL = ["Product_Type", "Store_Type", "Store_Location_City_Type", "Store_Size", "Product_Sugar_Content"]
+NUMERIC = ["Product_Weight", "Product_MRP", "Product_Allocated_Area", "Store_Establishment_Year"]
+
+
+def make_records(n_rows):
+    rng = np.random.default_rng(0)
+    return [
+        {
+            "Product_Type": str(rng.choice(["Dairy", "Snack Foods", "Canned"])),
+            "Store_Type": str(rng.choice(["Supermarket Type1", "Supermarket Type2", "Food Mart"])),
+            "Store_Location_City_Type": str(rng.choice(["Tier 1", "Tier 2", "Tier 3"])),
+            "Store_Size": str(rng.choice(["Small", "Medium", "High"])),
+            "Product_Sugar_Content": str(rng.choice(["Low Sugar", "Regular"])),
+            "Product_Weight": float(rng.uniform(5, 20)),
+            "Product_MRP": float(rng.uniform(50, 250)),
+            "Product_Allocated_Area": float(rng.uniform(0.01, 0.2)),
+            "Store_Establishment_Year": int(rng.choice([1987, 1999, 2009])),
+        }
+        for _ in range(n_rows)
+    ]
+
+
+def to_columns(records):
+    frame = pd.DataFrame(records)
+    return {
+        col: pd.Categorical(frame[col]) if col in CATEGORICAL else frame[col].to_numpy()
+        for col in CATEGORICAL + NUMERIC
+    }
+
+
+class TestColumnarFormat:
+    """Test suite for the binary columnar batch format"""
+
+    def test_round_trip(self):
+        """Test numeric buffers and dictionary-encoded columns decode to the encoded values"""
+        columns = {
+            "weight": np.array([1.5, np.nan, 3.0]),
+            "year": np.array([1987, 2009, 1999], dtype=np.int32),
+            "store": pd.Categorical.from_codes([0, -1, 1], categories=["Small", "Medium"]),
+        }
+
+        body = columnar.encode(columns, metadata={"model_version": "v1"})
+        # No required columns: NaN and missing categories are only refused in them
+        decoded, metadata = columnar.decode(body)
+
+        np.testing.assert_array_equal(decoded["weight"], columns["weight"])
+        np.testing.assert_array_equal(decoded["year"], columns["year"])
+        assert list(decoded["store"].categories) == ["Small", "Medium"]
+        assert list(decoded["store"].codes) == [0, -1, 1]
+        assert metadata == {"model_version": "v1"}
+        # Numeric columns are views on the body, not copies
+        assert not decoded["weight"].flags.owndata
+
+    def test_rejects_malformed_bodies(self):
+        """Test truncated bodies, bad codes and schema mismatches are reported"""
+        body = columnar.encode({"store": pd.Categorical(["Small"]), "weight": np.array([1.0])})
+
+        with pytest.raises(ColumnarFormatError):
+            columnar.decode(b"{}")
+        with pytest.raises(ColumnarFormatError):
+            columnar.decode(body[:-8])
+        with pytest.raises(ColumnarFormatError, match="Missing required column"):
+            columnar.decode(body, numeric=["year"])
+        with pytest.raises(ColumnarFormatError, match="dictionary-encoded"):
+            columnar.decode(body, categorical=["weight"])
+
+        codes_out_of_range = columnar.encode({"store": np.array([5], dtype=np.int8)}).replace(
+            b'"dtype"', b'"categories": ["Small"], "dtype"'
+        )
+        with pytest.raises(ColumnarFormatError):
+            columnar.decode(codes_out_of_range)
+
+    def test_rejects_negative_sizes(self):
+        """Test a negative row count or buffer length is refused instead of reading to the end of the body"""
+        body = columnar.encode({"weight": np.array([1.0, 2.0]), "area": np.array([0.1, 0.2])})
+        negative_rows = body.replace(b'"rows": 2', b'"rows": -1').replace(b'"length": 16', b'"length": -8')
+
+        with pytest.raises(ColumnarFormatError, match="negative row count"):
+            columnar.decode(negative_rows)
+
+        negative_length = body.replace(b'"length": 16', b'"length": -8')
+        with pytest.raises(ColumnarFormatError, match="does not hold"):
+            columnar.decode(negative_length)
+
+    def test_rejects_invalid_values(self):
+        """Test missing categories, NaN, infinity and fractional years fail like invalid JSON columns"""
+        columns = to_columns(make_records(5))
+        columns["Product_Weight"] = columns["Product_Weight"].copy()
+        columns["Product_Weight"][2] = np.nan
+        columns["Product_MRP"] = columns["Product_MRP"].copy()
+        columns["Product_MRP"][4] = -np.inf
+        columns["Store_Establishment_Year"] = columns["Store_Establishment_Year"].astype(np.float64)
+        columns["Store_Establishment_Year"][1] = 1999.5
+        columns["Store_Size"] = pd.Categorical.from_codes(
+            [0, 0, -1, 0, -1], categories=columns["Store_Size"].categories
+        )
+        body = columnar.encode(columns)
+
+        with pytest.raises(ColumnValidationError) as excinfo:
+            columnar.decode(body, categorical=CATEGORICAL, numeric=NUMERIC, integer=["Store_Establishment_Year"])
+        errors = {error["loc"]: error["type"] for error in excinfo.value.errors}
+        assert errors == {
+            ("Store_Size", 2): "string_type",
+            ("Product_Weight", 2): "finite_number",
+            ("Product_MRP", 4): "finite_number",
+            ("Store_Establishment_Year", 1): "int_from_float",
+        }
+
+        # Whole float years and integer buffers are accepted
+        columns = to_columns(make_records(5))
+        columns["Store_Establishment_Year"] = columns["Store_Establishment_Year"].astype(np.float64)
+        decoded, _ = columnar.decode(
+            columnar.encode(columns), categorical=CATEGORICAL, numeric=NUMERIC, integer=["Store_Establishment_Year"]
+        )
+        np.testing.assert_array_equal(decoded["Store_Establishment_Year"], columns["Store_Establishment_Year"])
+
+    def test_media_type_negotiation(self):
+        """Test Accept and Content-Type headers are matched with their parameters"""
+        assert media_type_matches(columnar.MEDIA_TYPE)
+        assert media_type_matches(f"application/json;q=0.5, {columnar.MEDIA_TYPE};q=0.9")
+        assert not media_type_matches(f"{columnar.MEDIA_TYPE};q=0")
+        assert not media_type_matches("application/json")
+        assert not media_type_matches(None)
+
+    def test_score_columns_matches_records(self):
+        """Test column arrays score the same as the row dictionaries they came from"""
+        loader = ModelLoader(MODEL_PATH)
+        loader.load_model(use_artifact=False)
+        predictor = Predictor(loader)
+        records = make_records(300)
+
+        body = columnar.encode(to_columns(records))
+        columns, _ = columnar.decode(body, categorical=CATEGORICAL, numeric=NUMERIC)
+
+        np.testing.assert_allclose(
+            predictor.score_columns(columns).predictions,
+            predictor._score_records(loader.current, records),
+            rtol=1e-6
+        )
+
+    def test_encoder_maps_categories_once(self):
+        """Test dictionary-encoded input encodes like raw values, with missing and unused categories"""
+        loader = ModelLoader(MODEL_PATH)
+        loader.load_model(use_artifact=False)
+        encoder = loader.current.encoder
+        records = make_records(50)
+        records[3]["Store_Size"] = None
+
+        columns = to_columns(records)
+        # A category no row uses is never looked up (it would be an unknown category)
+        columns["Product_Type"] = columns["Product_Type"].add_categories(["Not A Product"])
+
+        np.testing.assert_array_equal(
+            encoder.encode_columns(columns),
+            encoder.encode_records(records)
+        )
+
+
+class TestColumnsFromJson:
+    """Test suite for validating columnar JSON batches"""
+
+    def test_valid_columns(self):
+        """Test string columns become Categoricals and numeric columns float arrays"""
+        records = make_records(20)
+        columns = {col: [record[col] for record in records] for col in CATEGORICAL + NUMERIC}
+        columns["Product_MRP"][0] = "99.5"
+
+        result = columns_from_json(columns, CATEGORICAL, NUMERIC, integer=["Store_Establishment_Year"])
+
+        assert list(result["Store_Size"]) == columns["Store_Size"]
+        assert result["Product_MRP"].dtype == np.float64
+        assert result["Product_MRP"][0] == 99.5
+
+    def test_errors_locate_first_bad_value_per_column(self):
+        """Test every failing column is reported with the index of its first bad value"""
+        columns = {
+            "Store_Size": ["Small", None, 3],
+            "Product_MRP": [1.0, 2.0, "abc"],
+            "Store_Establishment_Year": [2009, 1999.5, 1987],
+        }
+
+        with pytest.raises(ColumnValidationError) as excinfo:
+            columns_from_json(
+                columns,
+                categorical=["Store_Size"],
+                numeric=["Product_MRP", "Product_Weight", "Store_Establishment_Year"],
+                integer=["Store_Establishment_Year"]
+            )
+
+        errors = {error["loc"]: error["type"] for error in excinfo.value.errors}
+        assert errors == {
+            ("Store_Size", 1): "string_type",
+            ("Product_MRP", 2): "float_parsing",
+            ("Product_Weight",): "missing",
+            ("Store_Establishment_Year", 1): "int_from_float",
+        }
+
+    def test_rejects_ragged_and_non_list_columns(self):
+        """Test columns of different lengths and non-list values are rejected"""
+        with pytest.raises(ColumnValidationError) as excinfo:
+            columns_from_json({"a": ["x", "y"], "b": [1.0], "c": 5}, categorical=["a"], numeric=["b", "c"])
+
+        assert [error["type"] for error in excinfo.value.errors] == ["value_error", "list_type"]
+
+        with pytest.raises(ColumnValidationError):
+            columns_from_json([1, 2], numeric=["b"])
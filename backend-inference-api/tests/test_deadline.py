@@ -0,0 +1,166 @@
+import pytest
+import asyncio
+import json
+import time
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.admission import AdmissionController, AdmissionMiddleware, path_pattern
+from app.batching import MicroBatcher
+from app.deadline import DeadlineExceeded, DeadlineMiddleware, check, parse_timeout_ms, remaining
+from app.executor import InferenceExecutor
+from app.predict import ScoredBatch
+
+
+class CountingPredictor:
+    """Predictor stand-in that blocks like a large batch and counts its calls"""
+
+    model_loader = None
+
+    def __init__(self):
+        self.calls = 0
+
+    def predict(self, df):
+        self.calls += 1
+        time.sleep(0.2)
+        return np.zeros(len(df))
+
+
+class SlowBatchExecutor:
+    """Executor stand-in scoring micro-batches slowly, recording their sizes"""
+
+    def __init__(self):
+        self.batch_sizes = []
+
+    async def score_records(self, records):
+        self.batch_sizes.append(len(records))
+        await asyncio.sleep(0.2)
+        return ScoredBatch(np.zeros(len(records)), "v1")
+
+
+async def call(app, timeout_ms=None):
+    """Send one POST through an ASGI app, returning the response messages"""
+    messages = []
+    headers = [] if timeout_ms is None else [(b"x-request-timeout-ms", str(timeout_ms).encode())]
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        messages.append(message)
+
+    await app({"type": "http", "method": "POST", "path": "/predict/batch", "headers": headers}, receive, send)
+    return messages
+
+
+async def ok(send):
+    await send({"type": "http.response.start", "status": 200, "headers": []})
+    await send({"type": "http.response.body", "body": b"{}"})
+
+
+class TestDeadlineMiddleware:
+    """Test suite for reading and enforcing the caller's deadline"""
+
+    def test_parse_timeout_ms(self):
+        """Test header values become seconds and unusable ones mean no deadline"""
+        assert parse_timeout_ms("1500") == 1.5
+        assert parse_timeout_ms("-20") == -0.02
+        assert parse_timeout_ms(None) is None
+        assert parse_timeout_ms("soon") is None
+        assert parse_timeout_ms("inf") is None
+
+    def test_expired_requests_get_504(self):
+        """Test a stage refused after the deadline is answered with 504 and requests without the header run"""
+        async def run():
+            seen = []
+
+            async def app(scope, receive, send):
+                seen.append(remaining())
+                check("predict")
+                await ok(send)
+
+            middleware = DeadlineMiddleware(app)
+
+            expired = await call(middleware, timeout_ms=0)
+            assert expired[0]["status"] == 504
+            assert "predict" in json.loads(expired[1]["body"])["detail"]
+
+            assert (await call(middleware, timeout_ms=5000))[0]["status"] == 200
+            assert 4.0 < seen[-1] <= 5.0
+
+            assert (await call(middleware))[0]["status"] == 200
+            assert seen[-1] is None
+            assert remaining() is None
+
+        asyncio.run(run())
+
+    def test_expired_work_is_not_scored(self):
+        """Test calls whose deadline passes while queued for admission or a worker never run"""
+        predictor = CountingPredictor()
+        executor = InferenceExecutor(predictor, kind="thread", max_workers=1)
+        executor.start()
+        controller = AdmissionController(max_concurrent=1, max_queue=4, max_wait_seconds=10)
+
+        async def app(scope, receive, send):
+            await executor.predict(pd.DataFrame({"a": [1, 2]}))
+            await ok(send)
+
+        async def run():
+            middleware = DeadlineMiddleware(app)
+            busy = asyncio.create_task(call(middleware))
+            await asyncio.sleep(0.01)
+            # Waits for the only worker longer than its deadline
+            assert (await call(middleware, timeout_ms=50))[0]["status"] == 504
+            assert (await busy)[0]["status"] == 200
+
+            middleware = DeadlineMiddleware(AdmissionMiddleware(app, controller, path_pattern(r"/predict/batch")))
+            busy = asyncio.create_task(call(middleware))
+            await asyncio.sleep(0.01)
+            started = time.monotonic()
+            # Waits for the only admission slot longer than its deadline
+            assert (await call(middleware, timeout_ms=50))[0]["status"] == 504
+            assert time.monotonic() - started < 0.15
+            assert controller.queue_depth == 0
+            assert (await busy)[0]["status"] == 200
+
+        try:
+            asyncio.run(run())
+        finally:
+            executor.shutdown()
+
+        assert predictor.calls == 2
+        with pytest.raises(DeadlineExceeded):
+            check("predict", time.monotonic() - 1)
+
+    def test_expired_micro_batch_rows_are_not_scored(self):
+        """Test single rows whose deadline passes while queued in the micro-batcher get 504 unscored"""
+        executor = SlowBatchExecutor()
+        batcher = MicroBatcher(None, window_ms=1, max_batch_size=8, max_queue_size=8, executor=executor)
+
+        async def app(scope, receive, send):
+            await batcher.submit({"Product_MRP": 1.0})
+            await ok(send)
+
+        async def run():
+            await batcher.start()
+            try:
+                middleware = DeadlineMiddleware(app)
+                busy = asyncio.create_task(call(middleware))
+                await asyncio.sleep(0.01)
+                # Waits behind the batch being scored longer than its deadline
+                expired = await call(middleware, timeout_ms=50)
+                assert expired[0]["status"] == 504
+                assert "inference" in json.loads(expired[1]["body"])["detail"]
+                assert (await busy)[0]["status"] == 200
+                assert (await call(middleware, timeout_ms=5000))[0]["status"] == 200
+            finally:
+                await batcher.stop()
+
+        asyncio.run(run())
+
+        assert executor.batch_sizes == [1, 1]
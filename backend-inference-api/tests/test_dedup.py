@@ -0,0 +1,71 @@
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import dedup
+from app.dedup import unique_rows
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+
+class TestUniqueRows:
+    """Test suite for within-batch row deduplication"""
+
+    def test_factorizes_repeated_rows(self):
+        """Test each distinct row is kept once, at its first position, with NaN matching NaN"""
+        X = np.array([
+            [1.0, 2.0],
+            [np.nan, 0.0],
+            [1.0, 2.0],
+            [1.0, 3.0],
+            [np.nan, 0.0],
+        ], dtype=np.float32)
+
+        unique = unique_rows(X)
+
+        assert unique.first_rows.tolist() == [0, 1, 3]
+        np.testing.assert_array_equal(X[unique.first_rows][unique.inverse], X)
+
+    def test_distinct_rows_and_collisions_are_not_deduplicated(self, monkeypatch):
+        """Test None is returned when nothing repeats or when two different rows share a hash"""
+        X = np.arange(12, dtype=np.float32).reshape(6, 2)
+        assert unique_rows(X) is None
+        assert unique_rows(X[:1]) is None
+
+        # A zero multiplier hashes every row to its last word
+        monkeypatch.setattr(dedup, "_HASH_PRIME", np.uint64(0))
+        X = np.array([[1.0, 5.0], [2.0, 5.0]], dtype=np.float32)
+        assert unique_rows(X) is None
+
+    def test_predictions_match_without_deduplication(self, monkeypatch):
+        """Test a batch with repeated rows scores the same with and without deduplication"""
+        loader = ModelLoader(MODEL_PATH)
+        loader.load_model(use_artifact=False)
+        predictor = Predictor(loader)
+        records = [
+            {
+                "Product_Type": ["Dairy", "Canned", "Snack Foods"][i % 3],
+                "Store_Type": "Supermarket Type1",
+                "Store_Location_City_Type": ["Tier 1", "Tier 2"][i % 2],
+                "Store_Size": "Medium",
+                "Product_Sugar_Content": "Low Sugar",
+                "Product_Weight": 12.5,
+                "Product_MRP": 100.0 + i % 7,
+                "Product_Allocated_Area": 0.05,
+                "Store_Establishment_Year": 2009,
+            }
+            for i in range(200)
+        ]
+
+        monkeypatch.setattr("app.predict.settings.BATCH_DEDUP_MIN_ROWS", 0)
+        expected = predictor._score_records(loader.current, records)
+        monkeypatch.setattr("app.predict.settings.BATCH_DEDUP_MIN_ROWS", 2)
+        unique_before = predictor._dedup_unique_rows.value
+
+        np.testing.assert_array_equal(predictor._score_records(loader.current, records), expected)
+        assert predictor._dedup_unique_rows.value - unique_before == 42
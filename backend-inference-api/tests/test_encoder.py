@@ -0,0 +1,102 @@
+import pytest
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.encoder import CompiledEncoder, UnsupportedPipelineError
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+
+def random_frame(n_rows, seed=0):
+    """Random rows covering known, unknown and missing values"""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "Product_Type": rng.choice(["Meat", "Dairy", "Snack Foods", "Breads", "Unknown Type"], n_rows),
+        "Store_Type": rng.choice(
+            ["Supermarket Type1", "Supermarket Type2", "Departmental Store", "Food Mart", "Grocery Store"],
+            n_rows
+        ),
+        "Store_Location_City_Type": rng.choice(["Tier 1", "Tier 2", "Tier 3"], n_rows),
+        "Store_Size": rng.choice(["Small", "Medium", "High"], n_rows),
+        "Product_Sugar_Content": rng.choice(["No Sugar", "Low Sugar", "Regular"], n_rows),
+        "Product_Weight": rng.uniform(4.0, 22.0, n_rows),
+        "Product_MRP": rng.uniform(31.0, 266.0, n_rows),
+        "Product_Allocated_Area": rng.uniform(0.004, 0.298, n_rows),
+        "Store_Establishment_Year": rng.integers(1987, 2010, n_rows)
+    })
+    df.loc[df.index[::17], "Product_Weight"] = np.nan
+    return df
+
+
+class TestCompiledEncoder:
+    """Test suite for CompiledEncoder class"""
+
+    @pytest.fixture(scope="class")
+    def loader(self):
+        """Model loader with the shipped pipeline (joblib, for the sklearn reference)"""
+        loader = ModelLoader(MODEL_PATH)
+        loader.load_model(use_artifact=False)
+        return loader
+
+    def test_encoder_compiled_on_load(self, loader):
+        """Test the shipped pipeline compiles to the fast path"""
+        assert loader.encoder is not None
+        assert loader.encoder.n_features == 27
+
+    def test_matrix_parity_with_column_transformer(self, loader):
+        """Test the encoded matrix matches ColumnTransformer output, with absent entries as NaN"""
+        df = random_frame(500)
+        expected = loader.model.steps[0][1].transform(df)
+        expected = expected.toarray() if hasattr(expected, "toarray") else expected
+        actual = loader.encoder.encode_frame(df)
+
+        assert actual.shape == expected.shape
+        assert np.array_equal(np.isnan(actual), expected == 0)
+        mask = ~np.isnan(actual)
+        assert np.allclose(actual[mask], expected[mask].astype(np.float32))
+
+    def test_prediction_parity_with_pipeline(self, loader):
+        """Test compiled predictions match the original pipeline"""
+        df = random_frame(2000, seed=1)
+        expected = loader.model.predict(df)
+        actual = Predictor(loader).predict(df)
+        np.testing.assert_allclose(actual, expected, rtol=1e-6)
+
+    def test_records_parity_with_frame(self, loader):
+        """Test row dictionaries encode the same as a DataFrame"""
+        df = random_frame(50, seed=2)
+        records = df.to_dict(orient="records")
+        np.testing.assert_array_equal(
+            loader.encoder.encode_records(records),
+            loader.encoder.encode_frame(df)
+        )
+
+    def test_unknown_ordinal_category_rejected(self, loader):
+        """Test unknown ordinal categories raise like OrdinalEncoder"""
+        records = random_frame(1).to_dict(orient="records")
+        records[0]["Store_Size"] = "Gigantic"
+        with pytest.raises(ValueError, match="unknown category"):
+            loader.encoder.encode_records(records)
+
+    def test_missing_column_rejected(self, loader):
+        """Test missing input columns are reported"""
+        records = random_frame(1).drop(columns=["Product_MRP"]).to_dict(orient="records")
+        with pytest.raises(ValueError, match="Missing required columns"):
+            loader.encoder.encode_records(records)
+
+    def test_unsupported_transformer(self):
+        """Test unsupported preprocessing steps are refused"""
+        from sklearn.compose import ColumnTransformer
+        from sklearn.preprocessing import MinMaxScaler
+
+        ct = ColumnTransformer([("minmax", MinMaxScaler(), ["a"])])
+        ct.fit(pd.DataFrame({"a": [1.0, 2.0, 3.0]}))
+        with pytest.raises(UnsupportedPipelineError):
+            CompiledEncoder.from_column_transformer(ct)
@@ -0,0 +1,80 @@
+import pytest
+import asyncio
+import time
+import numpy as np
+import pandas as pd
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.executor import InferenceExecutor
+from app.instrumentation import stage_histogram
+from app.metrics import metrics
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+
+class SlowPredictor:
+    """Predictor stand-in that blocks like a large CPU-bound batch"""
+
+    model_loader = None
+
+    def predict(self, df):
+        time.sleep(0.2)
+        return np.zeros(len(df))
+
+
+class TestInferenceExecutor:
+    """Test suite for InferenceExecutor class"""
+
+    def test_invalid_kind_rejected(self):
+        """Test unknown executor kinds are rejected"""
+        with pytest.raises(ValueError, match="Executor kind"):
+            InferenceExecutor(SlowPredictor(), kind="fiber")
+
+    def test_event_loop_stays_responsive(self):
+        """Test other coroutines run while a slow prediction is in progress"""
+        executor = InferenceExecutor(SlowPredictor(), kind="thread", max_workers=1)
+        executor.start()
+
+        async def scenario():
+            prediction = asyncio.create_task(executor.predict(pd.DataFrame({"a": [1, 2]})))
+            started = time.monotonic()
+            await asyncio.sleep(0.01)
+            responsive_after = time.monotonic() - started
+            predictions = await prediction
+            return responsive_after, predictions
+
+        try:
+            responsive_after, predictions = asyncio.run(scenario())
+        finally:
+            executor.shutdown()
+
+        assert responsive_after < 0.15
+        assert len(predictions) == 2
+        assert metrics.histogram("inference_execution_seconds").value["count"] >= 1
+
+    def test_process_worker_stages_are_recorded(self):
+        """Test the stages timed inside a process-pool worker reach this process's histograms"""
+        executor = InferenceExecutor(Predictor(ModelLoader(MODEL_PATH)), kind="process", max_workers=1)
+        executor.start()
+        encode, predict = stage_histogram("encode"), stage_histogram("predict")
+        before = encode.value["count"], predict.value["count"]
+        record = {
+            "Product_Weight": 12.5, "Product_Sugar_Content": "Low Sugar", "Product_Allocated_Area": 0.05,
+            "Product_MRP": 150.0, "Store_Size": "Medium", "Store_Location_City_Type": "Tier 2",
+            "Store_Type": "Supermarket Type2", "Product_Type": "Dairy", "Store_Establishment_Year": 2000
+        }
+
+        try:
+            scored = asyncio.run(executor.score_records([record, record]))
+        finally:
+            executor.shutdown()
+
+        assert len(scored.predictions) == 2
+        assert encode.value["count"] == before[0] + 1
+        assert predict.value["count"] == before[1] + 1
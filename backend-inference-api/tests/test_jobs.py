@@ -0,0 +1,131 @@
+import pytest
+import numpy as np
+import pandas as pd
+import time
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.jobs import BatchJobManager, JobNotFoundError
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+CATEGORICAL = ["Product_Type", "Store_Type", "Store_Location_City_Type", "Store_Size", "Product_Sugar_Content"]
+NUMERIC = ["Product_Weight", "Product_MRP", "Product_Allocated_Area", "Store_Establishment_Year"]
+
+RECORD = {
+    "Product_Type": "Dairy",
+    "Store_Type": "Supermarket Type1",
+    "Store_Location_City_Type": "Tier 2",
+    "Store_Size": "Medium",
+    "Product_Sugar_Content": "Low Sugar",
+    "Product_Weight": 12.5,
+    "Product_MRP": 150.0,
+    "Product_Allocated_Area": 0.05,
+    "Store_Establishment_Year": 2009,
+}
+
+
+@pytest.fixture
+def predictor():
+    loader = ModelLoader(MODEL_PATH)
+    loader.load_model(use_artifact=False)
+    return Predictor(loader)
+
+
+@pytest.fixture
+def manager(tmp_path, predictor):
+    jobs = BatchJobManager(
+        str(tmp_path / "jobs"), predictor, CATEGORICAL, NUMERIC,
+        integer=["Store_Establishment_Year"], chunk_rows=40, ttl_seconds=60
+    )
+    jobs.start()
+    yield jobs
+    jobs.stop()
+
+
+def submit_frame(manager, frame):
+    job_id = manager.create()
+    frame.to_csv(manager.input_path(job_id), index=False)
+    manager.submit(job_id, len(frame))
+    return job_id
+
+
+def wait_for(manager, job_id, timeout=30.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        state = manager.status(job_id)
+        if state["status"] not in ("queued", "running"):
+            return state
+        time.sleep(0.05)
+    raise AssertionError(f"Job {job_id} did not finish")
+
+
+class TestBatchJobs:
+    """Test suite for background batch jobs spooled on disk"""
+
+    def test_chunks_are_scored_in_input_order(self, manager, predictor):
+        """Test a job spanning several chunks produces the same predictions as a direct call"""
+        records = [dict(RECORD, Product_MRP=60.0 + i) for i in range(130)]
+        job_id = submit_frame(manager, pd.DataFrame(records))
+
+        state = wait_for(manager, job_id)
+        result = pd.read_csv(manager.result_path(job_id))
+
+        assert state["status"] == "succeeded"
+        assert state["rows_done"] == 130
+        np.testing.assert_allclose(
+            result["predicted_revenue"].to_numpy(),
+            predictor.predict_records(records),
+            rtol=1e-6
+        )
+        assert set(result["model_version"]) == set(state["model_versions"])
+
+    def test_unknown_row_count_is_set_when_parsed(self, manager):
+        """Test a CSV job submitted without a row count reports the rows its parser read"""
+        frame = pd.DataFrame([RECORD] * 50)
+        # Quoted values spanning lines: newlines do not count rows
+        frame["Notes"] = "restocked\non Monday"
+        job_id = manager.create()
+        frame.to_csv(manager.input_path(job_id), index=False)
+
+        assert manager.submit(job_id)["total_rows"] is None
+        state = wait_for(manager, job_id)
+
+        assert state["status"] == "succeeded"
+        assert state["total_rows"] == state["rows_done"] == 50
+
+    def test_invalid_row_fails_the_job(self, manager):
+        """Test a bad value fails the job with its row number and keeps no result"""
+        frame = pd.DataFrame([RECORD] * 100)
+        frame["Product_MRP"] = frame["Product_MRP"].astype(object)
+        frame.loc[57, "Product_MRP"] = "expensive"
+        job_id = submit_frame(manager, frame)
+
+        state = wait_for(manager, job_id)
+
+        assert state["status"] == "failed"
+        assert state["error"].startswith("Row 57, column Product_MRP")
+        assert state["rows_done"] == 40
+        with pytest.raises(ValueError):
+            manager.result_path(job_id)
+
+    def test_missing_columns_and_eviction(self, manager):
+        """Test inputs without the features are rejected and finished jobs expire"""
+        job_id = manager.create()
+        pd.DataFrame({"Product_MRP": [1.0]}).to_csv(manager.input_path(job_id), index=False)
+        with pytest.raises(ValueError, match="Missing required columns"):
+            manager.submit(job_id)
+        manager.discard(job_id)
+
+        job_id = submit_frame(manager, pd.DataFrame([RECORD] * 3))
+        wait_for(manager, job_id)
+
+        assert manager.evict_expired() == 0
+        assert manager.evict_expired(now=time.time() + 61) == 1
+        with pytest.raises(JobNotFoundError):
+            manager.status(job_id)
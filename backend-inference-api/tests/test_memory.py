@@ -0,0 +1,49 @@
+import pytest
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.memory import format_report, process_memory, worker_memory
+
+linux_only = pytest.mark.skipif(not os.path.exists("/proc/self/smaps_rollup"), reason="needs /proc smaps_rollup")
+
+
+class TestMemoryReport:
+    """Test suite for per-process memory reporting"""
+
+    @linux_only
+    def test_process_memory(self):
+        """Test figures for the current process are consistent"""
+        report = process_memory(os.getpid())
+        assert report["pid"] == os.getpid()
+        assert report["rss"] > 0
+        assert report["shared"] + report["unique"] == report["rss"]
+
+    @linux_only
+    def test_forked_child_listed_as_worker(self):
+        """Test children of a parent are reported as its workers"""
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(write_fd)
+            os.read(read_fd, 1)
+            os._exit(0)
+        try:
+            os.close(read_fd)
+            assert pid in [entry["pid"] for entry in worker_memory(os.getpid())]
+        finally:
+            os.close(write_fd)
+            os.waitpid(pid, 0)
+
+    def test_missing_process(self):
+        """Test an unknown pid yields no report"""
+        assert process_memory(2 ** 22 + 1) is None
+
+    def test_format_report(self):
+        """Test the report has one row per process plus a total"""
+        entry = {"pid": 1, "rss": 2 ** 20, "pss": 2 ** 20, "shared": 0, "unique": 2 ** 20}
+        lines = format_report([entry, dict(entry, pid=2)]).splitlines()
+        assert len(lines) == 4
+        assert lines[-1].split() == ["total", "2.0", "2.0", "0.0", "2.0"]
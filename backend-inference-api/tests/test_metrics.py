@@ -0,0 +1,102 @@
+import pytest
+import asyncio
+import subprocess
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.instrumentation import InstrumentationMiddleware, handler_finished, handler_started, stage_histogram
+from app.metrics import MetricsRegistry, SharedMetrics
+
+
+class TestPrometheusRendering:
+    """Test suite for the Prometheus text exposition"""
+
+    def test_render(self):
+        """Test counters, gauges and cumulative histogram buckets"""
+        registry = MetricsRegistry()
+        registry.counter("requests_total", "Requests").inc(3)
+        registry.gauge("in_flight").set(2)
+        histogram = registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0))
+        for value in (0.05, 0.5, 0.7, 5.0):
+            histogram.observe(value)
+
+        lines = registry.render_prometheus().splitlines()
+        assert "# HELP requests_total Requests" in lines
+        assert "# TYPE requests_total counter" in lines
+        assert "requests_total 3.0" in lines
+        assert "# TYPE in_flight gauge" in lines
+        assert "in_flight 2.0" in lines
+        assert "# TYPE latency_seconds histogram" in lines
+        assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{le="1.0"} 3' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 4' in lines
+        assert "latency_seconds_sum 6.25" in lines
+        assert "latency_seconds_count 4" in lines
+
+
+
+class TestSharedMetrics:
+    """Test suite for merging the metrics of several workers"""
+
+    def test_workers_are_merged(self, tmp_path):
+        """Test counters and histograms are summed over live and exited workers, gauges kept per live worker"""
+        exited = subprocess.Popen([sys.executable, "-c", "pass"])
+        exited.wait()
+
+        workers = []
+        for pid, requests, latency in ((os.getpid(), 3, 0.05), (exited.pid, 4, 5.0)):
+            registry = MetricsRegistry()
+            registry.counter("requests_total", "Requests").inc(requests)
+            registry.gauge("in_flight").set(requests)
+            registry.histogram("latency_seconds", "Latency", buckets=(0.1, 1.0)).observe(latency)
+            shared = SharedMetrics(registry, str(tmp_path), pid=pid)
+            shared.write()
+            workers.append(shared)
+
+        lines = workers[0].render().splitlines()
+        assert "requests_total 7.0" in lines
+        assert 'latency_seconds_bucket{le="0.1"} 1' in lines
+        assert 'latency_seconds_bucket{le="1.0"} 1' in lines
+        assert 'latency_seconds_bucket{le="+Inf"} 2' in lines
+        assert "latency_seconds_count 2" in lines
+        assert f'in_flight{{pid="{os.getpid()}"}} 3.0' in lines
+        assert not any(line.startswith(f'in_flight{{pid="{exited.pid}"}}') for line in lines)
+
+        # A worker's totals only grow: it writes its file again before rendering
+        workers[0].registry.counter("requests_total").inc()
+        assert "requests_total 8.0" in workers[0].render().splitlines()
+
+        workers[0].registry.reset_counts()
+        assert workers[0].registry.counter("requests_total").value == 0
+        assert workers[0].registry.gauge("in_flight").value == 3
+
+
+class TestInstrumentationMiddleware:
+    """Test suite for the request timing middleware"""
+
+    def test_parse_and_serialize_stages(self):
+        """Test the stages around an instrumented handler are recorded"""
+        parse, serialize = stage_histogram("parse"), stage_histogram("serialize")
+        before = parse.value["count"], serialize.value["count"]
+
+        async def app(scope, receive, send):
+            handler_started()
+            handler_finished()
+            await send({"type": "http.response.start", "status": 200, "headers": []})
+            await send({"type": "http.response.body", "body": b""})
+
+        async def receive():
+            return {"type": "http.request", "body": b""}
+
+        sent = []
+
+        async def send(message):
+            sent.append(message["type"])
+
+        asyncio.run(InstrumentationMiddleware(app)({"type": "http"}, receive, send))
+        assert sent == ["http.response.start", "http.response.body"]
+        assert parse.value["count"] == before[0] + 1
+        assert serialize.value["count"] == before[1] + 1
@@ -0,0 +1,123 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app import prediction_cache
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+from app.prediction_cache import PredictionCache
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+
+def make_record(**overrides):
+    """Valid input row with optional overrides"""
+    record = {
+        "Product_Type": "Dairy",
+        "Store_Type": "Supermarket Type1",
+        "Store_Location_City_Type": "Tier 2",
+        "Store_Size": "Medium",
+        "Product_Sugar_Content": "Low Sugar",
+        "Product_Weight": 12.5,
+        "Product_MRP": 150.0,
+        "Product_Allocated_Area": 0.05,
+        "Store_Establishment_Year": 2009
+    }
+    record.update(overrides)
+    return record
+
+
+class TestPredictionCache:
+    """Test suite for PredictionCache class"""
+
+    def test_quantized_keys(self):
+        """Test numeric features are snapped to the configured quantum"""
+        cache = PredictionCache(max_entries=10, quantum=0.1)
+        assert cache.make_key(make_record(Product_MRP=150.01)) == cache.make_key(make_record(Product_MRP=149.99))
+        assert cache.make_key(make_record(Product_MRP=150.2)) != cache.make_key(make_record(Product_MRP=150.0))
+
+        exact = PredictionCache(max_entries=10)
+        assert exact.make_key(make_record(Product_MRP=150.01)) != exact.make_key(make_record(Product_MRP=150.0))
+
+    def test_lru_eviction(self):
+        """Test the least recently used entry is dropped at capacity"""
+        cache = PredictionCache(max_entries=2)
+        cache.put_many(["a", "b"], [1.0, 2.0], generation=1)
+        cache.get_many(["a"], generation=1)
+        cache.put_many(["c"], [3.0], generation=1)
+
+        predictions, missing = cache.get_many(["a", "b", "c"], generation=1)
+        assert missing == [1]
+        assert predictions[0] == 1.0 and predictions[2] == 3.0
+
+    def test_ttl_expiry(self, monkeypatch):
+        """Test entries are not served after their TTL"""
+        now = [100.0]
+        monkeypatch.setattr(prediction_cache.time, "monotonic", lambda: now[0])
+        cache = PredictionCache(max_entries=10, ttl_seconds=5.0)
+        cache.put_many(["a"], [1.0], generation=1)
+
+        now[0] = 104.0
+        assert cache.get_many(["a"], generation=1)[1] == []
+        now[0] = 106.0
+        assert cache.get_many(["a"], generation=1)[1] == [0]
+        assert len(cache) == 0
+
+    def test_new_generation_invalidates(self):
+        """Test a model reload flushes entries and drops stale writes"""
+        cache = PredictionCache(max_entries=10)
+        cache.put_many(["a"], [1.0], generation=1)
+        assert cache.get_many(["a"], generation=2)[1] == [0]
+
+        cache.put_many(["b"], [2.0], generation=1)
+        assert cache.get_many(["b"], generation=2)[1] == [0]
+
+
+class TestPredictorCache:
+    """Test suite for the cache in front of Predictor"""
+
+    @pytest.fixture
+    def loader(self):
+        """Model loader with the shipped pipeline"""
+        loader = ModelLoader(MODEL_PATH)
+        loader.load_model()
+        return loader
+
+    def test_batch_scores_only_misses(self, loader, monkeypatch):
+        """Test cached rows never reach the model and results are unchanged"""
+        predictor = Predictor(loader)
+        records = [make_record(Product_MRP=100.0 + i) for i in range(4)]
+        expected = predictor._score_records(loader.current, records)
+
+        scored = []
+        score_records = predictor._score_records
+
+        def counting_score(model, rows):
+            scored.append(len(rows))
+            return score_records(model, rows)
+
+        monkeypatch.setattr(predictor, "_score_records", counting_score)
+        predictor.predict_records(records[:2])
+        actual = predictor.predict_records(records)
+
+        assert scored == [2, 2]
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_reload_invalidates(self, loader, monkeypatch):
+        """Test predictions are recomputed after reload_model"""
+        predictor = Predictor(loader)
+        record = make_record()
+        predictor.predict_records([record])
+
+        scored = []
+        monkeypatch.setattr(predictor, "_score_records", lambda model, rows: scored.append(len(rows)) or np.zeros(len(rows)))
+        predictor.predict_records([record])
+        assert scored == []
+
+        loader.reload_model()
+        predictor.predict_records([record])
+        assert scored == [1]
@@ -0,0 +1,56 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+from app.profiling import build_report, profile_call, save_profile
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+RECORD = {
+    "Product_Type": "Dairy",
+    "Store_Type": "Supermarket Type1",
+    "Store_Location_City_Type": "Tier 2",
+    "Store_Size": "Medium",
+    "Product_Sugar_Content": "Low Sugar",
+    "Product_Weight": 12.5,
+    "Product_MRP": 150.0,
+    "Product_Allocated_Area": 0.05,
+    "Store_Establishment_Year": 2009,
+}
+
+
+class TestRequestProfiling:
+    """Test suite for per-request profiling reports"""
+
+    def test_report_of_predictor_call(self, tmp_path):
+        """Test the call tree starts at the profiled function and reaches the Predictor"""
+        loader = ModelLoader(MODEL_PATH)
+        loader.load_model(use_artifact=False)
+        predictor = Predictor(loader)
+
+        def profiled_batch():
+            return predictor._score_records(loader.current, [RECORD] * 50)
+
+        predictions, profile = profile_call(profiled_batch)
+        report = build_report(profile, "profiled_batch")
+
+        np.testing.assert_array_equal(predictions, predictor._score_records(loader.current, [RECORD] * 50))
+        tree = report["call_tree"]
+        assert tree["function"].endswith("(profiled_batch)")
+        assert any("_score_records" in child["function"] for child in tree["children"])
+        assert "app" in report["by_library_ms"]
+        assert report["top_functions"]
+
+        path = save_profile(profile, str(tmp_path), "test")
+        assert path is not None and os.path.getsize(path) > 0
+
+    def test_unknown_root(self):
+        """Test a root that was never called yields no tree"""
+        _, profile = profile_call(lambda: sum(range(10)))
+        assert build_report(profile, "not_called")["call_tree"] is None
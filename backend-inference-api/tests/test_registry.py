@@ -0,0 +1,98 @@
+import pytest
+import joblib
+import numpy as np
+import shutil
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.artifact import build_artifact
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+from app.registry import ModelNotFoundError, ModelRegistry
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+RECORD = {
+    "Product_Type": "Dairy",
+    "Store_Type": "Supermarket Type1",
+    "Store_Location_City_Type": "Tier 2",
+    "Store_Size": "Medium",
+    "Product_Sugar_Content": "Low Sugar",
+    "Product_Weight": 12.5,
+    "Product_MRP": 150.0,
+    "Product_Allocated_Area": 0.05,
+    "Store_Establishment_Year": 2009,
+}
+
+
+class TestModelRegistry:
+    """Test suite for the multi-model registry"""
+
+    @pytest.fixture
+    def models_dir(self, tmp_path):
+        """Directory with the default model and two more versions of it"""
+        shutil.copy(MODEL_PATH, tmp_path / "default.joblib")
+        model = joblib.load(MODEL_PATH)
+        joblib.dump(model, tmp_path / "regional.joblib", compress=3)
+        joblib.dump(model, tmp_path / "candidate.joblib", compress=1)
+        return tmp_path
+
+    @pytest.fixture
+    def registry(self, models_dir):
+        loader = ModelLoader(str(models_dir / "default.joblib"))
+        loader.load_model()
+        return ModelRegistry(str(models_dir), Predictor(loader), max_loaded=1)
+
+    def test_routes_by_name_and_version(self, registry):
+        """Test models are found by name or version prefix and loaded once"""
+        names = [model["name"] for model in registry.list_models()]
+        assert names == ["default", "candidate", "regional"]
+        assert registry.get("default") is registry.default
+
+        regional = registry.get("regional")
+        version = regional.model_loader.version
+        assert version != registry.default.model_loader.version
+        assert registry.get(version[:8]) is regional
+
+        expected = registry.default.predict_records([RECORD])
+        np.testing.assert_array_equal(regional.predict_records([RECORD]), expected)
+
+    def test_unknown_model(self, registry):
+        """Test unknown names and too-short version prefixes are rejected"""
+        with pytest.raises(ModelNotFoundError):
+            registry.get("missing")
+        with pytest.raises(ModelNotFoundError):
+            registry.get(registry.default.model_loader.version[:3])
+
+    def test_lru_eviction(self, registry):
+        """Test the least recently used model is unloaded and the default never is"""
+        regional = registry.get("regional")
+        candidate = registry.get("candidate")
+        assert [model["name"] for model in registry.list_models() if model["loaded"]] == ["default", "candidate"]
+        assert registry.get("regional") is not regional
+        assert registry.get("default") is registry.default
+        assert candidate.model_loader.is_loaded()
+
+    def test_discovers_artifact_without_joblib(self, models_dir, registry):
+        """Test a bare artifact directory is served under its name"""
+        build_artifact(str(models_dir / "regional.joblib"), str(models_dir / "packed.artifact"))
+        predictor = registry.get("packed")
+        assert predictor.model_loader.source == "artifact"
+        assert predictor.model_loader.version == registry.get("regional").model_loader.version
+
+    def test_rescans_keep_hashes_of_current_files_only(self, models_dir, registry):
+        """Test hashes of rewritten and deleted model files are dropped on rescan"""
+        registry.discover()
+        stat = (models_dir / "candidate.joblib").stat()
+        os.utime(models_dir / "candidate.joblib", ns=(stat.st_atime_ns, stat.st_mtime_ns + 10 ** 9))
+        os.remove(models_dir / "regional.joblib")
+
+        registry.discover()
+
+        assert sorted((os.path.basename(path), mtime) for path, mtime, _ in registry._hashes) == [
+            ("candidate.joblib", stat.st_mtime_ns + 10 ** 9),
+            ("default.joblib", (models_dir / "default.joblib").stat().st_mtime_ns),
+        ]
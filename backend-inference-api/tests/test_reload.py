@@ -0,0 +1,109 @@
+import pytest
+import joblib
+import numpy as np
+import shutil
+import threading
+import time
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+from app.reloader import ModelWatcher
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+RECORD = {
+    "Product_Type": "Dairy",
+    "Store_Type": "Supermarket Type1",
+    "Store_Location_City_Type": "Tier 2",
+    "Store_Size": "Medium",
+    "Product_Sugar_Content": "Low Sugar",
+    "Product_Weight": 12.5,
+    "Product_MRP": 150.0,
+    "Product_Allocated_Area": 0.05,
+    "Store_Establishment_Year": 2009,
+}
+
+
+def rewrite_model(model_path):
+    """Write the same pipeline back with different bytes, i.e. a new model version"""
+    model = joblib.load(MODEL_PATH)
+    staging = str(model_path) + ".tmp"
+    joblib.dump(model, staging, compress=3)
+    os.replace(staging, model_path)
+
+
+class TestHotReload:
+    """Test suite for zero-downtime model reloads"""
+
+    @pytest.fixture
+    def loader(self, tmp_path):
+        """Model loader on a private copy of the shipped joblib"""
+        model_path = tmp_path / "model.joblib"
+        shutil.copy(MODEL_PATH, model_path)
+        loader = ModelLoader(str(model_path))
+        loader.load_model()
+        return loader
+
+    def test_reload_swaps_version(self, loader):
+        """Test a changed file gets a new version and the same predictions"""
+        predictor = Predictor(loader)
+        before = predictor.score_records([RECORD])
+        old_version, old_generation = loader.version, loader.generation
+
+        rewrite_model(loader.model_path)
+        loaded = loader.reload_model()
+        after = predictor.score_records([RECORD])
+
+        assert loaded is loader.current
+        assert after.model_version == loader.version != old_version
+        assert loader.generation == old_generation + 1
+        np.testing.assert_array_equal(after.predictions, before.predictions)
+
+    def test_reload_drains_in_flight_requests(self, loader):
+        """Test the swap is immediate but reload waits for requests on the old version"""
+        reloaded = threading.Event()
+
+        def reload():
+            loader.reload_model(drain_timeout=10.0)
+            reloaded.set()
+
+        with loader.acquire() as old:
+            thread = threading.Thread(target=reload)
+            thread.start()
+            deadline = time.monotonic() + 10.0
+            while loader.current is old and time.monotonic() < deadline:
+                time.sleep(0.01)
+            assert loader.current is not old
+            assert not reloaded.wait(0.2)
+        thread.join(10.0)
+        assert reloaded.is_set()
+        assert old.in_flight == 0
+
+    def test_failed_reload_keeps_serving(self, loader):
+        """Test an unreadable file leaves the current version in place"""
+        predictor = Predictor(loader)
+        old = loader.current
+        with open(loader.model_path, "wb") as f:
+            f.write(b"not a model")
+
+        with pytest.raises(ValueError):
+            loader.reload_model()
+        assert loader.current is old
+        assert predictor.score_records([RECORD]).model_version == old.version
+
+    def test_watcher_reloads_only_on_new_content(self, loader):
+        """Test touching the file is ignored and new contents trigger a reload"""
+        reloads = []
+        watcher = ModelWatcher(loader, interval_seconds=1.0, on_reload=reloads.append)
+
+        os.utime(loader.model_path)
+        assert watcher.check() is False
+
+        rewrite_model(loader.model_path)
+        assert watcher.check() is True
+        assert reloads == [loader.current]
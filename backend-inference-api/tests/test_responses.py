@@ -0,0 +1,44 @@
+import pytest
+import numpy as np
+import json
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.predict import ScoredBatch
+from app.responses import compact_batch_response
+
+
+class TestCompactBatchResponse:
+    """Test suite for the compact batch response format"""
+
+    def test_flat_predictions_with_one_timestamp(self):
+        """Test predictions are a flat array next to a single timestamp and model version"""
+        scored = ScoredBatch(np.array([1.5, 2.25, 3.0], dtype=np.float64), "abc123")
+
+        response = compact_batch_response(scored)
+        body = json.loads(response.body)
+
+        assert response.media_type == "application/json"
+        assert body["predictions"] == [1.5, 2.25, 3.0]
+        assert body["total_records"] == 3
+        assert body["model_version"] == "abc123"
+        assert isinstance(body["timestamp"], str)
+
+    def test_float32_values_match_full_format(self):
+        """Test float32 predictions print as float() would in the full format"""
+        predictions = np.array([3574.3474, 0.1], dtype=np.float32)
+
+        body = json.loads(compact_batch_response(ScoredBatch(predictions, None)).body)
+
+        assert body["predictions"] == [float(value) for value in predictions]
+        assert body["model_version"] is None
+
+    def test_empty_batch(self):
+        """Test an empty batch renders an empty array"""
+        body = json.loads(compact_batch_response(ScoredBatch(np.array([]), "v1")).body)
+
+        assert body["predictions"] == []
+        assert body["total_records"] == 0
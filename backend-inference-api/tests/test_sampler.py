@@ -0,0 +1,71 @@
+import pytest
+import threading
+import time
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.sampler import StackSampler
+
+
+def busy_leaf(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def busy_root(stop):
+    busy_leaf(stop)
+
+
+class TestStackSampler:
+    """Test suite for the sampling profiler"""
+
+    @pytest.fixture
+    def threads(self):
+        """One thread running busy_root -> busy_leaf and one waiting on an event"""
+        stop = threading.Event()
+        busy = threading.Thread(target=busy_root, args=(stop,), name="busy worker")
+        idle = threading.Thread(target=stop.wait, name="idle")
+        busy.start()
+        idle.start()
+        yield
+        stop.set()
+        busy.join()
+        idle.join()
+
+    def test_collapsed_stacks(self, threads):
+        """Test busy stacks are recorded outermost-first and idle threads skipped"""
+        sampler = StackSampler()
+        for _ in range(5):
+            sampler.sample(exclude=threading.get_ident())
+
+        lines = sampler.collapsed().splitlines()
+        busy = [line for line in lines if line.startswith("busy_worker;")]
+        assert busy
+        stack, count = busy[0].rsplit(" ", 1)
+        frames = stack.split(";")
+        assert int(count) >= 1
+        assert frames.index(next(f for f in frames if f.startswith("busy_root "))) < frames.index(
+            next(f for f in frames if f.startswith("busy_leaf "))
+        )
+        assert not any(line.startswith("idle;") for line in lines)
+
+    def test_include_idle_and_window(self, threads):
+        """Test idle threads can be included and old samples are dropped from the output"""
+        sampler = StackSampler(include_idle=True)
+        sampler.sample()
+        assert any(line.startswith("idle;") for line in sampler.collapsed().splitlines())
+
+        sampler._slices[0] = (time.monotonic() - 10 ** 6, sampler._slices[0][1])
+        assert sampler.collapsed(seconds=60) == ""
+
+    def test_background_thread(self, threads):
+        """Test the sampling thread records samples until stopped"""
+        sampler = StackSampler(interval_seconds=0.005)
+        sampler.start()
+        time.sleep(0.2)
+        sampler.stop()
+        assert not sampler.is_running
+        assert "busy_leaf" in sampler.collapsed()
@@ -0,0 +1,101 @@
+import pytest
+import joblib
+import numpy as np
+import shutil
+import time
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+from app.registry import ModelRegistry
+from app.shadow import DivergenceStats, ShadowScorer
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+RECORD = {
+    "Product_Type": "Dairy",
+    "Store_Type": "Supermarket Type1",
+    "Store_Location_City_Type": "Tier 2",
+    "Store_Size": "Medium",
+    "Product_Sugar_Content": "Low Sugar",
+    "Product_Weight": 12.5,
+    "Product_MRP": 150.0,
+    "Product_Allocated_Area": 0.05,
+    "Store_Establishment_Year": 2009,
+}
+
+
+def wait_for(condition, timeout=10.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return condition()
+
+
+class TestDivergenceStats:
+    """Test suite for DivergenceStats"""
+
+    def test_statistics(self):
+        """Test mean, bias, maximum and windowed percentiles of the differences"""
+        stats = DivergenceStats(window=4)
+        stats.add(np.zeros(3), np.array([1.0, -2.0, 3.0]))
+        stats.add(np.zeros(2), np.array([10.0, 10.0]))
+        snapshot = stats.snapshot()
+
+        assert snapshot["rows"] == 5 and snapshot["batches"] == 2
+        assert snapshot["mean_abs_diff"] == pytest.approx(26.0 / 5)
+        assert snapshot["mean_diff"] == pytest.approx(22.0 / 5)
+        assert snapshot["max_abs_diff"] == 10.0
+        # Window holds the last four rows: 2, 3, 10, 10
+        assert snapshot["p50_abs_diff"] == pytest.approx(6.5)
+
+
+class TestShadowScorer:
+    """Test suite for background shadow scoring"""
+
+    @pytest.fixture
+    def registry(self, tmp_path):
+        shutil.copy(MODEL_PATH, tmp_path / "primary.joblib")
+        joblib.dump(joblib.load(MODEL_PATH), tmp_path / "candidate.joblib", compress=3)
+        loader = ModelLoader(str(tmp_path / "primary.joblib"))
+        loader.load_model()
+        return ModelRegistry(str(tmp_path), Predictor(loader))
+
+    def test_scores_sampled_requests_per_pair(self, registry):
+        """Test sampled requests are compared with the shadow model in the background"""
+        scorer = ShadowScorer(registry, "candidate", sample_rate=1.0)
+        scorer.start()
+        try:
+            scored = registry.default.score_records([RECORD, RECORD])
+            assert scorer.submit([RECORD, RECORD], scored.predictions, scored.model_version)
+            assert wait_for(lambda: scorer.snapshot() and scorer.snapshot()[0]["rows"] == 2)
+        finally:
+            scorer.stop()
+
+        pair = scorer.snapshot()[0]
+        assert pair["primary_version"] == scored.model_version
+        assert pair["shadow_version"] == registry.get("candidate").model_loader.version
+        # Same pipeline pickled differently: identical predictions
+        assert pair["max_abs_diff"] == 0.0
+
+    def test_unsampled_and_failing_requests(self, registry):
+        """Test a zero sample rate queues nothing and shadow errors stay in the background"""
+        idle = ShadowScorer(registry, "candidate", sample_rate=0.0)
+        idle.start()
+        try:
+            assert not idle.submit([RECORD], [1.0], "v")
+        finally:
+            idle.stop()
+
+        broken = ShadowScorer(registry, "missing", sample_rate=1.0)
+        broken.start()
+        try:
+            assert broken.submit([RECORD], [1.0], "v")
+            assert wait_for(lambda: broken._queue.empty())
+        finally:
+            broken.stop()
+        assert broken.snapshot() == []
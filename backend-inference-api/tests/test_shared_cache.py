@@ -0,0 +1,124 @@
+import pytest
+import numpy as np
+import sys
+import os
+import uuid
+from multiprocessing import shared_memory
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import settings
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+from app.shared_cache import SharedPredictionCache, PROBE_SLOTS
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+
+class TestSharedPredictionCache:
+    """Test suite for SharedPredictionCache class"""
+
+    @pytest.fixture
+    def name(self):
+        """Unique segment name, unlinked after the test"""
+        name = f"superkart_test_{uuid.uuid4().hex[:12]}"
+        yield name
+        shm = shared_memory.SharedMemory(name=name)
+        shm.close()
+        shm.unlink()
+
+    def test_entries_visible_to_attached_cache(self, name):
+        """Test a second attachment sees entries written by the first"""
+        writer = SharedPredictionCache(name, n_slots=1024)
+        reader = SharedPredictionCache(name, n_slots=1024)
+        keys = [writer.make_key({"Product_Type": "Dairy", **self._numeric(i)}) for i in range(10)]
+        writer.put_many(keys[:6], np.arange(6, dtype=np.float32), version=7)
+
+        predictions, missing = reader.get_many(keys, version=7)
+        assert missing == [6, 7, 8, 9]
+        np.testing.assert_array_equal(predictions[:6], np.arange(6, dtype=np.float32))
+        writer.close()
+        reader.close()
+
+    def test_entries_versioned_by_model(self, name):
+        """Test entries of another model version are not served and get replaced"""
+        cache = SharedPredictionCache(name, n_slots=1024)
+        cache.put_many([123], [1.0], version=1)
+        assert cache.get_many([123], version=2)[1] == [0]
+
+        cache.put_many([123], [2.0], version=2)
+        predictions, missing = cache.get_many([123], version=2)
+        assert missing == [] and predictions[0] == 2.0
+        cache.close()
+
+    def test_full_window_evicts_oldest(self, name):
+        """Test colliding keys beyond the probe window evict the oldest entry"""
+        cache = SharedPredictionCache(name, n_slots=16)
+        # Same home slot, different keys
+        keys = [5 + 16 * i for i in range(PROBE_SLOTS + 1)]
+        for i, key in enumerate(keys):
+            cache.put_many([key], [float(i)], version=1)
+
+        predictions, missing = cache.get_many(keys, version=1)
+        assert missing == [0]
+        np.testing.assert_array_equal(predictions[1:], np.arange(1, PROBE_SLOTS + 1, dtype=np.float32))
+        cache.close()
+
+    def test_torn_slot_is_a_miss(self, name):
+        """Test a slot whose fields do not match its checksum is ignored"""
+        cache = SharedPredictionCache(name, n_slots=16)
+        cache.put_many([42], [1.0], version=1)
+        slot = np.flatnonzero(cache._slots["key"] == 42)[0]
+        cache._slots["value"][slot] = 99.0
+
+        assert cache.get_many([42], version=1)[1] == [0]
+        cache.close()
+
+    def test_incompatible_layout_rejected(self, name):
+        """Test attaching with a different table size fails"""
+        cache = SharedPredictionCache(name, n_slots=16)
+        with pytest.raises(ValueError):
+            SharedPredictionCache(name, n_slots=1024)
+        cache.close()
+
+    def test_predictor_uses_shared_cache(self, name, monkeypatch):
+        """Test Predictor serves repeated rows from the shared table"""
+        monkeypatch.setattr(settings, "PREDICTION_CACHE_BACKEND", "shared")
+        monkeypatch.setattr(settings, "SHARED_CACHE_NAME", name)
+        monkeypatch.setattr(settings, "SHARED_CACHE_SLOTS", 16)
+        loader = ModelLoader(MODEL_PATH)
+        loader.load_model()
+        predictor = Predictor(loader)
+        assert isinstance(predictor.cache, SharedPredictionCache)
+
+        record = {
+            "Product_Type": "Dairy",
+            "Store_Type": "Supermarket Type1",
+            "Store_Location_City_Type": "Tier 2",
+            "Store_Size": "Medium",
+            "Product_Sugar_Content": "Low Sugar",
+            "Product_Weight": 12.5,
+            "Product_MRP": 150.0,
+            "Product_Allocated_Area": 0.05,
+            "Store_Establishment_Year": 2009
+        }
+        expected = predictor.predict_records([record])
+        other = Predictor(loader)
+        monkeypatch.setattr(other, "_score_records", lambda model, rows: pytest.fail("cache miss"))
+        np.testing.assert_array_equal(other.predict_records([record]), expected)
+        predictor.cache.close()
+        other.cache.close()
+
+    @staticmethod
+    def _numeric(i):
+        return {
+            "Store_Type": "Food Mart",
+            "Store_Location_City_Type": "Tier 1",
+            "Store_Size": "High",
+            "Product_Sugar_Content": "Regular",
+            "Product_Weight": 10.0 + i,
+            "Product_MRP": 100.0,
+            "Product_Allocated_Area": 0.1,
+            "Store_Establishment_Year": 1999
+        }
@@ -0,0 +1,102 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import settings
+from app.model_loader import ModelLoader
+from app.predict import Predictor, NumpyTreeEngine, SpecializedEngine, XGBoostEngine
+from app.specialize import EnsembleSpecializer
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+
+class TestEnsembleSpecializer:
+    """Test suite for EnsembleSpecializer class"""
+
+    @pytest.fixture(scope="class")
+    def loader(self):
+        """Model loader with the shipped pipeline"""
+        loader = ModelLoader(MODEL_PATH)
+        loader.load_model()
+        return loader
+
+    @pytest.fixture
+    def specializer(self, loader):
+        """Fresh specializer with a small LRU"""
+        return EnsembleSpecializer(
+            loader.ensemble,
+            loader.encoder.categorical_columns,
+            max_entries=4,
+            max_grid_cells=settings.SPECIALIZATION_MAX_GRID_CELLS
+        )
+
+    @pytest.fixture
+    def encoded(self, loader):
+        """Encoded rows spread over a handful of categorical combinations"""
+        rng = np.random.default_rng(1)
+        n_rows = 2000
+        combos = np.zeros((6, loader.encoder.n_features), dtype=np.float32)
+        for block in loader.encoder.blocks:
+            if not block.is_categorical:
+                continue
+            codes = rng.integers(0, len(block.categories), len(combos))
+            if block.kind == "ordinal":
+                combos[:, block.offset] = codes
+            else:
+                combos[np.arange(len(combos)), block.offset + codes] = 1.0
+
+        X = combos[rng.integers(0, len(combos), n_rows)]
+        X[:, :2] = rng.normal(0.0, 1.5, (n_rows, 2))
+        X[X == 0] = np.nan
+        X[rng.random(n_rows) < 0.05, 1] = np.nan
+        return X
+
+    def test_parity_with_xgboost(self, loader, specializer, encoded):
+        """Test specialized ensembles match native XGBoost predictions"""
+        expected = loader.regressor.predict(encoded)
+        np.testing.assert_array_equal(specializer.predict(encoded), expected)
+        np.testing.assert_array_equal(specializer.predict(encoded[:1]), expected[:1])
+
+    def test_lookup_grid_built(self, loader, specializer, encoded):
+        """Test combinations of the shipped model compile to lookup grids"""
+        categorical = encoded[0, loader.encoder.categorical_columns]
+        assert specializer.get(categorical).grid is not None
+
+    def test_lru_eviction(self, specializer, encoded):
+        """Test the cache keeps at most max_entries combinations"""
+        specializer.predict(encoded)
+        assert len(specializer._cache) == 4
+
+        first_key = next(iter(specializer._cache))
+        categorical = np.frombuffer(first_key, dtype=np.float32)
+        specializer.get(categorical)
+        assert next(reversed(specializer._cache)) == first_key
+
+    def test_fragmented_batch_uses_fallback(self, specializer, encoded):
+        """Test batches with too few rows per combination are delegated"""
+        calls = []
+
+        def fallback(X):
+            calls.append(len(X))
+            return np.zeros(len(X), dtype=np.float32)
+
+        specializer.predict(encoded[:6], fallback=fallback, min_group_rows=4)
+        assert calls == [6]
+
+        specializer.predict(encoded, fallback=fallback, min_group_rows=4)
+        assert calls == [6]
+
+    def test_engine_selection(self, loader, monkeypatch):
+        """Test auto mode wraps the size-based engine in the specialized one"""
+        predictor = Predictor(loader)
+        monkeypatch.setattr(settings, "INFERENCE_ENGINE", "auto")
+        monkeypatch.setattr(settings, "NUMPY_ENGINE_MAX_ROWS", 100)
+
+        engine = predictor.select_engine(100)
+        assert isinstance(engine, SpecializedEngine)
+        assert isinstance(engine.fallback, NumpyTreeEngine)
+        assert isinstance(predictor.select_engine(101).fallback, XGBoostEngine)
@@ -0,0 +1,59 @@
+import pytest
+import asyncio
+import json
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.streaming import StreamFormatError, ndjson_predictions, read_ndjson_rows, rows_to_columns
+
+
+async def byte_stream(chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+def collect(chunks, chunk_rows=2, max_line_bytes=1024):
+    async def run():
+        return [rows async for rows in read_ndjson_rows(byte_stream(chunks), chunk_rows, max_line_bytes)]
+    return asyncio.run(run())
+
+
+class TestNDJSONStreaming:
+    """Test suite for incremental NDJSON decoding"""
+
+    def test_rows_split_across_chunks(self):
+        """Test lines cut at arbitrary byte boundaries are grouped into fixed-size chunks"""
+        body = b"".join(json.dumps({"i": i}).encode() + b"\n" for i in range(5))
+        pieces = [body[i:i + 3] for i in range(0, len(body), 3)]
+
+        chunks = collect(pieces + [b"\n\n"])
+
+        assert [[row["i"] for row in rows] for rows in chunks] == [[0, 1], [2, 3], [4]]
+
+    def test_last_line_without_newline(self):
+        """Test a final row without a trailing newline is still read"""
+        assert collect([b'{"i": 0}\n{"i"', b': 1}']) == [[{"i": 0}, {"i": 1}]]
+
+    def test_invalid_and_oversized_lines(self):
+        """Test bad lines are reported with their row number"""
+        with pytest.raises(StreamFormatError) as excinfo:
+            collect([b'{"i": 0}\n{"i": 1}\n{"i":\n'])
+        assert excinfo.value.row == 2
+
+        with pytest.raises(StreamFormatError, match="longer than"):
+            collect([b"[" + b"1," * 600], max_line_bytes=1024)
+
+    def test_rows_to_columns_and_rendering(self):
+        """Test rows are transposed per feature and predictions rendered one line each"""
+        columns = rows_to_columns([{"a": 1, "b": "x"}, {"a": 2}, 5], ["a", "b"])
+        assert columns == {"a": [1, 2, None], "b": ["x", None, None]}
+
+        lines = ndjson_predictions(np.array([1.5, 2.0], dtype=np.float32), "v1").splitlines()
+        assert [json.loads(line) for line in lines] == [
+            {"predicted_revenue": 1.5, "model_version": "v1"},
+            {"predicted_revenue": 2.0, "model_version": "v1"},
+        ]
@@ -0,0 +1,88 @@
+import pytest
+import multiprocessing
+import numpy as np
+import time
+import uuid
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.model_loader import ModelLoader
+from app.threads import SharedThreadUsage, ThreadPolicy, measure_crossovers, thread_levels
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+
+def hold_threads(name, threads, ready, release):
+    usage = SharedThreadUsage(name)
+    usage.publish(threads)
+    ready.set()
+    release.wait(10)
+
+
+class TestThreadPolicy:
+    """Test suite for choosing XGBoost thread counts"""
+
+    def test_threads_by_size_and_concurrency(self):
+        """Test small batches get one thread and concurrent calls share the CPUs"""
+        policy = ThreadPolicy(cpus=6, min_rows_per_thread=100)
+
+        assert thread_levels(6) == [1, 2, 4, 6]
+        assert [policy.threads_for(n) for n in (1, 99, 150, 350, 10000)] == [1, 1, 2, 4, 6]
+
+        with policy.reserve(10000) as first:
+            with policy.reserve(350) as second:
+                with policy.reserve(10000) as third:
+                    assert (first, second, third) == (6, 1, 1)
+        with policy.reserve(10000) as threads:
+            assert threads == 6
+
+    def test_usage_is_shared_between_processes(self):
+        """Test threads held by another worker are subtracted, and released when it exits"""
+        name = f"superkart_threads_test_{uuid.uuid4().hex[:8]}"
+        usage = SharedThreadUsage(name)
+        policy = ThreadPolicy(cpus=4, min_rows_per_thread=1, usage=usage)
+        context = multiprocessing.get_context("fork")
+        ready, release = context.Event(), context.Event()
+        worker = context.Process(target=hold_threads, args=(name, 3, ready, release))
+        try:
+            worker.start()
+            assert ready.wait(10)
+
+            assert usage.others() == 3
+            with policy.reserve(1000) as threads:
+                assert threads == 1
+
+            release.set()
+            worker.join(10)
+            assert usage.others() == 0
+        finally:
+            release.set()
+            worker.join(10)
+            usage._shm.unlink()
+
+    def test_measure_crossovers(self):
+        """Test each thread count starts at the first size where it beats the previous one"""
+        def predict(threads, batch):
+            # Fixed cost per thread, work split across threads
+            time.sleep(0.001 * (threads - 1) + len(batch) * 1e-6 / threads)
+
+        assert measure_crossovers(predict, np.zeros((3, 2)), [1, 2, 4]) == {1: 0, 2: 4096, 4: 16384}
+        assert measure_crossovers(lambda threads, batch: time.sleep(0.001 * threads), np.zeros((3, 2)), [1, 2]) == {1: 0}
+
+    def test_regressor_copies(self):
+        """Test each thread count gets its own copy of the booster with the same predictions"""
+        loader = ModelLoader(MODEL_PATH)
+        loader.load_model(use_artifact=False)
+        regressor = loader.current.regressor
+        X = loader.probe_matrix()
+        policy = ThreadPolicy(cpus=2)
+
+        single = policy.regressor_for(regressor, 1)
+
+        assert single.n_jobs == 1 and regressor.n_jobs is None
+        assert policy.regressor_for(regressor, 1) is single
+        assert policy.regressor_for(regressor, 2).get_booster() is not single.get_booster()
+        np.testing.assert_array_equal(policy.predict(regressor, X), regressor.predict(X))
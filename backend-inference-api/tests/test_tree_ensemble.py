@@ -0,0 +1,75 @@
+import pytest
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.config import settings
+from app.model_loader import ModelLoader
+from app.predict import Predictor, NumpyTreeEngine, XGBoostEngine
+from app.tree_ensemble import TreeEnsemble
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+
+class TestTreeEnsemble:
+    """Test suite for TreeEnsemble class and engine selection"""
+
+    @pytest.fixture(scope="class")
+    def loader(self):
+        """Model loader with the shipped pipeline"""
+        loader = ModelLoader(MODEL_PATH)
+        loader.load_model()
+        return loader
+
+    @pytest.fixture
+    def encoded(self, loader):
+        """Random encoded rows, including missing values in every column"""
+        rng = np.random.default_rng(0)
+        n_rows = 3000
+        X = np.zeros((n_rows, loader.encoder.n_features), dtype=np.float32)
+        X[:, :2] = rng.normal(0.0, 1.5, (n_rows, 2))
+        X[:, 2:4] = rng.integers(0, 3, (n_rows, 2))
+        X[:, 4:] = rng.integers(0, 2, (n_rows, loader.encoder.n_features - 4))
+        X[X == 0] = np.nan
+        X[rng.random(X.shape) < 0.05] = np.nan
+        return X
+
+    def test_ensemble_built_on_load(self, loader):
+        """Test the shipped booster converts to flat arrays"""
+        ensemble = loader.ensemble
+        assert ensemble is not None
+        assert ensemble.n_trees == 50
+        assert ensemble.max_depth == 6
+        # Split children are adjacent after renumbering
+        internal = ~np.isnan(ensemble.threshold)
+        assert np.array_equal(ensemble.right[internal], ensemble.left[internal] + 1)
+
+    @pytest.mark.parametrize("n_rows", [1, 7, 1000, 3000])
+    def test_parity_with_xgboost(self, loader, encoded, n_rows):
+        """Test NumPy evaluation matches native XGBoost predictions, infinite values included"""
+        X = encoded[:n_rows].copy()
+        # +inf in the leaf sentinel's feature, -inf, and a value that overflows float32
+        X[::2, 0] = np.inf
+        X[1::3, 1] = -np.inf
+        X[::5, 0] = np.float32(np.float64(1e39))
+        expected = loader.regressor.predict(X)
+        actual = loader.ensemble.predict(X, chunk_rows=256)
+        np.testing.assert_array_equal(actual, expected)
+
+    def test_engine_selection_by_batch_size(self, loader, monkeypatch):
+        """Test auto mode picks NumPy for small batches and XGBoost for large ones"""
+        predictor = Predictor(loader)
+        monkeypatch.setattr(settings, "INFERENCE_ENGINE", "auto")
+        monkeypatch.setattr(settings, "NUMPY_ENGINE_MAX_ROWS", 100)
+        monkeypatch.setattr(loader.current, "specializer", None)
+        assert isinstance(predictor.select_engine(100), NumpyTreeEngine)
+        assert isinstance(predictor.select_engine(101), XGBoostEngine)
+
+        monkeypatch.setattr(settings, "INFERENCE_ENGINE", "xgboost")
+        assert isinstance(predictor.select_engine(1), XGBoostEngine)
+
+        monkeypatch.setattr(settings, "INFERENCE_ENGINE", "numpy")
+        assert isinstance(predictor.select_engine(10 ** 6), NumpyTreeEngine)
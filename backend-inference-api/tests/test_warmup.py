@@ -0,0 +1,104 @@
+import asyncio
+import numpy as np
+import sys
+import os
+
+# Add parent directory to path for imports
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+
+from app.model_loader import ModelLoader
+from app.predict import Predictor
+from app.warmup import NUMERIC_RANGES, NOT_READY, READY, VALID_VALUES, WorkerReadiness, synthetic_columns
+
+MODEL_PATH = os.path.join(os.path.dirname(__file__), '..', 'models', 'superkart_model.joblib')
+
+
+class StubLoader:
+    def __init__(self, loaded=True):
+        self.loaded = loaded
+
+    def is_loaded(self):
+        return self.loaded
+
+    def wait_for_booster(self, timeout=None):
+        pass
+
+
+def run_readiness(readiness, timeout=5.0):
+    """Run until ready (or timeout), returning the statuses seen on the way"""
+    async def run():
+        statuses = []
+        await readiness.start()
+        deadline = asyncio.get_running_loop().time() + timeout
+        while asyncio.get_running_loop().time() < deadline:
+            if not statuses or statuses[-1] != readiness.status:
+                statuses.append(readiness.status)
+            if readiness.ready:
+                break
+            await asyncio.sleep(0.01)
+        await readiness.stop()
+        return statuses
+    return asyncio.run(run())
+
+
+class TestWarmup:
+    """Test suite for worker warm-up and readiness"""
+
+    def test_synthetic_columns_stay_within_validator_ranges(self):
+        """Test synthetic rows use valid categories and numbers in range, and score"""
+        columns = synthetic_columns(500)
+
+        for name, values in VALID_VALUES.items():
+            assert set(columns[name]) <= set(values)
+        for name, (low, high) in NUMERIC_RANGES.items():
+            assert low <= columns[name].min() and columns[name].max() <= high
+        assert (columns["Store_Establishment_Year"] % 1 == 0).all()
+
+        loader = ModelLoader(MODEL_PATH)
+        loader.load_model(use_artifact=False)
+        predictions = Predictor(loader).score_columns(columns).predictions
+        assert len(predictions) == 500 and np.isfinite(predictions).all()
+
+    def test_ready_after_warm_up_sizes(self):
+        """Test every warm-up size is scored before the worker turns ready"""
+        sizes = []
+        prepared = []
+
+        async def score(columns):
+            sizes.append(len(columns["Product_MRP"]))
+
+        readiness = WorkerReadiness(
+            StubLoader(), score, batch_sizes=[1, 64], rounds=2, check_samples=3,
+            prepare=lambda: prepared.append(True)
+        )
+        run_readiness(readiness)
+
+        assert readiness.ready
+        assert prepared == [True]
+        assert sizes == [1, 1, 64, 64, 1, 1, 1]
+
+    def test_slow_self_check_is_retried(self):
+        """Test a worker stays not ready while too slow, and turns ready once fast enough"""
+        delays = [0.05] * 3 + [0.0] * 3
+
+        async def score(columns):
+            await asyncio.sleep(delays.pop(0) if delays else 0.0)
+
+        readiness = WorkerReadiness(
+            StubLoader(), score, batch_sizes=[], max_latency_ms=20.0, check_samples=3, retry_seconds=0.2
+        )
+        statuses = run_readiness(readiness)
+
+        assert statuses[-2:] == [NOT_READY, READY]
+        assert readiness.latency_ms < 20.0
+
+    def test_not_ready_without_model(self):
+        """Test a worker whose model failed to load never reports ready"""
+        async def score(columns):
+            raise AssertionError("nothing may be scored")
+
+        readiness = WorkerReadiness(StubLoader(loaded=False), score)
+        run_readiness(readiness, timeout=0.1)
+
+        assert readiness.status == NOT_READY
+        assert readiness.reason == "Model is not loaded"
@@ -36,6 +36,8 @@ class Settings(BaseSettings):
     ALLOWED_FILE_EXTENSIONS: list = [".csv"]
     
     # API Configuration
+    # Seconds to wait for the transform service, also sent to it (and on to the
+    # inference API) as the request deadline in X-Request-Timeout-Ms
     API_TIMEOUT: int = 120
     
     # Display Configuration
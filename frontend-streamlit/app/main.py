@@ -12,6 +12,10 @@ st.set_page_config(
     layout=settings.APP_LAYOUT
 )
 
+# How long we wait, sent with every request so the services downstream stop
+# working on requests we have given up on
+DEADLINE_HEADERS = {"X-Request-Timeout-Ms": str(settings.API_TIMEOUT * 1000)}
+
 # UI Title and Subtitle
 st.title(f"{settings.APP_ICON} {settings.APP_TITLE} App")
 st.write("This tool predicts **product-level revenue** in a specific store using historical and categorical inputs.")
@@ -69,6 +73,7 @@ if st.button("Predict"):
             response = requests.post(
                 transform_url,
                 json=input_data.to_dict(orient='records')[0],
+                headers=DEADLINE_HEADERS,
                 timeout=settings.API_TIMEOUT
             )
         
@@ -152,6 +157,7 @@ if settings.ENABLE_BATCH_PREDICTION:
                                 response = requests.post(
                                     batch_url,
                                     files=files,
+                                    headers=DEADLINE_HEADERS,
                                     timeout=settings.API_TIMEOUT
                                 )
                             
@@ -0,0 +1,29 @@
+import hmac
+import logging
+from typing import Optional
+
+from fastapi import Header, HTTPException
+
+from app.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def is_admin(token: Optional[str]) -> bool:
+    """True if token matches the configured ADMIN_TOKEN"""
+    return bool(settings.ADMIN_TOKEN) and token is not None and hmac.compare_digest(token, settings.ADMIN_TOKEN)
+
+
+async def require_admin(x_admin_token: Optional[str] = Header(default=None)) -> None:
+    """
+    FastAPI dependency guarding /admin endpoints
+
+    Raises:
+        HTTPException: 403 if ADMIN_TOKEN is not configured or the
+            X-Admin-Token header does not match it
+    """
+    if not settings.ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN is not set)")
+    if not is_admin(x_admin_token):
+        logger.warning("Rejected admin request with a missing or invalid token")
+        raise HTTPException(status_code=403, detail="Invalid admin token")
@@ -0,0 +1,178 @@
+import json
+import struct
+from typing import Any, Dict, Mapping, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+# Binary columnar batch format
+#
+#   prefix   8-byte magic, uint32 little-endian header length, 4 bytes padding
+#   header   UTF-8 JSON, padded with spaces to a multiple of 8 bytes:
+#            {"rows": n,
+#             "columns": [{"name", "dtype", "offset", "length"[, "categories"]}],
+#             "metadata": {...}}
+#   buffers  one per column, at "offset" bytes after the header, 8-byte aligned
+#
+# dtype is a NumPy type string (little-endian: "<f8", "<f4", "<i8", "<i4",
+# "|u1", ...). Columns with "categories" are dictionary-encoded: the buffer
+# holds integer codes into the list of categories, -1 for a missing value.
+# Buffers are read in place with np.frombuffer, nothing is parsed per row.
+MEDIA_TYPE = "application/vnd.superkart.columnar"
+MAGIC = b"SKCOL\x00\x01\x00"
+ALIGNMENT = 8
+_PREFIX = struct.Struct("<8sI4x")
+
+Column = Union[np.ndarray, pd.Categorical]
+
+
+class ColumnarFormatError(ValueError):
+    """Raised when a body is not a valid columnar batch"""
+
+
+def media_type_matches(header: Optional[str], media_type: str = MEDIA_TYPE) -> bool:
+    """
+    True if a Content-Type or Accept header names the media type
+
+    Parameters (charset, q) are ignored except q=0, which refuses it.
+    """
+    if not header:
+        return False
+    for part in header.split(","):
+        name, *params = [item.strip() for item in part.split(";")]
+        if name.lower() != media_type:
+            continue
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip().lower() == "q":
+                try:
+                    return float(value) > 0
+                except ValueError:
+                    return False
+        return True
+    return False
+
+
+def _padded(length: int) -> int:
+    return -(-length // ALIGNMENT) * ALIGNMENT
+
+
+def encode(columns: Mapping[str, Column], metadata: Optional[Dict[str, Any]] = None) -> bytes:
+    """
+    Serialize columns into the binary columnar format
+
+    Args:
+        columns: Column name to NumPy array, or pandas Categorical for a
+            dictionary-encoded column; all of the same length
+        metadata: JSON-serializable values carried in the header
+
+    Returns:
+        Encoded body
+    """
+    rows = None
+    descriptors = []
+    buffers = []
+    offset = 0
+    for name, values in columns.items():
+        if rows is None:
+            rows = len(values)
+        elif len(values) != rows:
+            raise ValueError(f"Column {name} has {len(values)} values, expected {rows}")
+
+        descriptor: Dict[str, Any] = {"name": name}
+        if isinstance(values, pd.Categorical):
+            descriptor["categories"] = [str(category) for category in values.categories]
+            values = values.codes
+        data = np.ascontiguousarray(values)
+        if data.dtype.kind not in "fiu":
+            raise ValueError(f"Column {name} must be numeric or categorical, got {data.dtype}")
+        data = data.astype(data.dtype.newbyteorder("<"), copy=False)
+
+        descriptor.update(dtype=data.dtype.str, offset=offset, length=data.nbytes)
+        descriptors.append(descriptor)
+        buffers.append(data.tobytes())
+        padding = _padded(data.nbytes) - data.nbytes
+        if padding:
+            buffers.append(b"\x00" * padding)
+        offset += data.nbytes + padding
+
+    header = json.dumps({"rows": rows or 0, "columns": descriptors, "metadata": metadata or {}}).encode()
+    header += b" " * (_padded(len(header)) - len(header))
+    return b"".join([_PREFIX.pack(MAGIC, len(header)), header, *buffers])
+
+
+def decode(
+    body: bytes,
+    categorical: Sequence[str] = (),
+    numeric: Sequence[str] = ()
+) -> Tuple[Dict[str, Column], Dict[str, Any]]:
+    """
+    Read columns from a body in the binary columnar format
+
+    Numeric columns are views on body (read-only, no copy); dictionary-encoded
+    columns become pandas Categoricals over a view of their codes.
+
+    Args:
+        body: Request body
+        categorical: Columns that must be present and dictionary-encoded
+        numeric: Columns that must be present and numeric
+
+    Returns:
+        Tuple of (column name to values, header metadata)
+
+    Raises:
+        ColumnarFormatError: If the body is malformed or misses a column
+    """
+    if len(body) < _PREFIX.size:
+        raise ColumnarFormatError("Body is shorter than the columnar prefix")
+    magic, header_length = _PREFIX.unpack_from(body)
+    if magic != MAGIC:
+        raise ColumnarFormatError("Body does not start with the columnar magic bytes")
+    data_start = _PREFIX.size + header_length
+    if data_start > len(body):
+        raise ColumnarFormatError("Header extends past the end of the body")
+
+    try:
+        header = json.loads(body[_PREFIX.size:data_start])
+        rows = int(header["rows"])
+        descriptors = list(header["columns"])
+        metadata = dict(header.get("metadata") or {})
+    except (ValueError, TypeError, KeyError) as e:
+        raise ColumnarFormatError(f"Invalid columnar header: {str(e)}")
+    if rows < 0:
+        raise ColumnarFormatError(f"Invalid columnar header: negative row count {rows}")
+
+    columns: Dict[str, Column] = {}
+    for descriptor in descriptors:
+        try:
+            name = str(descriptor["name"])
+            dtype = np.dtype(descriptor["dtype"])
+            offset = int(descriptor["offset"])
+            length = int(descriptor["length"])
+            categories = descriptor.get("categories")
+        except (TypeError, KeyError) as e:
+            raise ColumnarFormatError(f"Invalid column descriptor {descriptor!r}: {str(e)}")
+        if dtype.kind not in "fiu" or (categories is not None and dtype.kind == "f"):
+            raise ColumnarFormatError(f"Column {name} has unsupported dtype {dtype.str}")
+        if length < 0 or length != rows * dtype.itemsize or offset < 0 or data_start + offset + length > len(body):
+            raise ColumnarFormatError(f"Column {name} does not hold {rows} {dtype.str} values within the body")
+
+        values = np.frombuffer(body, dtype=dtype, count=rows, offset=data_start + offset)
+        if categories is not None:
+            try:
+                values = pd.Categorical.from_codes(values, categories=categories)
+            except (ValueError, TypeError) as e:
+                raise ColumnarFormatError(f"Invalid dictionary-encoded column {name}: {str(e)}")
+        columns[name] = values
+
+    for name in categorical:
+        if name not in columns:
+            raise ColumnarFormatError(f"Missing required column {name}")
+        if not isinstance(columns[name], pd.Categorical):
+            raise ColumnarFormatError(f"Column {name} must be dictionary-encoded")
+    for name in numeric:
+        if name not in columns:
+            raise ColumnarFormatError(f"Missing required column {name}")
+        if isinstance(columns[name], pd.Categorical):
+            raise ColumnarFormatError(f"Column {name} must be numeric")
+    return columns, metadata
@@ -15,7 +15,14 @@ class Settings(BaseSettings):
     # Inference API Configuration
     # Can be overridden via BACKEND_API_URL environment variable from docker-compose
     INFERENCE_API_URL: str = "http://backend-inference-api:8000"
+    # Seconds to wait for the inference API: INFERENCE_API_TIMEOUT on batch and
+    # job calls, INFERENCE_API_SINGLE_TIMEOUT on single predictions. A caller's
+    # X-Request-Timeout-Ms header shortens both to its deadline less
+    # DEADLINE_MARGIN_MS (kept to send the response back); the inference API is
+    # sent the resulting timeout in the same header
     INFERENCE_API_TIMEOUT: int = 60
+    INFERENCE_API_SINGLE_TIMEOUT: int = 30
+    DEADLINE_MARGIN_MS: int = 100
     
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -50,6 +57,21 @@ class Settings(BaseSettings):
     # Health Check Configuration
     HEALTH_CHECK_INTERVAL: int = 30
     
+    # Sampling Profiler Configuration
+    # Every SAMPLER_INTERVAL_MS the stacks of all threads are recorded; the last
+    # SAMPLER_WINDOW_SECONDS are served as collapsed stacks (flame graph input)
+    # on /admin/profile/flamegraph. Threads waiting for work are skipped unless
+    # SAMPLER_INCLUDE_IDLE is set
+    SAMPLER_ENABLED: bool = True
+    SAMPLER_INTERVAL_MS: float = 20.0
+    SAMPLER_WINDOW_SECONDS: float = 300.0
+    SAMPLER_INCLUDE_IDLE: bool = False
+    
+    # Admin Configuration
+    # Token expected in the X-Admin-Token header of /admin endpoints
+    # (admin endpoints are disabled when unset)
+    ADMIN_TOKEN: Optional[str] = None
+    
     # Retry Configuration
     MAX_RETRIES: int = 3
     RETRY_DELAY: int = 1
@@ -92,4 +114,7 @@ def validate_settings():
     if settings.INFERENCE_API_TIMEOUT <= 0:
         raise ValueError("INFERENCE_API_TIMEOUT must be positive")
     
+    if settings.INFERENCE_API_SINGLE_TIMEOUT <= 0:
+        raise ValueError("INFERENCE_API_SINGLE_TIMEOUT must be positive")
+    
     return True
\ No newline at end of file
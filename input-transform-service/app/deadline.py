@@ -0,0 +1,81 @@
+import math
+import time
+from typing import Dict, Optional
+
+from fastapi import Header, HTTPException
+
+from app.config import settings
+
+# Milliseconds the caller will still wait for the response; the inference
+# API reads the same header and skips work whose deadline has passed
+HEADER = "X-Request-Timeout-Ms"
+# Status of a request whose deadline passed before the inference API answered
+EXPIRED_STATUS = 504
+
+
+class Deadline:
+    """Time left to answer the caller, from its X-Request-Timeout-Ms header"""
+
+    def __init__(self, timeout_seconds: Optional[float] = None):
+        """
+        Initialize Deadline
+
+        Args:
+            timeout_seconds: Seconds the caller will wait from now (None: no deadline)
+        """
+        self.expires = None if timeout_seconds is None else time.monotonic() + timeout_seconds
+
+    def remaining(self) -> Optional[float]:
+        """Seconds left, or None without a deadline"""
+        if self.expires is None:
+            return None
+        return self.expires - time.monotonic()
+
+    def budget(self, timeout: float, stage: str = "inference") -> float:
+        """
+        Timeout of a call to the inference API
+
+        The configured timeout, cut down to the time left less
+        DEADLINE_MARGIN_MS (kept to send the response back).
+
+        Args:
+            timeout: Configured timeout of the call, seconds
+            stage: Name of the call, for the error
+
+        Returns:
+            Seconds the call may take
+
+        Raises:
+            HTTPException: 504 if no time is left
+        """
+        remaining = self.remaining()
+        if remaining is None:
+            return timeout
+        remaining -= settings.DEADLINE_MARGIN_MS / 1000.0
+        if remaining <= 0:
+            raise HTTPException(
+                status_code=EXPIRED_STATUS,
+                detail=f"Request deadline passed before the {stage} stage"
+            )
+        return min(timeout, remaining)
+
+
+def deadline_header(timeout: float) -> Dict[str, str]:
+    """Header telling the inference API how long a call will wait for it"""
+    return {HEADER: str(max(1, math.floor(timeout * 1000)))}
+
+
+async def request_deadline(x_request_timeout_ms: Optional[str] = Header(default=None)) -> Deadline:
+    """
+    FastAPI dependency reading the caller's deadline
+
+    A missing or unparseable header means no deadline; calls to the
+    inference API then use their configured timeouts.
+    """
+    if x_request_timeout_ms is None:
+        return Deadline()
+    try:
+        timeout = float(x_request_timeout_ms) / 1000.0
+    except ValueError:
+        return Deadline()
+    return Deadline(timeout if math.isfinite(timeout) else None)
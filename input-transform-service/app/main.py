@@ -1,7 +1,10 @@
-from fastapi import FastAPI, HTTPException, UploadFile, File
+from fastapi import Depends, FastAPI, HTTPException, UploadFile, File
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
 from pydantic import BaseModel
 from typing import List, Optional
+import numpy as np
 import pandas as pd
 import logging
 from datetime import datetime
@@ -12,6 +15,10 @@ from app.schema import ProductStoreInput, PredictionResponse, BatchPredictionRes
 from app.transform import DataTransformer
 from app.validators import InputValidator
 from app.config import settings
+from app import columnar
+from app.admin import require_admin
+from app.deadline import Deadline, deadline_header, request_deadline
+from app.sampler import StackSampler
 import requests
 
 # Configure logging - ensure it goes to stdout/stderr for Docker
@@ -56,6 +63,29 @@ app.add_middleware(
 transformer = DataTransformer()
 validator = InputValidator()
 
+# Low-rate stack sampling of every thread, for flame graphs of production traffic
+stack_sampler: Optional[StackSampler] = None
+if settings.SAMPLER_ENABLED:
+    stack_sampler = StackSampler(
+        interval_seconds=settings.SAMPLER_INTERVAL_MS / 1000.0,
+        window_seconds=settings.SAMPLER_WINDOW_SECONDS,
+        include_idle=settings.SAMPLER_INCLUDE_IDLE
+    )
+
+
+@app.on_event("startup")
+async def startup_event():
+    """Start background tasks on startup"""
+    if stack_sampler is not None:
+        stack_sampler.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background tasks on shutdown"""
+    if stack_sampler is not None:
+        stack_sampler.stop()
+
 
 @app.get("/")
 async def root():
@@ -77,9 +107,15 @@ async def health_check():
 
 
 @app.post("/transform/single", response_model=PredictionResponse)
-async def transform_and_predict_single(input_data: ProductStoreInput):
+async def transform_and_predict_single(
+    input_data: ProductStoreInput,
+    deadline: Deadline = Depends(request_deadline)
+):
     """
     Validate, transform single input and get prediction
+    
+    An X-Request-Timeout-Ms header caps the wait for the inference API,
+    which is passed what is left of it.
     """
     try:
         # Validate input
@@ -101,13 +137,16 @@ async def transform_and_predict_single(input_data: ProductStoreInput):
             "Store_Establishment_Year": int(df.iloc[0]["Store_Establishment_Year"])
         }
         
-        # Call inference API
+        # Call inference API, telling it how long we will wait
+        timeout = deadline.budget(settings.INFERENCE_API_SINGLE_TIMEOUT)
         response = requests.post(
             f"{settings.INFERENCE_API_URL}/predict",
             json=inference_data,
-            timeout=30
+            headers=deadline_header(timeout),
+            timeout=timeout
         )
         
+        raise_if_overloaded(response)
         if response.status_code != 200:
             raise HTTPException(status_code=500, detail="Inference API request failed")
         
@@ -119,9 +158,14 @@ async def transform_and_predict_single(input_data: ProductStoreInput):
             input_data=input_data.dict()
         )
     
+    except HTTPException:
+        raise
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
+    except requests.Timeout as e:
+        logger.error(f"Inference API timeout: {str(e)}")
+        raise HTTPException(status_code=504, detail="Inference API did not answer in time")
     except requests.RequestException as e:
         logger.error(f"Inference API error: {str(e)}")
         raise HTTPException(status_code=503, detail="Inference API unavailable")
@@ -130,10 +174,55 @@ async def transform_and_predict_single(input_data: ProductStoreInput):
         raise HTTPException(status_code=500, detail=f"Transform failed: {str(e)}")
 
 
+def raise_if_overloaded(response: requests.Response) -> None:
+    """
+    Pass the inference API's load shedding and expired deadlines on to the caller
+    
+    Raises:
+        HTTPException: With the inference API's 429/503 status and Retry-After
+            header, or its 504 for a request whose deadline passed
+    """
+    if response.status_code == 504:
+        raise HTTPException(status_code=504, detail=backend_error(response))
+    if response.status_code in (429, 503):
+        headers = {"Retry-After": response.headers["retry-after"]} if "retry-after" in response.headers else None
+        raise HTTPException(
+            status_code=response.status_code,
+            detail=f"Inference API is overloaded, retry later: {backend_error(response)}",
+            headers=headers
+        )
+
+
+def inference_columns(transformed_df: pd.DataFrame) -> dict:
+    """
+    Columns of a transformed batch in the inference API's columnar format
+    
+    One buffer per column, categorical features dictionary-encoded
+    (missing values as code -1).
+    """
+    return {
+        "Product_Type": pd.Categorical(transformed_df["Product_Type"]),
+        "Store_Type": pd.Categorical(transformed_df["Store_Type"]),
+        "Store_Location_City_Type": pd.Categorical(transformed_df["Store_Location_City_Type"]),
+        "Store_Size": pd.Categorical(transformed_df["Store_Size"]),
+        "Product_Sugar_Content": pd.Categorical(transformed_df["Product_Sugar_Content"]),
+        "Product_Weight": transformed_df["Product_Weight"].to_numpy(dtype=np.float64),
+        "Product_MRP": transformed_df["Product_MRP"].to_numpy(dtype=np.float64),
+        "Product_Allocated_Area": transformed_df["Product_Allocated_Area"].to_numpy(dtype=np.float64),
+        "Store_Establishment_Year": transformed_df["Store_Establishment_Year"].to_numpy(dtype=np.int64)
+    }
+
+
 @app.post("/transform/batch", response_model=BatchPredictionResponse)
-async def transform_and_predict_batch(file: UploadFile = File(...)):
+async def transform_and_predict_batch(
+    file: UploadFile = File(...),
+    deadline: Deadline = Depends(request_deadline)
+):
     """
     Validate and transform batch CSV input and get predictions
+    
+    An X-Request-Timeout-Ms header caps the wait for the inference API,
+    which is passed what is left of it.
     """
     try:
         # Read CSV file
@@ -149,43 +238,49 @@ async def transform_and_predict_batch(file: UploadFile = File(...)):
         transformed_df = transformer.transform_dataframe(df)
         
         # Prepare batch request for inference API
-        batch_data = []
-        for _, row in transformed_df.iterrows():
-            batch_data.append({
-                "Product_Type": row["Product_Type"],
-                "Store_Type": row["Store_Type"],
-                "Store_Location_City_Type": row["Store_Location_City_Type"],
-                "Store_Size": row["Store_Size"],
-                "Product_Sugar_Content": row["Product_Sugar_Content"],
-                "Product_Weight": float(row["Product_Weight"]),
-                "Product_MRP": float(row["Product_MRP"]),
-                "Product_Allocated_Area": float(row["Product_Allocated_Area"]),
-                "Store_Establishment_Year": int(row["Store_Establishment_Year"])
-            })
-        
-        # Call inference API
+        batch_columns = inference_columns(transformed_df)
+        
+        # Call inference API, predictions come back as a binary float column too
+        timeout = deadline.budget(settings.INFERENCE_API_TIMEOUT)
         response = requests.post(
             f"{settings.INFERENCE_API_URL}/predict/batch",
-            json={"data": batch_data},
-            timeout=60
+            params={"format": "compact"},
+            data=columnar.encode(batch_columns),
+            headers={
+                "Content-Type": columnar.MEDIA_TYPE,
+                "Accept": f"{columnar.MEDIA_TYPE}, application/json;q=0.5",
+                **deadline_header(timeout)
+            },
+            timeout=timeout
         )
         
+        raise_if_overloaded(response)
         if response.status_code != 200:
             raise HTTPException(status_code=500, detail="Batch inference API request failed")
         
-        result = response.json()
+        if columnar.media_type_matches(response.headers.get("content-type")):
+            result_columns, result = columnar.decode(response.content)
+            predictions = result_columns["predictions"].tolist()
+        else:
+            result = response.json()
+            predictions = result["predictions"]
         
         return BatchPredictionResponse(
-            predictions=[pred["predicted_revenue"] for pred in result["predictions"]],
+            predictions=predictions,
             total_records=result["total_records"],
             timestamp=result["timestamp"]
         )
     
+    except HTTPException:
+        raise
     except pd.errors.EmptyDataError:
         raise HTTPException(status_code=400, detail="Empty CSV file")
     except ValueError as e:
         logger.error(f"Validation error: {str(e)}")
         raise HTTPException(status_code=400, detail=str(e))
+    except requests.Timeout as e:
+        logger.error(f"Inference API timeout: {str(e)}")
+        raise HTTPException(status_code=504, detail="Inference API did not answer in time")
     except requests.RequestException as e:
         logger.error(f"Inference API error: {str(e)}")
         raise HTTPException(status_code=503, detail="Inference API unavailable")
@@ -194,6 +289,132 @@ async def transform_and_predict_batch(file: UploadFile = File(...)):
         raise HTTPException(status_code=500, detail=f"Batch transform failed: {str(e)}")
 
 
+@app.post("/transform/jobs", status_code=202)
+async def submit_batch_job(
+    file: UploadFile = File(...),
+    deadline: Deadline = Depends(request_deadline)
+):
+    """
+    Validate and transform batch CSV input and submit it as a background job
+    
+    For batches too large to score within one request: poll
+    /transform/jobs/{job_id} until the job has succeeded, then download
+    the predictions as CSV from /transform/jobs/{job_id}/result.
+    """
+    try:
+        contents = await file.read()
+        df = pd.read_csv(io.StringIO(contents.decode('utf-8')))
+        
+        logger.info(f"Received batch job file with {len(df)} records")
+        
+        validator.validate_batch(df)
+        transformed_df = transformer.transform_dataframe(df)
+        
+        timeout = deadline.budget(settings.INFERENCE_API_TIMEOUT, "job submission")
+        response = requests.post(
+            f"{settings.INFERENCE_API_URL}/jobs",
+            data=columnar.encode(inference_columns(transformed_df)),
+            headers={"Content-Type": columnar.MEDIA_TYPE, **deadline_header(timeout)},
+            timeout=timeout
+        )
+        
+        raise_if_overloaded(response)
+        if response.status_code != 202:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Batch job submission failed: {backend_error(response)}"
+            )
+        
+        return job_links(response.json())
+    
+    except HTTPException:
+        raise
+    except pd.errors.EmptyDataError:
+        raise HTTPException(status_code=400, detail="Empty CSV file")
+    except ValueError as e:
+        logger.error(f"Validation error: {str(e)}")
+        raise HTTPException(status_code=400, detail=str(e))
+    except requests.Timeout as e:
+        logger.error(f"Inference API timeout: {str(e)}")
+        raise HTTPException(status_code=504, detail="Inference API did not answer in time")
+    except requests.RequestException as e:
+        logger.error(f"Inference API error: {str(e)}")
+        raise HTTPException(status_code=503, detail="Inference API unavailable")
+    except Exception as e:
+        logger.error(f"Batch job error: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Batch job submission failed: {str(e)}")
+
+
+@app.get("/transform/jobs/{job_id}")
+async def get_batch_job(job_id: str):
+    """Status of a batch job"""
+    response = job_request("GET", f"/jobs/{job_id}")
+    return job_links(response.json())
+
+
+@app.get("/transform/jobs/{job_id}/result")
+async def get_batch_job_result(job_id: str):
+    """Predictions of a succeeded batch job as CSV, in input row order"""
+    response = job_request("GET", f"/jobs/{job_id}/result", stream=True)
+    return StreamingResponse(
+        response.iter_content(chunk_size=65536),
+        media_type="text/csv",
+        headers={"Content-Disposition": response.headers.get("content-disposition", f'attachment; filename="{job_id}.csv"')},
+        background=BackgroundTask(response.close)
+    )
+
+
+@app.delete("/transform/jobs/{job_id}")
+async def cancel_batch_job(job_id: str):
+    """Cancel a queued or running batch job, or delete a finished one"""
+    return job_links(job_request("DELETE", f"/jobs/{job_id}").json())
+
+
+def job_request(method: str, path: str, stream: bool = False) -> requests.Response:
+    """
+    Forward a job request to the inference API
+    
+    Raises:
+        HTTPException: With the inference API's status for 404/409, 503 if it is unreachable
+    """
+    try:
+        response = requests.request(
+            method,
+            f"{settings.INFERENCE_API_URL}{path}",
+            stream=stream,
+            timeout=settings.INFERENCE_API_TIMEOUT
+        )
+    except requests.RequestException as e:
+        logger.error(f"Inference API error: {str(e)}")
+        raise HTTPException(status_code=503, detail="Inference API unavailable")
+    
+    if response.status_code != 200:
+        detail = backend_error(response)
+        response.close()
+        raise HTTPException(
+            status_code=response.status_code if response.status_code in (404, 409) else 500,
+            detail=detail
+        )
+    return response
+
+
+def backend_error(response: requests.Response) -> str:
+    """Error detail of a failed inference API response"""
+    try:
+        return str(response.json().get("detail", response.text))
+    except ValueError:
+        return response.text
+
+
+def job_links(state: dict) -> dict:
+    """Point a job's status and result URLs at this service"""
+    job_id = state.get("job_id")
+    if job_id:
+        state["status_url"] = f"/transform/jobs/{job_id}"
+        state["result_url"] = f"/transform/jobs/{job_id}/result"
+    return state
+
+
 @app.get("/schema")
 async def get_schema():
     """Get expected input schema"""
@@ -221,4 +442,23 @@ async def get_schema():
             "Store_Establishment_Year": "integer"
         },
         "valid_values": validator.get_valid_values()
-    }
\ No newline at end of file
+    }
+
+
+@app.get("/admin/profile/flamegraph", response_class=PlainTextResponse, dependencies=[Depends(require_admin)])
+async def flamegraph(seconds: Optional[float] = None):
+    """
+    Collapsed stacks sampled in this worker over the last seconds (default: the whole window)
+    
+    One "thread;outer;...;inner count" line per stack; render with
+    flamegraph.pl, inferno-flamegraph or speedscope.
+    """
+    if stack_sampler is None:
+        raise HTTPException(status_code=404, detail="Sampling profiler is disabled (SAMPLER_ENABLED=false)")
+    return PlainTextResponse(
+        stack_sampler.collapsed(seconds),
+        headers={
+            "X-Sampler-Samples": str(stack_sampler.samples_total),
+            "X-Sampler-Overhead": f"{stack_sampler.overhead_ratio:.4f}"
+        }
+    )
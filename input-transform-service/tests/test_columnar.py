@@ -0,0 +1,87 @@
+import importlib.util
+import os
+
+import pytest
+import numpy as np
+import pandas as pd
+
+from app import columnar
+from app.main import inference_columns
+from app.transform import DataTransformer
+
+# The inference API's copy of the columnar format, loaded from its file (both
+# services name their package "app"); missing when the service is tested alone
+BACKEND_COLUMNAR_PATH = os.path.join(
+    os.path.dirname(__file__), '..', '..', 'backend-inference-api', 'app', 'columnar.py'
+)
+
+# Features as the inference API's /predict/batch requires them
+CATEGORICAL = ["Product_Type", "Store_Type", "Store_Location_City_Type", "Store_Size", "Product_Sugar_Content"]
+NUMERIC = ["Product_Weight", "Product_MRP", "Product_Allocated_Area", "Store_Establishment_Year"]
+INTEGER = ["Store_Establishment_Year"]
+
+
+@pytest.fixture
+def backend_columnar():
+    """The inference API's columnar module"""
+    if not os.path.exists(BACKEND_COLUMNAR_PATH):
+        pytest.skip("backend-inference-api is not checked out next to this service")
+    spec = importlib.util.spec_from_file_location("backend_columnar", BACKEND_COLUMNAR_PATH)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+@pytest.fixture
+def transformed_df():
+    """Batch as /transform/batch sends it, after normalization"""
+    df = pd.DataFrame({
+        "Product_Type": ["Meat", "Dairy", "Snack Foods", "Dairy"],
+        "Store_Type": ["Supermarket Type1", "Grocery Store", "Supermarket Type2", "Grocery Store"],
+        "Store_Location_City_Type": ["Tier 1", "Tier 2", "Tier 3", "Tier 1"],
+        "Store_Size": ["Small", "Medium", "High", "Small"],
+        "Product_Sugar_Content": ["No Sugar", "low fat", "reg", "Regular"],
+        "Product_Weight": [10.0, 15.5, 20.0, 7.25],
+        "Product_MRP": [200.0, 150.0, 300.0, 99.9],
+        "Product_Allocated_Area": [0.2, 0.3, 0.4, 0.05],
+        "Store_Establishment_Year": [2010, 2005, 2015, 1987]
+    })
+    return DataTransformer().transform_dataframe(df)
+
+
+class TestColumnarWithInferenceApi:
+    """Test the columnar bodies exchanged with the inference API decode on the other side"""
+
+    def test_batch_request_round_trip(self, backend_columnar, transformed_df):
+        """Test a batch encoded here passes the inference API's decoding and value checks unchanged"""
+        body = columnar.encode(inference_columns(transformed_df))
+
+        columns, _ = backend_columnar.decode(body, categorical=CATEGORICAL, numeric=NUMERIC, integer=INTEGER)
+
+        assert set(columns) == set(CATEGORICAL + NUMERIC)
+        for name in CATEGORICAL:
+            assert list(np.asarray(columns[name])) == transformed_df[name].tolist()
+        for name in NUMERIC:
+            np.testing.assert_array_equal(columns[name], transformed_df[name].to_numpy())
+
+    def test_invalid_batch_is_refused(self, backend_columnar, transformed_df):
+        """Test the inference API refuses values this service would send for invalid input"""
+        transformed_df.loc[1, "Product_MRP"] = np.nan
+        transformed_df.loc[2, "Store_Size"] = None
+        body = columnar.encode(inference_columns(transformed_df))
+
+        with pytest.raises(backend_columnar.ColumnValidationError) as excinfo:
+            backend_columnar.decode(body, categorical=CATEGORICAL, numeric=NUMERIC, integer=INTEGER)
+        assert {error["loc"] for error in excinfo.value.errors} == {("Product_MRP", 1), ("Store_Size", 2)}
+
+    def test_predictions_response_round_trip(self, backend_columnar):
+        """Test the inference API's columnar predictions decode to what /transform/batch returns"""
+        predictions = np.array([1520.5, 3010.25, 987.0], dtype=np.float32)
+        body = backend_columnar.encode_predictions(predictions, model_version="v1")
+
+        result_columns, result = columnar.decode(body)
+
+        assert result_columns["predictions"].tolist() == predictions.tolist()
+        assert result["total_records"] == 3
+        assert result["model_version"] == "v1"
+        assert isinstance(result["timestamp"], str)